@@ -0,0 +1,113 @@
+"""Inserções de pedidos por segundo com commit por requisição e com commit em grupo.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.bench_group_commit --concurrency 1,4,16,64 --duration 3
+
+Para cada nível de concorrência, ``N`` threads (como o pool do FastAPI)
+gravam pedidos em laço fechado pelo ``GroupCommitWriter`` — desligado (um
+commit por pedido) e ligado — em um banco SQLite novo. Mede pedidos/s,
+commits, itens por commit e a latência p50/p99 de cada escrita. O catálogo
+fica fora da medida: a escrita é a mesma de ``create_order_service`` depois
+da consulta do produto. ``--profile`` escolhe o perfil de PRAGMAs.
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(writer, stage_order, concurrency: int, duration: float) -> dict:
+    from src.orders.model import OrderRequest
+
+    numbers = itertools.count(1_000_000 * concurrency + (1 if writer.enabled else 500_000))
+    latencies: list[list[float]] = [[] for _ in range(concurrency)]
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        request = OrderRequest(productCode=101, tableNumber=index % 20 + 1, quantity=1)
+        own = latencies[index]
+        while time.perf_counter() < deadline:
+            order_number = next(numbers)
+            began = time.perf_counter()
+            writer.write(lambda session: stage_order(session, request, order_number, 'Café', 100, 5.0))
+            own.append((time.perf_counter() - began) * 1000)
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - began
+    writer.stop()
+    merged = [value for own in latencies for value in own]
+    return {
+        'writes': len(merged),
+        'writes_per_s': round(len(merged) / elapsed, 1),
+        'p50_ms': round(percentile(merged, 0.50), 3),
+        'p99_ms': round(percentile(merged, 0.99), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='1,4,16,64', help='níveis de concorrência separados por vírgula')
+    parser.add_argument('--duration', type=float, default=3.0, help='segundos por medição')
+    parser.add_argument('--profile', default='default', help='perfil de banco (DB_PROFILE)')
+    parser.add_argument('--max-delay-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+        os.environ['DB_PROFILE'] = args.profile
+        os.environ.setdefault('SQLALCHEMY_ECHO', '0')
+        os.environ.setdefault('METRICS_ENABLED', 'false')
+
+        from sqlalchemy import event
+
+        from src.group_commit import GroupCommitWriter
+        from src.migrations import run_migrations
+        from src.orders.service import _stage_order
+        from src.storage import storage
+
+        engine = storage.orders.primary
+        run_migrations(engine)
+        commits = [0]
+        lock = threading.Lock()
+
+        @event.listens_for(engine, 'commit')
+        def count_commit(connection):
+            with lock:
+                commits[0] += 1
+
+        results = {'profile': args.profile, 'duration_s': args.duration, 'levels': []}
+        for concurrency in (int(value) for value in args.concurrency.split(',')):
+            level = {'concurrency': concurrency}
+            for name, enabled in (('per_request', False), ('group_commit', True)):
+                writer = GroupCommitWriter(
+                    storage.session, storage.async_session, enabled=enabled,
+                    max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000,
+                )
+                before = commits[0]
+                row = run(writer, _stage_order, concurrency, args.duration)
+                row['commits'] = commits[0] - before
+                row['writes_per_commit'] = round(row['writes'] / max(row['commits'], 1), 2)
+                level[name] = row
+            level['speedup'] = round(level['group_commit']['writes_per_s'] / level['per_request']['writes_per_s'], 2)
+            results['levels'].append(level)
+        engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Tempestade de retentativas em ``POST /order/`` com e sem ``Idempotency-Key``.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.bench_idempotency --orders 200 --retries 3
+
+Cada pedido é enviado ``1 + retries`` vezes, como faria um cliente que não
+recebeu a resposta a tempo. Sem a chave, toda repetição vira uma nova linha
+em ``orders``; com a chave, as repetições devolvem a resposta gravada. Mede
+as linhas escritas e a latência p50 da primeira tentativa e das repetições.
+O produto é semeado no cache local para que o catálogo não entre na medida.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def timed_post(client, payload: dict, headers: dict) -> float:
+    began = time.perf_counter()
+    response = client.post('/order/', json=payload, headers=headers)
+    elapsed = (time.perf_counter() - began) * 1000
+    response.raise_for_status()
+    return elapsed
+
+
+def storm(client, orders: int, retries: int, use_key: bool, run: str) -> dict:
+    first, repeated = [], []
+    for i in range(orders):
+        payload = {'productCode': 101, 'tableNumber': i % 20 + 1, 'quantity': 1}
+        headers = {'Idempotency-Key': f'{run}-{i}'} if use_key else {}
+        first.append(timed_post(client, payload, headers))
+        for _ in range(retries):
+            repeated.append(timed_post(client, payload, headers))
+    return {
+        'first_p50_ms': round(statistics.median(first), 3),
+        'retry_p50_ms': round(statistics.median(repeated), 3) if repeated else None,
+    }
+
+
+def count_orders(engine) -> int:
+    from sqlalchemy import text
+
+    with engine.connect() as connection:
+        return connection.scalar(text('SELECT COUNT(*) FROM orders'))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--retries', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+        os.environ.setdefault('SQLALCHEMY_ECHO', '0')
+        os.environ.setdefault('METRICS_ENABLED', 'false')
+        os.environ.setdefault('CONSUL_HTTP_ADDR', 'http://127.0.0.1:59999')
+
+        from fastapi.testclient import TestClient
+
+        import main as service_main
+        from src.migrations import run_migrations
+        from src.orders.database import engine
+        from src.orders.service import product_cache
+
+        run_migrations(engine)
+        product_cache.store(101, {'codigo': 101, 'descricao': 'Café', 'codGruEst': 100})
+
+        results = {'orders': args.orders, 'retries': args.retries}
+        with TestClient(service_main.create_app()) as client:
+            for name, use_key in (('without_key', False), ('with_key', True)):
+                before = count_orders(engine)
+                row = storm(client, args.orders, args.retries, use_key, name)
+                row['rows_written'] = count_orders(engine) - before
+                results[name] = row
+        engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Latência das consultas de pedidos/pagamentos antes e depois da migração de índices.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.bench_indexes --rows 1000000
+
+Cria um SQLite temporário com o esquema legado (sem índices), mede as
+consultas usadas pelos serviços, aplica ``run_migrations`` e mede de novo.
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+from src.migrations import run_migrations
+
+
+LEGACY_SCHEMA = (
+    'CREATE TABLE orders (id INTEGER PRIMARY KEY, "orderNumber" INTEGER NOT NULL, '
+    '"tableNumber" INTEGER NOT NULL, quantity INTEGER NOT NULL, description VARCHAR, '
+    '"codGruEst" INTEGER NOT NULL, "productCode" INTEGER NOT NULL)',
+    'CREATE TABLE payments (id INTEGER PRIMARY KEY, "orderNumber" INTEGER NOT NULL, '
+    'amount FLOAT NOT NULL, "paymentMethod" VARCHAR NOT NULL, "transactionId" VARCHAR, '
+    '"updatedAt" DATETIME, status VARCHAR NOT NULL, "createdAt" DATETIME NOT NULL)',
+)
+
+# Mesmas consultas emitidas por get_orders_service, create_payment_service,
+# get_payments_by_order_service e list_all_payments_service.
+QUERIES = {
+    'orders_by_number': (
+        'SELECT * FROM orders WHERE "orderNumber" = :n'
+    ),
+    'active_payment_check': (
+        'SELECT * FROM payments WHERE "orderNumber" = :n '
+        "AND status IN ('PENDING', 'PROCESSING', 'COMPLETED') LIMIT 1"
+    ),
+    'payments_by_order': (
+        'SELECT * FROM payments WHERE "orderNumber" = :n ORDER BY "createdAt" DESC'
+    ),
+    'latest_payments_page': (
+        'SELECT * FROM payments ORDER BY "createdAt" DESC LIMIT 50'
+    ),
+}
+
+STATUSES = ['PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELLED']
+
+
+def populate(engine, rows: int, chunk: int = 50_000) -> None:
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        for offset in range(0, rows, chunk):
+            size = min(chunk, rows - offset)
+            connection.execute(text(
+                'INSERT INTO orders ("orderNumber", "tableNumber", quantity, description, '
+                '"codGruEst", "productCode") VALUES (:o, :t, :q, :d, :g, :p)'
+            ), [
+                {'o': (offset + i) // 3 + 1, 't': rng.randint(1, 60), 'q': rng.randint(1, 5),
+                 'd': 'Produto', 'g': 100, 'p': rng.randint(100, 300)}
+                for i in range(size)
+            ])
+            connection.execute(text(
+                'INSERT INTO payments ("orderNumber", amount, "paymentMethod", status, "createdAt") '
+                'VALUES (:o, :a, :m, :s, :c)'
+            ), [
+                {'o': offset + i + 1, 'a': 10.0, 'm': 'PIX', 's': rng.choice(STATUSES),
+                 'c': start + timedelta(seconds=offset + i)}
+                for i in range(size)
+            ])
+
+
+def measure(engine, rows: int, samples: int) -> dict[str, dict[str, float]]:
+    rng = random.Random(7)
+    order_numbers = [rng.randint(1, rows // 3) for _ in range(samples)]
+    results: dict[str, dict[str, float]] = {}
+    with engine.connect() as connection:
+        for name, sql in QUERIES.items():
+            timings = []
+            for n in order_numbers:
+                began = time.perf_counter()
+                connection.execute(text(sql), {'n': n}).all()
+                timings.append((time.perf_counter() - began) * 1000)
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(statistics.quantiles(timings, n=20)[-1], 3),
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--samples', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_engine(f"sqlite:///{Path(tmpdir) / 'bench.db'}")
+        populate(engine, args.rows)
+        before = measure(engine, args.rows, args.samples)
+        began = time.perf_counter()
+        run_migrations(engine)
+        migration_seconds = time.perf_counter() - began
+        after = measure(engine, args.rows, args.samples)
+        engine.dispose()
+
+    report = {
+        'rows': args.rows,
+        'migration_seconds': round(migration_seconds, 2),
+        'queries': {
+            name: {
+                'before': before[name],
+                'after': after[name],
+                'speedup_p50': round(before[name]['p50_ms'] / max(after[name]['p50_ms'], 1e-6), 1),
+            }
+            for name in QUERIES
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Caminho com modelos Pydantic por linha vs. tuplas serializadas direto.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.bench_serialization --sizes 10 1000 100000
+
+Monta uma aplicação com as duas versões de ``GET /payment/order/{n}``: a
+antiga (ORM + ``model_validate`` + ``response_model``) e a atual (colunas +
+``serialization.dumps``), popula um SQLite temporário e mede a latência
+ponta a ponta de cada uma pelo TestClient.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+def build_app():
+    from fastapi import FastAPI
+
+    from src.payments.model import PaymentResponse
+    from src.payments.service import get_payments_by_order_json_service, get_payments_by_order_service
+    from src.serialization import json_response
+
+    app = FastAPI()
+
+    @app.get('/model/{order_number}', response_model=list[PaymentResponse])
+    def model_path(order_number: int) -> list[PaymentResponse]:
+        return get_payments_by_order_service(order_number)
+
+    @app.get('/fast/{order_number}', response_model=list[PaymentResponse])
+    def fast_path(order_number: int):
+        return json_response(get_payments_by_order_json_service(order_number))
+
+    return app
+
+
+def populate(engine, sizes: list[int]) -> None:
+    from sqlalchemy import insert
+
+    from src.payments.model import PaymentModel
+
+    base = datetime(2026, 1, 1)
+    with engine.begin() as connection:
+        for order_number, size in enumerate(sizes, start=1):
+            rows = [
+                {
+                    'orderNumber': order_number,
+                    'amount': 10.0 + i % 100,
+                    'paymentMethod': 'PIX',
+                    'status': 'COMPLETED',
+                    'transactionId': f'tx-{order_number}-{i}',
+                    'createdAt': base + timedelta(seconds=i),
+                }
+                for i in range(size)
+            ]
+            connection.execute(insert(PaymentModel), rows)
+
+
+def measure(client, path: str, repeats: int) -> list[float]:
+    client.get(path)  # aquece caches de compilação do SQLAlchemy
+    samples = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        response = client.get(path)
+        samples.append((time.perf_counter() - began) * 1000)
+        response.raise_for_status()
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 1000, 100_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{Path(tmpdir) / 'bench.db'}"
+        os.environ.setdefault('SQLALCHEMY_ECHO', '0')
+
+        from fastapi.testclient import TestClient
+
+        from src.migrations import run_migrations
+        from src.orders.database import engine
+        from src.serialization import orjson
+
+        run_migrations(engine)
+        populate(engine, args.sizes)
+
+        results = []
+        with TestClient(build_app()) as client:
+            for order_number, size in enumerate(args.sizes, start=1):
+                repeats = max(5, min(200, 200_000 // size))
+                row = {'rows': size, 'repeats': repeats}
+                for name in ('model', 'fast'):
+                    samples = measure(client, f'/{name}/{order_number}', repeats)
+                    row[f'{name}_p50_ms'] = round(statistics.median(samples), 2)
+                row['speedup'] = round(row['model_p50_ms'] / row['fast_p50_ms'], 2)
+                results.append(row)
+        engine.dispose()
+
+    print(json.dumps({'encoder': 'orjson' if orjson else 'json', 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
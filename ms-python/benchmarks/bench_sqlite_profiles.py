@@ -0,0 +1,86 @@
+"""Escritas concorrentes no SQLite com cada perfil de DB_PROFILE.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.bench_sqlite_profiles --threads 16 --writes 200
+
+Cada thread simula o caminho de create_payment_service: abre uma sessão,
+consulta, insere e faz commit. Mede vazão, latência e quantas escritas
+falharam com "database is locked".
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.migrations import run_migrations
+from src.orders.database import SQLITE_PROFILES, create_database_engine
+from src.payments.model import PaymentModel
+
+
+def run_profile(profile: str, threads: int, writes: int) -> dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        engine = create_database_engine(f"sqlite:///{Path(tmpdir) / 'bench.db'}", profile=profile, echo=False)
+        run_migrations(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        latencies: list[float] = []
+        locked = 0
+        lock = threading.Lock()
+
+        def worker(worker_id: int) -> None:
+            nonlocal locked
+            local_latencies = []
+            local_locked = 0
+            for i in range(writes):
+                began = time.perf_counter()
+                try:
+                    with session_factory() as session:
+                        session.scalar(select(PaymentModel.id).where(PaymentModel.orderNumber == worker_id))
+                        session.add(PaymentModel(orderNumber=worker_id * writes + i, amount=10.0, paymentMethod='PIX'))
+                        session.commit()
+                except OperationalError:
+                    local_locked += 1
+                local_latencies.append((time.perf_counter() - began) * 1000)
+            with lock:
+                latencies.extend(local_latencies)
+                locked += local_locked
+
+        began = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        engine.dispose()
+
+    total = threads * writes
+    return {
+        'profile': profile,
+        'writes': total,
+        'locked_errors': locked,
+        'writes_per_second': round((total - locked) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p99_ms': round(statistics.quantiles(latencies, n=100)[-1], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--profiles', nargs='+', default=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(json.dumps([run_profile(p, args.threads, args.writes) for p in args.profiles], indent=2))
+
+
+if __name__ == '__main__':
+    main()
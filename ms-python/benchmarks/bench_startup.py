@@ -0,0 +1,122 @@
+"""Partida a frio do serviço: importação, bind da porta e prontidão.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.bench_startup --runs 5
+
+Sobe ``python main.py`` em um banco SQLite novo a cada rodada e mede:
+
+- ``import_s``: ``python -c "import main"`` isolado;
+- ``first_response_s``: do início do processo até a primeira resposta HTTP
+  em ``/health/live`` (a porta já aceita conexões);
+- ``ready_s``: até ``/health/ready`` (``--ready-path``) responder 200.
+
+O Consul simulado aceita conexões e nunca responde, como um agente
+inalcançável em uma rede sem saída; ``--consul`` troca o endereço.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def silent_consul() -> socket.socket:
+    """Socket que completa o handshake TCP e não responde nada."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(64)
+    return server
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env: dict[str, str]) -> float:
+    began = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import main'], cwd=PROJECT_ROOT, env=env, check=True)
+    return time.perf_counter() - began
+
+
+def measure_boot(env: dict[str, str], timeout: float, ready_path: str) -> dict[str, float | None]:
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    began = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'main.py'], cwd=PROJECT_ROOT, env={**env, 'PORT': str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_response = ready = None
+    try:
+        while time.perf_counter() - began < timeout and ready is None:
+            try:
+                if first_response is None:
+                    httpx.get(f'{base_url}/health/live', timeout=1)
+                    first_response = time.perf_counter() - began
+                if httpx.get(f'{base_url}{ready_path}', timeout=1).status_code == 200:
+                    ready = time.perf_counter() - began
+            except httpx.HTTPError:
+                time.sleep(0.02)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {'first_response_s': first_response, 'ready_s': ready}
+
+
+def median(values: list[float | None]) -> float | None:
+    measured = [value for value in values if value is not None]
+    return round(statistics.median(measured), 3) if measured else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--ready-path', default='/health/ready', help='rota que indica prontidão')
+    parser.add_argument('--consul', help='endereço do Consul (padrão: um socket local que nunca responde)')
+    args = parser.parse_args()
+
+    consul = None if args.consul else silent_consul()
+    consul_addr = args.consul or f'http://127.0.0.1:{consul.getsockname()[1]}'
+    imports, boots = [], []
+    try:
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                env = {
+                    **os.environ,
+                    'DATABASE_URL': f"sqlite:///{Path(tmpdir) / 'startup.db'}",
+                    'CONSUL_HTTP_ADDR': consul_addr,
+                    'SQLALCHEMY_ECHO': '0',
+                }
+                env.pop('SERVICE_ADDRESS', None)
+                imports.append(measure_import(env))
+                boots.append(measure_boot(env, args.timeout, args.ready_path))
+    finally:
+        if consul is not None:
+            consul.close()
+
+    print(json.dumps({
+        'runs': args.runs,
+        'import_s': median(imports),
+        'first_response_s': median([boot['first_response_s'] for boot in boots]),
+        'ready_s': median([boot['ready_s'] for boot in boots]),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Consul e catálogo (gateway → ms-kotlin) falsos para os testes de carga.
+
+Os dois rodam em threads do próprio processo do benchmark, em portas livres,
+e respondem só às rotas que o ms-python usa:
+
+- ``FakeConsul``: ``/v1/health/service/<nome>`` (inclusive consultas
+  bloqueantes com ``index``/``wait``) e o registro/remoção de serviços.
+- ``FakeCatalog``: ``/ms-kotlin/produto/codigo/<código>`` para os códigos
+  ``1..products``, com latência (``latency`` ± ``jitter``, em segundos) e
+  uma fração ``error_rate`` de respostas 503 injetadas de forma determinística
+  a partir de ``seed``. ``/ms-kotlin/produto`` devolve a listagem completa
+  (formato ``ProdutoResponseBusca``) com ``ETag``, respondendo 304 a
+  ``If-None-Match`` igual, para a réplica do catálogo.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+
+def product_fixture(code: int) -> dict[str, Any]:
+    return {
+        "id": code,
+        "codigoProduto": code,
+        "descricao": f"Produto {code}",
+        "preco": round(5 + (code % 20) * 2.5, 2),
+        "codGruEst": 100 + code % 10,
+    }
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como o gateway real
+
+    def send_json(self, status: int, payload: Any, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # O serviço encerrou a conexão (ex.: consulta bloqueante ao parar o app).
+            self.close_connection = True
+
+    def log_message(self, format, *args):  # noqa: A003 - método da stdlib
+        return
+
+
+class _FakeServer:
+    handler: type[_QuietHandler]
+
+    def __init__(self) -> None:
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        owner = self
+        handler = type(self.handler.__name__, (self.handler,), {"owner": owner})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class _CatalogHandler(_QuietHandler):
+    owner: "FakeCatalog"
+
+    def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
+        prefix = "/ms-kotlin/produto/codigo/"
+        if self.path == "/ms-kotlin/produto":
+            etag, payload = self.owner.listing()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_json(200, payload, {"ETag": etag})
+            return
+        if not self.path.startswith(prefix):
+            self.send_json(404, {"message": "Rota não encontrada"})
+            return
+        status, payload = self.owner.lookup(self.path[len(prefix):])
+        self.send_json(status, payload)
+
+
+class FakeCatalog(_FakeServer):
+    handler = _CatalogHandler
+
+    def __init__(
+        self,
+        products: int = 100,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 42,
+    ) -> None:
+        super().__init__()
+        self.products = products
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.listings = 0
+
+    def lookup(self, raw_code: str) -> tuple[int, Any]:
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return 503, {"message": "Falha injetada"}
+        try:
+            code = int(raw_code)
+        except ValueError:
+            return 400, {"message": "Código inválido"}
+        if not 1 <= code <= self.products:
+            return 404, {"message": "Produto não encontrado"}
+        return 200, product_fixture(code)
+
+    def listing(self) -> tuple[str, list[dict[str, Any]]]:
+        with self._lock:
+            self.listings += 1
+        payload = []
+        for code in range(1, self.products + 1):
+            product = product_fixture(code)
+            product["cod"] = product["codGruEst"]
+            product["codGruEst"] = f"Grupo {product['cod']}"
+            payload.append(product)
+        return f'"{self.products}"', payload
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "listings": self.listings,
+            "injected_errors": self.errors,
+            "latency_ms": self.latency * 1000,
+            "jitter_ms": self.jitter * 1000,
+            "error_rate": self.error_rate,
+        }
+
+
+class _ConsulHandler(_QuietHandler):
+    owner: "FakeConsul"
+
+    def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
+        url = urlparse(self.path)
+        prefix = "/v1/health/service/"
+        if not url.path.startswith(prefix):
+            self.send_json(404, {"message": "Rota não encontrada"})
+            return
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        index, entries = self.owner.health(url.path[len(prefix):], params)
+        self.send_json(200, entries, {"X-Consul-Index": str(index)})
+
+    def do_PUT(self):  # noqa: N802 - assinatura definida pela stdlib
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_json(200, True)
+
+
+class FakeConsul(_FakeServer):
+    """Serviços fixos (``nome -> [url, ...]``); consultas bloqueantes esperam até ``max_wait``."""
+
+    handler = _ConsulHandler
+
+    def __init__(self, services: dict[str, list[str]] | None = None, max_wait: float = 5.0) -> None:
+        super().__init__()
+        self.services = dict(services or {})
+        self.max_wait = max_wait
+        self.index = 1
+        self._changed = threading.Condition()
+
+    def set_service(self, name: str, urls: list[str]) -> None:
+        with self._changed:
+            self.services[name] = list(urls)
+            self.index += 1
+            self._changed.notify_all()
+
+    def health(self, name: str, params: dict[str, str]) -> tuple[int, list[dict[str, Any]]]:
+        with self._changed:
+            requested = int(params.get("index") or 0)
+            if requested and requested == self.index:
+                self._changed.wait_for(lambda: self.index != requested, self.max_wait)
+            entries = []
+            for url in self.services.get(name, []):
+                parsed = urlparse(url)
+                entries.append({
+                    "Node": {"Address": parsed.hostname},
+                    "Service": {"Service": name, "Address": parsed.hostname, "Port": parsed.port},
+                })
+            return self.index, entries
+
+    def stop(self) -> None:
+        with self._changed:
+            # Libera as consultas bloqueantes pendentes.
+            self.index += 1
+            self._changed.notify_all()
+        super().stop()
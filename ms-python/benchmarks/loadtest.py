@@ -0,0 +1,373 @@
+"""Teste de carga do ms-python com Consul e catálogo falsos.
+
+Uso (a partir de ms-python/):
+
+    python -m benchmarks.loadtest --profiles sync async --workloads mixed --concurrency 1 16 64
+    python -m benchmarks.loadtest --catalog-latency-ms 20 --catalog-error-rate 0.05 --output run.json
+    python -m benchmarks.loadtest --profiles async --env CATALOG_HEDGE_DELAY=0.01 --workers 4
+
+Para cada perfil (variáveis de ambiente do serviço, ver ``PROFILES``) sobe o
+app com uvicorn em um banco novo, o ``FakeConsul`` apontando o
+``api-gateway`` para o ``FakeCatalog`` e semeia pedidos e pagamentos. Em
+seguida, para cada carga e nível de concorrência, mantém ``concurrency``
+clientes em laço fechado durante ``--duration`` segundos (após
+``--warmup``) e mede vazão e latência por operação.
+
+A saída é um JSON com os metadados da execução (commit, perfis, parâmetros
+do catálogo) e uma linha por perfil × carga × concorrência, para comparar
+commits. ``--database-url`` aponta para outro banco (ex.: PostgreSQL); nesse
+caso o banco não é recriado entre perfis.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fakes import FakeCatalog, FakeConsul
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Ambiente do serviço por perfil; --env acrescenta ou sobrescreve variáveis.
+PROFILES: dict[str, dict[str, str]] = {
+    'sync': {},
+    'sync-performance': {'DB_PROFILE': 'performance'},
+    'async': {'ASYNC_MODE': 'true'},
+    'async-performance': {'ASYNC_MODE': 'true', 'DB_PROFILE': 'performance'},
+}
+
+# Peso de cada operação em cada carga.
+WORKLOADS: dict[str, dict[str, int]] = {
+    'orders': {'create_order': 1},
+    'payments': {'create_payment': 1},
+    'reads': {'read_order': 3, 'read_payments': 1, 'table_summary': 1},
+    'mixed': {'create_order': 2, 'create_payment': 1, 'read_order': 4, 'read_payments': 2, 'table_summary': 1},
+}
+
+TABLES = 50
+
+
+@dataclass
+class RunState:
+    """Pedidos conhecidos pelo gerador de carga, compartilhados pelos clientes."""
+
+    products: int
+    orders: list[int] = field(default_factory=list)
+    tables: list[int] = field(default_factory=list)
+    unpaid: deque = field(default_factory=deque)
+
+
+@dataclass
+class Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    statuses: dict[str, int] = field(default_factory=dict)
+
+    def add(self, operation: str, elapsed_ms: float, status: int | None) -> None:
+        self.latencies.setdefault(operation, []).append(elapsed_ms)
+        key = str(status) if status is not None else 'transport_error'
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return round(ordered[rank], 3)
+
+
+def summarize(values: list[float], errors: int, elapsed: float) -> dict[str, object]:
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'rps': round(len(values) / elapsed, 1) if elapsed else None,
+        'p50_ms': percentile(values, 50),
+        'p95_ms': percentile(values, 95),
+        'p99_ms': percentile(values, 99),
+    }
+
+
+async def create_order(client: httpx.AsyncClient, state: RunState, rng: random.Random) -> tuple[str, httpx.Response]:
+    payload = {
+        'productCode': rng.randint(1, state.products),
+        'tableNumber': rng.randint(1, TABLES),
+        'quantity': rng.randint(1, 4),
+    }
+    response = await client.post('/order/', json=payload)
+    if response.status_code == 201:
+        created = response.json()
+        state.orders.append(created['orderNumber'])
+        if created['tableNumber'] not in state.tables:
+            state.tables.append(created['tableNumber'])
+        state.unpaid.append((created['orderNumber'], created['lineTotal']))
+    return 'create_order', response
+
+
+async def create_payment(client: httpx.AsyncClient, state: RunState, rng: random.Random) -> tuple[str, httpx.Response]:
+    if not state.unpaid:
+        # Sem pedido em aberto: cria um, contabilizado como create_order.
+        return await create_order(client, state, rng)
+    order_number, amount = state.unpaid.popleft()
+    payload = {'orderNumber': order_number, 'amount': amount, 'paymentMethod': rng.choice(['PIX', 'CREDIT_CARD'])}
+    return 'create_payment', await client.post('/payment/', json=payload)
+
+
+async def read_order(client: httpx.AsyncClient, state: RunState, rng: random.Random) -> tuple[str, httpx.Response]:
+    return 'read_order', await client.get(f'/order/{rng.choice(state.orders)}')
+
+
+async def read_payments(client: httpx.AsyncClient, state: RunState, rng: random.Random) -> tuple[str, httpx.Response]:
+    return 'read_payments', await client.get(f'/payment/order/{rng.choice(state.orders)}')
+
+
+async def table_summary(client: httpx.AsyncClient, state: RunState, rng: random.Random) -> tuple[str, httpx.Response]:
+    return 'table_summary', await client.get(f'/order/table/{rng.choice(state.tables)}/summary')
+
+
+OPERATIONS = {
+    'create_order': create_order,
+    'create_payment': create_payment,
+    'read_order': read_order,
+    'read_payments': read_payments,
+    'table_summary': table_summary,
+}
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    state: RunState,
+    weights: dict[str, int],
+    deadline: float,
+    recorder: Recorder | None,
+    seed: int,
+) -> None:
+    rng = random.Random(seed)
+    names, counts = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        operation = OPERATIONS[rng.choices(names, counts)[0]]
+        began = time.perf_counter()
+        try:
+            name, response = await operation(client, state, rng)
+            status = response.status_code
+        except httpx.HTTPError:
+            name, status = operation.__name__, None
+        if recorder is not None:
+            recorder.add(name, (time.perf_counter() - began) * 1000, status)
+
+
+async def run_load(
+    base_url: str,
+    state: RunState,
+    workload: str,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict[str, object]:
+    weights = WORKLOADS[workload]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        if warmup:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(
+                client_loop(client, state, weights, deadline, None, seed + n) for n in range(concurrency)
+            ))
+        recorder = Recorder()
+        began = time.perf_counter()
+        deadline = began + duration
+        await asyncio.gather(*(
+            client_loop(client, state, weights, deadline, recorder, seed + 1000 + n) for n in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - began
+
+    all_latencies = [value for values in recorder.latencies.values() for value in values]
+    result: dict[str, object] = {
+        'workload': workload,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        **summarize(all_latencies, sum(recorder.errors.values()), elapsed),
+        'statuses': dict(sorted(recorder.statuses.items())),
+        'operations': {
+            name: summarize(values, recorder.errors.get(name, 0), elapsed)
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+    return result
+
+
+async def seed_data(base_url: str, state: RunState, orders: int, seed: int) -> None:
+    """Pedidos para as leituras, metade deles já pagos."""
+    rng = random.Random(seed)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for i in range(orders):
+            await create_order(client, state, rng)
+            if i % 2 == 0:
+                await create_payment(client, state, rng)
+    if not state.orders:
+        raise RuntimeError("Nenhum pedido criado na carga inicial; veja o log do serviço")
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_healthy(base_url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O serviço terminou ao subir (código {process.returncode})")
+        try:
+            if httpx.get(f'{base_url}/health', timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("O serviço não respondeu em /health a tempo")
+
+
+def service_environment(profile: str, database_url: str, consul_url: str, overrides: dict[str, str]) -> dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'CONSUL_HTTP_ADDR': consul_url,
+        'GATEWAY_SERVICE_NAME': 'api-gateway',
+        'SQLALCHEMY_ECHO': '0',
+        'METRICS_ENABLED': 'false',
+        'OUTBOX_DISPATCHER': 'false',
+    })
+    env.update(PROFILES[profile])
+    env.update(overrides)
+    return env
+
+
+def run_profile(profile: str, args: argparse.Namespace, consul: FakeConsul, overrides: dict[str, str]) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database_url = args.database_url or f"sqlite:///{Path(tmpdir) / 'loadtest.db'}"
+        env = service_environment(profile, database_url, consul.url, overrides)
+        subprocess.run([sys.executable, '-m', 'src.migrations'], cwd=PROJECT_ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        command = [
+            sys.executable, '-m', 'uvicorn', 'main:create_app', '--factory',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log',
+        ]
+        process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+        try:
+            wait_until_healthy(base_url, process)
+            state = RunState(products=args.products)
+            asyncio.run(seed_data(base_url, state, args.seed_orders, args.seed))
+            rows = []
+            for workload in args.workloads:
+                for concurrency in args.concurrency:
+                    row = asyncio.run(run_load(
+                        base_url, state, workload, concurrency, args.duration, args.warmup, args.seed
+                    ))
+                    rows.append({'profile': profile, **row})
+                    print(
+                        f"{profile:>18} {workload:>8} c={concurrency:<4} "
+                        f"{row['rps']} req/s p50={row['p50_ms']}ms p99={row['p99_ms']}ms errors={row['errors']}",
+                        file=sys.stderr,
+                    )
+            return rows
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_env(values: list[str]) -> dict[str, str]:
+    overrides = {}
+    for value in values:
+        name, separator, setting = value.partition('=')
+        if not separator:
+            raise SystemExit(f"--env espera NOME=VALOR, recebido: {value}")
+        overrides[name] = setting
+    return overrides
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=['sync', 'async'])
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=['mixed'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=10, help='segundos medidos por nível')
+    parser.add_argument('--warmup', type=float, default=2, help='segundos descartados antes de cada nível')
+    parser.add_argument('--workers', type=int, default=1, help='workers do uvicorn')
+    parser.add_argument('--seed-orders', type=int, default=200)
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--catalog-latency-ms', type=float, default=5)
+    parser.add_argument('--catalog-jitter-ms', type=float, default=2)
+    parser.add_argument('--catalog-error-rate', type=float, default=0.0)
+    parser.add_argument('--database-url', help='banco externo (o padrão é um SQLite novo por perfil)')
+    parser.add_argument('--env', action='append', default=[], metavar='NOME=VALOR',
+                        help='variável extra para o serviço (pode repetir)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='também grava o JSON neste arquivo')
+    args = parser.parse_args()
+    overrides = parse_env(args.env)
+
+    catalog = FakeCatalog(
+        products=args.products,
+        latency=args.catalog_latency_ms / 1000,
+        jitter=args.catalog_jitter_ms / 1000,
+        error_rate=args.catalog_error_rate,
+        seed=args.seed,
+    )
+    with catalog, FakeConsul() as consul:
+        consul.set_service('api-gateway', [catalog.url])
+        results = []
+        for profile in args.profiles:
+            results.extend(run_profile(profile, args, consul, overrides))
+        catalog_stats = catalog.stats()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'startedAt': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'workers': args.workers,
+            'profiles': {name: {**PROFILES[name], **overrides} for name in args.profiles},
+            'database': 'external' if args.database_url else 'sqlite',
+            'catalog': catalog_stats,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
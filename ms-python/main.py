@@ -1,19 +1,35 @@
-import atexit, os, socket, time, requests
-import uvicorn
-import uuid
-from fastapi import FastAPI
-from fastapi.openapi.docs import get_swagger_ui_html
-from fastapi.responses import PlainTextResponse, RedirectResponse
+import atexit, os, socket, threading, time, requests
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from src import metrics
+from src.events.controller import router as events_router
+from src.events.service import outbox_dispatcher
+from src.idempotency import IdempotencyMiddleware, IdempotencyStore
 from src.orders.controller import router as orders_router
-from src.orders.model import table_registry
 from src.payments.controller import router as payments_router
-from src.payments.model import table_registry as payments_table_registry
+from src.response_cache import response_cache
+from src.orders.service import (
+    async_product_client,
+    catalog_flight,
+    catalog_replica,
+    gateway_discovery,
+    product_cache,
+    start_catalog_replica_service,
+    warm_product_cache_service,
+)
+from src.startup import StartupTasks
+from src.storage import storage, writer
 
 
 CONSUL = os.getenv("CONSUL_HTTP_ADDR", "http://localhost:8500")
 SERVICE_NAME = "ms-python"
 SERVICE_ID = f"{SERVICE_NAME}-instance"  # ID consistente para permitir re-registro
 API_ROOT = ""
+# Entrega dos eventos aos webhooks de OUTBOX_WEBHOOKS a partir de cada worker
+# (o lease por assinante evita envios duplicados entre eles).
+OUTBOX_DISPATCHER = os.getenv("OUTBOX_DISPATCHER", "true").lower() in {"1", "true", "yes", "on"}
+CONSUL_REGISTER = os.getenv("CONSUL_REGISTER", "true").lower() in {"1", "true", "yes", "on"}
 
 
 def get_outbound_ip() -> str:
@@ -59,55 +75,181 @@ def find_free_port() -> int:
         return s.getsockname()[1]
 
 
-app = FastAPI(
-    docs_url=None,
-    openapi_url=f"{API_ROOT}/openapi.json",
-    redoc_url=None,
-    title="ms-python",
-)
+def migrate() -> None:
+    # Import adiado: as migrações só são carregadas na inicialização.
+    from src.migrations import run_migrations
+
+    # Com PAYMENTS_DATABASE_URL, cada primário recebe o esquema completo.
+    for engine in storage.primary_engines():
+        run_migrations(engine)
+
+
+def wait_for_migrations() -> None:
+    from src.migrations import pending_versions
+
+    for engine in storage.primary_engines():
+        pending = pending_versions(engine)
+        if pending:
+            # A tarefa de inicialização tenta de novo com backoff.
+            raise RuntimeError(f"Migrações pendentes: {pending}")
 
-app.include_router(orders_router, prefix=API_ROOT)
-app.include_router(payments_router, prefix=API_ROOT)
 
+def prepare_database() -> None:
+    # serve() aplica as migrações uma única vez no processo principal e
+    # desliga MIGRATE_ON_STARTUP para os workers, que só esperam o esquema.
+    # Sem serve() (testes, uvicorn direto com um worker), o próprio lifespan migra.
+    if os.getenv("MIGRATE_ON_STARTUP", "true").lower() in {"1", "true", "yes", "on"}:
+        migrate()
+    else:
+        wait_for_migrations()
+    # A limpeza do outbox roda sempre; a entrega só com OUTBOX_DISPATCHER.
+    outbox_dispatcher.start(deliver=OUTBOX_DISPATCHER)
 
-@app.get("/", include_in_schema=False)
-def swagger_ui():
-    return get_swagger_ui_html(
-        openapi_url="/openapi.json",
-        title="ms-python - Swagger UI",
+
+def register_service() -> None:
+    register(os.getenv("SERVICE_ADDRESS") or get_outbound_ip(), int(os.environ["PORT"]))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Executado em cada worker, sem bloquear o bind da porta: as tarefas rodam
+    # em segundo plano e /health/ready só responde 200 depois das migrações.
+    startup = StartupTasks()
+    app.state.startup = startup
+    startup.add("database", prepare_database)
+    if catalog_replica.enabled:
+        # A réplica já traz o catálogo inteiro; o aquecimento do cache seria redundante.
+        startup.add("catalog", start_catalog_replica_service, required=False, max_attempts=3)
+    else:
+        startup.add("catalog", warm_product_cache_service, required=False, requires=("database",), max_attempts=3)
+    # PORT é definida por serve(); sem ela (testes, uvicorn direto) não há o que registrar.
+    if CONSUL_REGISTER and os.getenv("PORT", "0") != "0":
+        startup.add("consul", register_service, required=False)
+    yield
+    await startup.cancel()
+    # Grava as inserções ainda na fila do commit em grupo antes de fechar os engines.
+    writer.stop()
+    outbox_dispatcher.stop()
+    # Encerra o acompanhamento do Consul e a atualização da réplica, libera o
+    # pool keep-alive do catálogo e as conexões dos engines assíncronos
+    gateway_discovery.stop()
+    catalog_replica.stop()
+    await async_product_client.aclose()
+    await storage.dispose()
+
+
+def create_app() -> FastAPI:
+    """Fábrica da aplicação, importável pelos workers (uvicorn main:create_app --factory)."""
+    app = FastAPI(
+        lifespan=lifespan,
+        docs_url=None,
+        openapi_url=f"{API_ROOT}/openapi.json",
+        redoc_url=None,
+        title="ms-python",
     )
 
-@app.get("/health")
-def health(): return {"status": "UP"}
+    app.include_router(orders_router, prefix=API_ROOT)
+    app.include_router(payments_router, prefix=API_ROOT)
+    app.include_router(events_router, prefix=API_ROOT)
 
-@app.get("/api/mensagem", response_class=PlainTextResponse)
-def mensagem(nome: str = "desenvolvedor"):
-    return f"Olá, {nome}! (ms-python)"
+    engine = storage.orders.primary
 
+    # POSTs repetidos com a mesma Idempotency-Key devolvem a resposta original.
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=IdempotencyStore(engine),
+        routes={
+            ("POST", f"{API_ROOT}/order/"),
+            ("POST", f"{API_ROOT}/order/batch"),
+            ("POST", f"{API_ROOT}/payment/"),
+        },
+    )
 
-def register(addr: str, port: int):
-    # Tentar deregistrar qualquer registro anterior primeiro
-    deregister()
+    if metrics.metrics_enabled:
+        app.add_middleware(metrics.MetricsMiddleware)
+        metrics.instrument_sessions()
+        metrics.instrument_engine("sync", engine)
+        metrics.instrument_engine("async", storage.orders.async_primary.sync_engine)
+        for name, extra in storage.engines().items():
+            if extra is not engine:
+                metrics.instrument_engine(name, extra)
+
+        @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+        async def prometheus_metrics():
+            metrics.collect_threadpool()
+            return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/", include_in_schema=False)
+    def swagger_ui():
+        from fastapi.openapi.docs import get_swagger_ui_html
+
+        return get_swagger_ui_html(
+            openapi_url="/openapi.json",
+            title="ms-python - Swagger UI",
+        )
+
+    @app.get("/health/live")
+    def liveness(): return {"status": "UP"}
+
+    @app.get("/health/ready")
+    @app.get("/health")
+    def readiness(request: Request):
+        startup: StartupTasks | None = getattr(request.app.state, "startup", None)
+        if startup is None:  # lifespan não executado
+            return JSONResponse({"status": "DOWN", "checks": {}}, status_code=503)
+        snapshot = startup.snapshot()
+        return JSONResponse(snapshot, status_code=200 if startup.ready else 503)
+
+    @app.get("/cache/products/stats", include_in_schema=False)
+    def product_cache_stats(): return product_cache.stats()
+
+    @app.get("/cache/catalog/stats", include_in_schema=False)
+    def catalog_replica_stats(): return catalog_replica.stats()
+
+    @app.get("/cache/responses/stats", include_in_schema=False)
+    def response_cache_stats(): return response_cache.stats()
+
+    @app.get("/cache/singleflight/stats", include_in_schema=False)
+    def singleflight_stats():
+        return {flight.name: flight.stats() for flight in (catalog_flight, response_cache.loads)}
+
+    @app.get("/cache/gateway/instances", include_in_schema=False)
+    def gateway_instances(): return gateway_discovery.snapshot()
 
+    @app.delete("/cache/products/{product_code}", status_code=204, include_in_schema=False)
+    def invalidate_cached_product(product_code: int): product_cache.invalidate(product_code)
+
+    @app.get("/api/mensagem", response_class=PlainTextResponse)
+    def mensagem(nome: str = "desenvolvedor"):
+        return f"Olá, {nome}! (ms-python)"
+
+    return app
+
+
+app = create_app()
+
+
+def register(addr: str, port: int):
+    # Mesmo ID em todos os workers: registrar de novo só atualiza o serviço.
+    # A verificação usa a prontidão, então o Consul só envia tráfego depois
+    # das migrações.
     payload = {
         "ID": SERVICE_ID,
         "Name": SERVICE_NAME,
         "Address": addr,
         "Port": port,
         "Check": {
-            "HTTP": f"http://{addr}:{port}/health",
+            "HTTP": f"http://{addr}:{port}/health/ready",
             "Interval": "10s",
             "Timeout": "2s"
         }
     }
     print(f"Registering service {SERVICE_NAME} at {addr}:{port} with Consul at {CONSUL}")
-    try:
-        response = requests.put(f"{CONSUL}/v1/agent/service/register", json=payload, timeout=3)
-        print(f"Registration response: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Registration failed: {response.text}")
-    except Exception as e:
-        print(f"Registration error: {e}")
+    response = requests.put(f"{CONSUL}/v1/agent/service/register", json=payload, timeout=3)
+    print(f"Registration response: {response.status_code}")
+    if response.status_code != 200:
+        # A tarefa de inicialização tenta de novo com backoff.
+        raise RuntimeError(f"Registration failed: {response.status_code} {response.text}")
 
 def deregister():
     try:
@@ -116,8 +258,30 @@ def deregister():
 
 
 
-if __name__ == "__main__":
-    addr = os.getenv("SERVICE_ADDRESS") or get_outbound_ip()
+def migrate_in_background() -> threading.Thread:
+    """Aplica as migrações no processo principal, sem segurar o bind dos workers."""
+    def run() -> None:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                migrate()
+                break
+            except Exception as exc:  # banco ainda subindo: tenta de novo, como as tarefas de inicialização
+                print(f"Migrations failed (attempt {attempt}): {exc}")
+                time.sleep(min(30.0, 0.5 * 2 ** (attempt - 1)))
+        # Os workers abrem as próprias conexões.
+        for engine in storage.primary_engines():
+            engine.dispose()
+
+    thread = threading.Thread(target=run, name="migrations", daemon=True)
+    thread.start()
+    return thread
+
+
+def serve() -> None:
+    import uvicorn
+
     port_env = os.getenv("PORT", "0")
     try:
         port = int(port_env)
@@ -125,12 +289,24 @@ if __name__ == "__main__":
         port = 0
     if port == 0:
         port = find_free_port()
-    for _ in range(10):
-        try:
-            register(addr, port); break
-        except Exception: time.sleep(1)
+    try:
+        workers = max(1, int(os.getenv("WORKERS", "1")))
+    except ValueError:
+        workers = 1
+
+    # A porta escolhida vai para os workers, que se registram no Consul em
+    # segundo plano; migrações e descoberta do IP também não atrasam o bind.
+    # As migrações rodam uma única vez, aqui; os workers só esperam por elas.
+    os.environ["PORT"] = str(port)
+    os.environ["MIGRATE_ON_STARTUP"] = "false"
     atexit.register(deregister)
-    from src.orders.database import engine
-    table_registry.metadata.create_all(bind=engine)
-    payments_table_registry.metadata.create_all(bind=engine)
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    migrate_in_background()
+
+    if workers > 1:
+        uvicorn.run("main:create_app", factory=True, host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
+
+
+if __name__ == "__main__":
+    serve()
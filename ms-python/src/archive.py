@@ -0,0 +1,368 @@
+"""Arquivamento dos pedidos fechados em arquivos mensais NDJSON compactados.
+
+Um pedido está fechado quando tem ao menos um pagamento ``COMPLETED`` ou
+``CANCELLED`` e nenhum ``PENDING``/``PROCESSING``. Passados
+``ARCHIVE_AFTER_DAYS`` do último movimento dos seus pagamentos, o job
+(``python -m src.archive``, agendado fora do serviço) move os itens e os
+pagamentos do pedido para ``ARCHIVE_DIR/<AAAA-MM>.ndjson.zst``: uma linha por
+pedido, com os itens e os pagamentos, no mês em que ele fechou. Arquivos
+``.ndjson.gz`` de versões anteriores continuam legíveis.
+
+Cada execução acrescenta um frame zstd ao arquivo do mês e, na mesma
+transação que apaga as linhas de ``orders`` e ``payments``, grava os índices
+``archived_orders`` (pedido → mês e posição do frame no arquivo) e
+``archived_payments`` (pagamento → pedido). Uma falha entre a escrita do
+arquivo e o commit só deixa um frame que nenhum índice aponta.
+
+Com ``PAYMENTS_DATABASE_URL``, pedidos e pagamentos estão em bancos
+diferentes e não há uma transação comum. O job então faz dois commits, nesta
+ordem: primeiro os índices e a remoção dos itens (banco dos pedidos), depois
+a remoção dos pagamentos. Se ele cair entre os dois, os pagamentos continuam
+nas tabelas quentes e o pedido continua fechado; a execução seguinte o
+encontra de novo e só conclui a remoção, já que o índice existente (e o frame
+completo para o qual ele aponta) é mantido. Nunca sobram pagamentos
+arquivados com os itens ainda nas tabelas quentes.
+
+As consultas por pedido e por pagamento que não encontram nada nas tabelas
+quentes procuram no índice e descompactam só o frame do pedido (os últimos
+frames lidos ficam em memória). Pedidos indexados sem a posição do frame
+leem o mês inteiro, combinando as linhas repetidas. Pedidos fechados já
+saíram dos resumos das mesas, então arquivá-los não muda os totais.
+"""
+import argparse
+import gzip
+import io
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable
+
+import zstandard
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    case,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from src.dialects import dialect_insert
+from src.orders.model import OrderModel
+from src.payments.model import CLOSING_PAYMENT_STATUSES, OPEN_PAYMENT_STATUSES, PaymentModel
+from src.serialization import dumps, loads, rows_to_dicts
+from src.storage import storage
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', './archive')
+ARCHIVE_AFTER_DAYS = float(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+# Frames (um por execução do job e mês) e meses descompactados mantidos em memória.
+ARCHIVE_CACHED_FRAMES = int(os.getenv('ARCHIVE_CACHED_FRAMES', '64'))
+ARCHIVE_CACHED_MONTHS = int(os.getenv('ARCHIVE_CACHED_MONTHS', '4'))
+
+archive_metadata = MetaData()
+
+archived_orders = Table(
+    'archived_orders',
+    archive_metadata,
+    Column('orderNumber', Integer, primary_key=True, autoincrement=False),
+    Column('month', String, nullable=False),
+    Column('closedAt', DateTime, nullable=False),
+    Column('archivedAt', DateTime, nullable=False),
+    # Frame do pedido dentro do arquivo do mês (NULL nos arquivados antes da versão 8).
+    Column('file', String, nullable=True),
+    Column('frameOffset', Integer, nullable=True),
+    Column('frameLength', Integer, nullable=True),
+)
+
+archived_payments = Table(
+    'archived_payments',
+    archive_metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('orderNumber', Integer, nullable=False),
+    Index('ix_archived_payments_orderNumber', 'orderNumber'),
+)
+
+orders_table = OrderModel.__table__
+payments_table = PaymentModel.__table__
+
+
+@dataclass(frozen=True)
+class ArchiveFrame:
+    """Posição de um frame compactado dentro do arquivo do mês."""
+
+    file: str
+    offset: int
+    length: int
+
+
+class ArchiveStore:
+    """Arquivos ``<mês>.ndjson.zst`` em ``directory``, um registro por pedido."""
+
+    suffix = '.ndjson.zst'
+
+    def __init__(
+        self,
+        directory: str | Path = ARCHIVE_DIR,
+        cached_months: int = ARCHIVE_CACHED_MONTHS,
+        cached_frames: int = ARCHIVE_CACHED_FRAMES,
+    ) -> None:
+        self.directory = Path(directory)
+        self._cached_months = cached_months
+        self._cached_frames = cached_frames
+        self._months: OrderedDict[str, tuple[tuple, dict[int, dict[str, Any]]]] = OrderedDict()
+        self._frames: OrderedDict[ArchiveFrame, dict[int, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _paths(self, month: str) -> list[Path]:
+        return [
+            path for path in (self.directory / f'{month}.ndjson.gz', self.directory / f'{month}{self.suffix}')
+            if path.exists()
+        ]
+
+    def append(self, month: str, records: Iterable[dict[str, Any]]) -> ArchiveFrame:
+        """Acrescenta um frame com ``records`` ao arquivo do mês, com fsync antes de devolver."""
+        payload = b''.join(dumps(record) + b'\n' for record in records)
+        frame = zstandard.ZstdCompressor(level=10).compress(payload)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'{month}{self.suffix}'
+        with open(path, 'ab') as file:
+            offset = file.tell()
+            file.write(frame)
+            file.flush()
+            os.fsync(file.fileno())
+        return ArchiveFrame(path.name, offset, len(frame))
+
+    def _read(self, path: Path) -> bytes:
+        data = path.read_bytes()
+        if path.suffix == '.gz':
+            return gzip.decompress(data)
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        return reader.read()
+
+    def frame(self, frame: ArchiveFrame) -> dict[int, dict[str, Any]]:
+        """Registros de um único frame, por número do pedido, sem ler o resto do mês."""
+        with self._lock:
+            cached = self._frames.get(frame)
+            if cached is not None:
+                self._frames.move_to_end(frame)
+                return cached
+
+        with open(self.directory / frame.file, 'rb') as file:
+            file.seek(frame.offset)
+            data = file.read(frame.length)
+        records = {}
+        for line in zstandard.ZstdDecompressor().decompress(data).splitlines():
+            if line:
+                record = loads(line)
+                records[record['orderNumber']] = record
+
+        with self._lock:
+            self._frames[frame] = records
+            while len(self._frames) > self._cached_frames:
+                self._frames.popitem(last=False)
+        return records
+
+    def month(self, month: str) -> dict[int, dict[str, Any]]:
+        """Registros do mês por número do pedido, já combinados entre frames repetidos."""
+        paths = self._paths(month)
+        # O tamanho dos arquivos muda a cada execução do job e invalida a cópia em memória.
+        signature = tuple((path.name, path.stat().st_size) for path in paths)
+        with self._lock:
+            cached = self._months.get(month)
+            if cached is not None and cached[0] == signature:
+                self._months.move_to_end(month)
+                return cached[1]
+
+        records: dict[int, dict[str, Any]] = {}
+        for path in paths:
+            for line in self._read(path).splitlines():
+                if line:
+                    _merge(records, loads(line))
+
+        with self._lock:
+            self._months[month] = (signature, records)
+            self._months.move_to_end(month)
+            while len(self._months) > self._cached_months:
+                self._months.popitem(last=False)
+        return records
+
+    def find(self, month: str, order_number: int, frame: ArchiveFrame | None = None) -> dict[str, Any] | None:
+        if frame is not None:
+            return self.frame(frame).get(order_number)
+        return self.month(month).get(order_number)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._months.clear()
+            self._frames.clear()
+
+
+def _merge(records: dict[int, dict[str, Any]], record: dict[str, Any]) -> None:
+    current = records.get(record['orderNumber'])
+    if current is None:
+        records[record['orderNumber']] = record
+        return
+    for kind in ('orders', 'payments'):
+        by_id = {row['id']: row for row in current[kind]}
+        by_id.update((row['id'], row) for row in record[kind])
+        current[kind] = sorted(by_id.values(), key=lambda row: row['id'])
+    current['closedAt'] = max(current['closedAt'], record['closedAt'])
+
+
+archive_store = ArchiveStore()
+
+
+def _closed_orders_query(cutoff: datetime, limit: int):
+    last_change = func.max(func.coalesce(PaymentModel.updatedAt, PaymentModel.createdAt))
+    return (
+        select(PaymentModel.orderNumber, last_change.label('closedAt'))
+        .group_by(PaymentModel.orderNumber)
+        .having(
+            func.sum(case((PaymentModel.status.in_(OPEN_PAYMENT_STATUSES), 1), else_=0)) == 0,
+            func.sum(case((PaymentModel.status.in_(CLOSING_PAYMENT_STATUSES), 1), else_=0)) > 0,
+            last_change < cutoff,
+        )
+        .order_by(PaymentModel.orderNumber)
+        .limit(limit)
+    )
+
+
+def _rows(session: Session, table: Table, order_numbers: list[int]) -> dict[int, list[dict[str, Any]]]:
+    result = session.execute(
+        select(table).where(table.c.orderNumber.in_(order_numbers)).order_by(table.c.id)
+    )
+    grouped: dict[int, list[dict[str, Any]]] = defaultdict(list)
+    for row in rows_to_dicts(tuple(result.keys()), result.all()):
+        grouped[row['orderNumber']].append(row)
+    return grouped
+
+
+def _archive_batch(session: Session, store: ArchiveStore, cutoff: datetime, limit: int, now: datetime) -> int:
+    closed = session.execute(_closed_orders_query(cutoff, limit)).all()
+    if not closed:
+        return 0
+    order_numbers = [row.orderNumber for row in closed]
+    items = _rows(session, orders_table, order_numbers)
+    payments = _rows(session, payments_table, order_numbers)
+
+    by_month: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for order_number, closed_at in closed:
+        by_month[closed_at.strftime('%Y-%m')].append({
+            'orderNumber': order_number,
+            'closedAt': closed_at,
+            'orders': items.get(order_number, []),
+            'payments': payments[order_number],
+        })
+    frames = {month: store.append(month, records) for month, records in by_month.items()}
+
+    insert = dialect_insert(session.get_bind().dialect.name)
+    session.execute(
+        insert(archived_orders).on_conflict_do_nothing(index_elements=[archived_orders.c.orderNumber]),
+        [
+            {
+                'orderNumber': record['orderNumber'],
+                'month': month,
+                'closedAt': record['closedAt'],
+                'archivedAt': now,
+                'file': frames[month].file,
+                'frameOffset': frames[month].offset,
+                'frameLength': frames[month].length,
+            }
+            for month, records in by_month.items()
+            for record in records
+        ],
+    )
+    session.execute(
+        insert(archived_payments).on_conflict_do_nothing(index_elements=[archived_payments.c.id]),
+        [{'id': row['id'], 'orderNumber': row['orderNumber']} for rows in payments.values() for row in rows],
+    )
+    session.execute(delete(orders_table).where(orders_table.c.orderNumber.in_(order_numbers)))
+    if storage.payments.primary is not storage.orders.primary:
+        # Bancos separados: os pagamentos só saem depois do commit dos pedidos (ver docstring).
+        session.commit()
+    session.execute(delete(payments_table).where(payments_table.c.orderNumber.in_(order_numbers)))
+    session.commit()
+    return len(closed)
+
+
+def archive_closed_orders(
+    older_than: timedelta = timedelta(days=ARCHIVE_AFTER_DAYS),
+    store: ArchiveStore = archive_store,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    now: datetime | None = None,
+) -> int:
+    """Move os pedidos fechados há mais de ``older_than`` para o arquivo; devolve quantos foram movidos."""
+    now = now or datetime.now()
+    cutoff = now - older_than
+    archived = 0
+    while True:
+        with storage.session() as session:
+            moved = _archive_batch(session, store, cutoff, batch_size, now)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+
+def is_archived(session: Session, order_number: int) -> bool:
+    return session.scalar(
+        select(archived_orders.c.orderNumber).where(archived_orders.c.orderNumber == order_number)
+    ) is not None
+
+
+def find_archived_order(order_number: int, store: ArchiveStore = archive_store) -> dict[str, Any] | None:
+    """Registro arquivado do pedido (``orders`` e ``payments`` como dicts), ou ``None``."""
+    table = archived_orders
+    with storage.read_session() as session:
+        row = session.execute(
+            select(table.c.month, table.c.file, table.c.frameOffset, table.c.frameLength)
+            .where(table.c.orderNumber == order_number)
+        ).one_or_none()
+    if row is None:
+        return None
+    frame = ArchiveFrame(row.file, row.frameOffset, row.frameLength) if row.file is not None else None
+    return store.find(row.month, order_number, frame)
+
+
+def find_archived_payment(payment_id: int, store: ArchiveStore = archive_store) -> dict[str, Any] | None:
+    with storage.read_session() as session:
+        order_number = session.scalar(
+            select(archived_payments.c.orderNumber).where(archived_payments.c.id == payment_id)
+        )
+    if order_number is None:
+        return None
+    record = find_archived_order(order_number, store)
+    if record is None:
+        return None
+    return next((payment for payment in record['payments'] if payment['id'] == payment_id), None)
+
+
+def archived_order_items(order_number: int) -> list[dict[str, Any]]:
+    record = find_archived_order(order_number)
+    return record['orders'] if record else []
+
+
+def archived_order_payments(order_number: int) -> list[dict[str, Any]]:
+    """Pagamentos arquivados do pedido, mais recentes primeiro (como a consulta quente)."""
+    record = find_archived_order(order_number)
+    if not record:
+        return []
+    return sorted(record['payments'], key=lambda payment: payment['createdAt'], reverse=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Arquiva os pedidos fechados e seus pagamentos.')
+    parser.add_argument('--older-than-days', type=float, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    moved = archive_closed_orders(timedelta(days=args.older_than_days), batch_size=args.batch_size)
+    print(f"Pedidos arquivados: {moved}")
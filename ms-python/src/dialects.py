@@ -0,0 +1,13 @@
+"""``INSERT ... ON CONFLICT`` do dialeto em uso.
+
+O módulo do PostgreSQL só é importado quando o banco é PostgreSQL: carregá-lo
+custa dezenas de milissegundos na partida e não é usado com SQLite.
+"""
+
+
+def dialect_insert(dialect_name: str):
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
@@ -0,0 +1,106 @@
+import os
+import time
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.events.outbox import outbox_signal
+from src.events.service import (
+    OUTBOX_POLL_INTERVAL,
+    events_page,
+    read_events_service,
+    read_events_service_async,
+    sse_message,
+    subscribers_stats_service,
+)
+from src.orders.async_database import async_mode
+
+# Limite de streams abertos por worker; acima disso o cliente recebe 503 e usa o long-poll.
+OUTBOX_MAX_STREAMS = int(os.getenv('OUTBOX_MAX_STREAMS', '100'))
+OUTBOX_STREAM_BATCH = int(os.getenv('OUTBOX_STREAM_BATCH', '100'))
+OUTBOX_HEARTBEAT = float(os.getenv('OUTBOX_HEARTBEAT', '15'))
+
+router = APIRouter(prefix='/events', tags=['events'])
+
+_open_streams = 0
+
+
+async def _read(after: int, limit: int, topics: list[str] | None) -> list:
+    if async_mode:
+        return await read_events_service_async(after, limit, topics)
+    return await run_in_threadpool(read_events_service, after, limit, topics)
+
+
+@router.get(
+    '/',
+    status_code=HTTPStatus.OK,
+    description='Long-poll: eventos com id maior que "after", esperando até "wait" segundos por novos'
+)
+async def poll_events(
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(25, ge=0, le=60),
+    topic: Optional[list[str]] = Query(None),
+) -> Response:
+    deadline = time.monotonic() + wait
+    while True:
+        rows = await _read(after, limit, topic)
+        remaining = deadline - time.monotonic()
+        if rows or remaining <= 0:
+            return Response(content=events_page(rows, after), media_type='application/json')
+        await outbox_signal.wait_async(min(remaining, OUTBOX_POLL_INTERVAL))
+
+
+@router.get(
+    '/stream',
+    status_code=HTTPStatus.OK,
+    response_class=StreamingResponse,
+    description='Server-Sent Events com os eventos de pedidos e pagamentos (retoma por Last-Event-ID)'
+)
+async def stream_events(
+    after: int = Query(0, ge=0),
+    topic: Optional[list[str]] = Query(None),
+    last_event_id: Optional[int] = Header(None),
+) -> StreamingResponse:
+    if _open_streams >= OUTBOX_MAX_STREAMS:
+        raise HTTPException(status_code=503, detail="Limite de streams atingido; use GET /events/")
+    cursor = last_event_id if last_event_id is not None else after
+
+    async def stream():
+        # Cada lote só é lido depois que o anterior foi enviado: um cliente
+        # lento atrasa apenas o próprio stream.
+        global _open_streams
+        nonlocal cursor
+        # Contado dentro do gerador, junto do finally que desconta: um cliente
+        # que desconecta antes da primeira leitura não deixa vaga ocupada.
+        _open_streams += 1
+        try:
+            yield b'retry: 2000\n\n'
+            last_sent = time.monotonic()
+            while True:
+                rows = await _read(cursor, OUTBOX_STREAM_BATCH, topic)
+                if rows:
+                    yield b''.join(sse_message(row) for row in rows)
+                    cursor = rows[-1].id
+                    last_sent = time.monotonic()
+                    continue
+                if time.monotonic() - last_sent >= OUTBOX_HEARTBEAT:
+                    yield b': keep-alive\n\n'
+                    last_sent = time.monotonic()
+                await outbox_signal.wait_async(OUTBOX_POLL_INTERVAL)
+        finally:
+            _open_streams -= 1
+
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get('/subscribers', include_in_schema=False)
+async def subscribers_stats() -> dict:
+    return await run_in_threadpool(subscribers_stats_service)
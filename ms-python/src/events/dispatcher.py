@@ -0,0 +1,261 @@
+"""Entrega dos eventos do outbox a webhooks (cozinha, estoque no ms-kotlin, ...).
+
+Os assinantes vêm de ``OUTBOX_WEBHOOKS`` (``nome=url,nome=url``). Cada um
+tem sua posição em ``outbox_subscribers`` e recebe os eventos em ordem, em
+lotes de até ``OUTBOX_BATCH_SIZE``, com um único lote em voo por vez::
+
+    POST <url>  {"events": [{"id": 1, "topic": "order.created", ...}, ...]}
+
+Uma resposta 2xx avança a posição. Em falha o mesmo lote é reenviado com
+backoff exponencial e jitter (``OUTBOX_RETRY_BASE_DELAY`` até
+``OUTBOX_RETRY_MAX_DELAY``), sem pular eventos: um assinante lento ou fora do
+ar acumula atraso só para ele, sem afetar as escritas nem os outros
+assinantes. Com vários workers, um lease por assinante (``OUTBOX_LEASE``)
+garante um único entregador por vez.
+
+A limpeza da tabela roda numa thread própria, a cada
+``OUTBOX_PURGE_INTERVAL``, mesmo sem webhooks configurados: sem ela o
+outbox cresceria sem limite.
+"""
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+import requests
+from sqlalchemy import Engine, delete, func, or_, select, update
+
+from src.dialects import dialect_insert
+from src.events.outbox import (
+    OutboxSignal,
+    envelope,
+    last_event_id,
+    outbox_events,
+    outbox_signal,
+    outbox_subscribers,
+    read_events,
+)
+from src.metrics import Counter, metrics_enabled, registry
+
+
+outbox_deliveries = registry.register(Counter(
+    'outbox_deliveries_total',
+    'Lotes de eventos enviados aos webhooks por assinante e resultado.',
+    ('subscriber', 'result'),
+))
+
+
+def parse_subscribers(value: str | None) -> dict[str, str]:
+    subscribers = {}
+    for entry in (value or '').split(','):
+        name, separator, url = entry.strip().partition('=')
+        if separator and name.strip() and url.strip():
+            subscribers[name.strip()] = url.strip()
+    return subscribers
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        engine: Engine,
+        subscribers: dict[str, str] | None = None,
+        session: requests.Session | None = None,
+        batch_size: int | None = None,
+        timeout: float | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        poll_interval: float | None = None,
+        lease: float | None = None,
+        retention: float | None = None,
+        purge_interval: float | None = None,
+        signal: OutboxSignal = outbox_signal,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self._engine = engine
+        self.subscribers = parse_subscribers(os.getenv('OUTBOX_WEBHOOKS')) if subscribers is None else subscribers
+        self._session = session or requests.Session()
+        self.batch_size = batch_size or int(os.getenv('OUTBOX_BATCH_SIZE', '100'))
+        self.timeout = timeout if timeout is not None else float(os.getenv('OUTBOX_TIMEOUT', '5'))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('OUTBOX_RETRY_BASE_DELAY', '1'))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv('OUTBOX_RETRY_MAX_DELAY', '300'))
+        self.poll_interval = (
+            poll_interval if poll_interval is not None else float(os.getenv('OUTBOX_POLL_INTERVAL', '1'))
+        )
+        # O lease precisa cobrir o envio de um lote, com folga.
+        self.lease = timedelta(seconds=lease if lease is not None else max(30.0, self.timeout * 2))
+        # Eventos já entregues a todos os webhooks ficam disponíveis para os
+        # streams (Last-Event-ID) por este tempo antes de serem apagados.
+        self.retention = timedelta(
+            seconds=retention if retention is not None else float(os.getenv('OUTBOX_RETENTION', '86400'))
+        )
+        self.purge_interval = (
+            purge_interval if purge_interval is not None else float(os.getenv('OUTBOX_PURGE_INTERVAL', '60'))
+        )
+        self._signal = signal
+        self._clock = clock
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def backoff(self, attempts: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempts)))
+
+    def ensure_subscribers(self) -> None:
+        """Cria a posição dos assinantes novos (a partir do início do outbox) e atualiza as URLs."""
+        if not self.subscribers:
+            return
+        with self._engine.begin() as connection:
+            insert = dialect_insert(connection.dialect.name)
+            for name, url in self.subscribers.items():
+                statement = insert(outbox_subscribers).values(name=name, url=url, lastEventId=0, attempts=0)
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=[outbox_subscribers.c.name],
+                    set_={'url': statement.excluded.url},
+                ))
+
+    def _claim(self, name: str):
+        now = self._clock()
+        table = outbox_subscribers
+        with self._engine.begin() as connection:
+            return connection.execute(
+                update(table)
+                .where(
+                    table.c.name == name,
+                    or_(table.c.leaseUntil.is_(None), table.c.leaseUntil < now, table.c.leaseOwner == self.owner),
+                    or_(table.c.nextAttemptAt.is_(None), table.c.nextAttemptAt <= now),
+                )
+                .values(leaseOwner=self.owner, leaseUntil=now + self.lease)
+                .returning(table.c.url, table.c.lastEventId, table.c.attempts)
+            ).one_or_none()
+
+    def _settle(self, name: str, **values: Any) -> None:
+        table = outbox_subscribers
+        with self._engine.begin() as connection:
+            connection.execute(
+                update(table)
+                .where(table.c.name == name, table.c.leaseOwner == self.owner)
+                .values(leaseOwner=None, leaseUntil=None, **values)
+            )
+
+    def dispatch_once(self, name: str) -> int:
+        """Envia o próximo lote do assinante; devolve quantos eventos foram confirmados."""
+        claimed = self._claim(name)
+        if claimed is None:
+            return 0  # em backoff ou com outro worker
+        with self._engine.connect() as connection:
+            events = read_events(connection, claimed.lastEventId, self.batch_size)
+        if not events:
+            self._settle(name)
+            return 0
+
+        body = b'{"events":[' + b','.join(envelope(row) for row in events) + b']}'
+        error = None
+        try:
+            response = self._session.post(
+                claimed.url,
+                data=body,
+                headers={'Content-Type': 'application/json', 'X-Outbox-Subscriber': name},
+                timeout=self.timeout,
+            )
+            if not 200 <= response.status_code < 300:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as exc:
+            error = type(exc).__name__
+
+        if error is None:
+            self._settle(name, lastEventId=events[-1].id, attempts=0, nextAttemptAt=None, lastError=None)
+        else:
+            self._settle(
+                name,
+                attempts=claimed.attempts + 1,
+                nextAttemptAt=self._clock() + timedelta(seconds=self.backoff(claimed.attempts)),
+                lastError=error,
+            )
+        if metrics_enabled:
+            outbox_deliveries.inc(name, 'failure' if error else 'success')
+        return 0 if error else len(events)
+
+    def run_once(self) -> int:
+        return sum(self.dispatch_once(name) for name in self.subscribers)
+
+    def purge(self) -> int:
+        """Apaga os eventos fora da retenção que todos os webhooks já receberam."""
+        condition = outbox_events.c.createdAt < self._clock() - self.retention
+        with self._engine.begin() as connection:
+            if self.subscribers:
+                delivered = connection.scalar(
+                    select(func.min(outbox_subscribers.c.lastEventId))
+                    .where(outbox_subscribers.c.name.in_(self.subscribers))
+                )
+                condition = condition & (outbox_events.c.id <= (delivered or 0))
+            return connection.execute(delete(outbox_events).where(condition)).rowcount
+
+    def stats(self) -> dict[str, Any]:
+        with self._engine.connect() as connection:
+            head = last_event_id(connection)
+            rows = connection.execute(select(outbox_subscribers)).all()
+        return {
+            'lastEventId': head,
+            'subscribers': [
+                {
+                    'name': row.name,
+                    'url': row.url,
+                    'lastEventId': row.lastEventId,
+                    'lag': head - row.lastEventId,
+                    'attempts': row.attempts,
+                    'nextAttemptAt': row.nextAttemptAt,
+                    'lastError': row.lastError,
+                }
+                for row in rows
+            ],
+        }
+
+    def start(self, deliver: bool = True) -> None:
+        """Inicia a limpeza do outbox e, com ``deliver`` e assinantes, a entrega aos webhooks."""
+        with self._lock:
+            if self._threads:
+                return
+            # Cada início tem o próprio evento: um stop() seguido de start()
+            # não reaproveita as threads antigas.
+            self._stop = stop = threading.Event()
+            self._threads = [threading.Thread(target=self._retain, args=(stop,), name='outbox-retention', daemon=True)]
+            if deliver and self.subscribers:
+                self._threads.append(
+                    threading.Thread(target=self._run, args=(stop,), name='outbox-dispatcher', daemon=True)
+                )
+            threads = list(self._threads)
+        for thread in threads:
+            thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop.set()
+            self._threads = []
+        self._signal.notify()
+
+    def _retain(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                self.purge()
+            except Exception as exc:  # banco indisponível etc.: tenta de novo no próximo ciclo
+                print(f"Outbox retention error: {exc}")
+            stop.wait(self.purge_interval)
+
+    def _run(self, stop: threading.Event) -> None:
+        ready = False
+        while not stop.is_set():
+            try:
+                if not ready:
+                    self.ensure_subscribers()
+                    ready = True
+                delivered = self.run_once()
+            except Exception as exc:  # banco indisponível etc.: tenta de novo no próximo ciclo
+                print(f"Outbox dispatcher error: {exc}")
+                delivered = 0
+            # Lote cheio entregue: segue drenando sem esperar.
+            if delivered == 0 and not stop.is_set():
+                self._signal.wait(self.poll_interval)
@@ -0,0 +1,171 @@
+"""Outbox transacional dos eventos de pedidos e pagamentos.
+
+Cada escrita em ``orders``/``payments`` grava também uma linha em
+``outbox_events`` na mesma transação: o evento existe se e somente se a
+escrita foi confirmada, e o caminho de escrita ganha apenas um ``INSERT``.
+A entrega fica com o ``OutboxDispatcher`` (webhooks) e com as rotas de
+stream/long-poll, que leem a tabela a partir do último id que o consumidor
+já recebeu. A entrega é *at-least-once*: consumidores devem ignorar ids
+repetidos.
+"""
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Connection,
+    DateTime,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    event,
+    func,
+    insert,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from src.serialization import dumps
+
+
+OUTBOX_SETTLE = float(os.getenv('OUTBOX_SETTLE', '2'))
+
+EVENT_ID = BigInteger().with_variant(Integer, 'sqlite')
+
+outbox_metadata = MetaData()
+
+outbox_events = Table(
+    'outbox_events',
+    outbox_metadata,
+    Column('id', EVENT_ID, primary_key=True, autoincrement=True),
+    Column('topic', String, nullable=False),
+    Column('key', String, nullable=False),
+    # JSON já serializado: vai para o webhook e para o stream sem nova serialização.
+    Column('payload', LargeBinary, nullable=False),
+    Column('createdAt', DateTime, nullable=False),
+)
+
+# Posição e estado de entrega de cada webhook (ver dispatcher.py).
+outbox_subscribers = Table(
+    'outbox_subscribers',
+    outbox_metadata,
+    Column('name', String, primary_key=True),
+    Column('url', String, nullable=False),
+    Column('lastEventId', EVENT_ID, nullable=False, default=0),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('nextAttemptAt', DateTime, nullable=True),
+    Column('lastError', String, nullable=True),
+    Column('leaseOwner', String, nullable=True),
+    Column('leaseUntil', DateTime, nullable=True),
+)
+
+
+class OutboxSignal:
+    """Acorda o dispatcher e os streams deste processo logo após um commit.
+
+    Escritas feitas por outros workers não passam por aqui; para elas os
+    leitores também consultam a tabela a cada ``poll_interval``.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def notify(self) -> None:
+        with self._condition:
+            self._sequence += 1
+            self._condition.notify_all()
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def wait(self, timeout: float) -> None:
+        with self._condition:
+            sequence = self._sequence
+            self._condition.wait_for(lambda: self._sequence != sequence, timeout)
+
+    async def wait_async(self, timeout: float) -> None:
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+
+
+outbox_signal = OutboxSignal()
+
+
+def record_event(session: Session, topic: str, key: Any, payload: dict[str, Any]) -> None:
+    """Acrescenta o evento à transação corrente; é publicado no commit."""
+    record_events(session, topic, [(key, payload)])
+
+
+def record_events(session: Session, topic: str, events: list[tuple[Any, dict[str, Any]]]) -> None:
+    if not events:
+        return
+    now = datetime.now()
+    session.execute(insert(outbox_events), [
+        {'topic': topic, 'key': str(key), 'payload': dumps(payload), 'createdAt': now}
+        for key, payload in events
+    ])
+    # Só acorda os leitores depois do commit; num rollback não há o que ler.
+    session.info['outbox_pending'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_after_commit(session: Session) -> None:
+    if session.info.pop('outbox_pending', False):
+        outbox_signal.notify()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop('outbox_pending', None)
+
+
+def envelope(row) -> bytes:
+    """``{"id", "topic", "key", "createdAt", "data"}`` com o payload gravado inserido como está."""
+    head = dumps({'id': row.id, 'topic': row.topic, 'key': row.key, 'createdAt': row.createdAt})
+    return head[:-1] + b',"data":' + row.payload + b'}'
+
+
+def _settled_before(connection: Connection) -> datetime | None:
+    """Limite de ``createdAt`` para leitura segura por id.
+
+    No SQLite as transações de escrita são serializadas, então os ids são
+    confirmados em ordem. Em outros bancos uma transação com id menor pode
+    confirmar depois de uma com id maior; os leitores ignoram os eventos
+    mais recentes que ``OUTBOX_SETTLE`` segundos para não pular esses ids.
+    """
+    if connection.dialect.name == 'sqlite':
+        return None
+    return datetime.now() - timedelta(seconds=OUTBOX_SETTLE)
+
+
+def events_query(after: int, limit: int, topics: list[str] | None = None, settled_before: datetime | None = None):
+    query = select(outbox_events).where(outbox_events.c.id > after)
+    if topics:
+        query = query.where(outbox_events.c.topic.in_(topics))
+    if settled_before is not None:
+        query = query.where(outbox_events.c.createdAt <= settled_before)
+    return query.order_by(outbox_events.c.id).limit(limit)
+
+
+def read_events(connection: Connection, after: int, limit: int, topics: list[str] | None = None) -> list:
+    return connection.execute(events_query(after, limit, topics, _settled_before(connection))).all()
+
+
+def last_event_id(connection: Connection) -> int:
+    return connection.scalar(select(func.coalesce(func.max(outbox_events.c.id), 0)))
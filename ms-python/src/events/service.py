@@ -0,0 +1,36 @@
+import os
+from typing import Any
+
+from src.events.dispatcher import OutboxDispatcher
+from src.events.outbox import envelope, read_events
+from src.orders.async_database import async_engine
+from src.orders.database import engine
+
+# Intervalo máximo entre consultas à tabela quando nada é sinalizado (escritas de outros workers).
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '1'))
+
+outbox_dispatcher = OutboxDispatcher(engine)
+
+
+def read_events_service(after: int, limit: int, topics: list[str] | None = None) -> list:
+    with engine.connect() as connection:
+        return read_events(connection, after, limit, topics)
+
+
+async def read_events_service_async(after: int, limit: int, topics: list[str] | None = None) -> list:
+    async with async_engine.connect() as connection:
+        return await connection.run_sync(read_events, after, limit, topics)
+
+
+def events_page(rows: list, after: int) -> bytes:
+    """Resposta do long-poll: ``{"events": [...], "lastEventId": n}``."""
+    last = rows[-1].id if rows else after
+    return b'{"events":[' + b','.join(envelope(row) for row in rows) + b'],"lastEventId":' + str(last).encode() + b'}'
+
+
+def sse_message(row) -> bytes:
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (row.id, row.topic.encode(), envelope(row))
+
+
+def subscribers_stats_service() -> dict[str, Any]:
+    return outbox_dispatcher.stats()
@@ -0,0 +1,163 @@
+"""Commit em grupo das inserções de pedidos e pagamentos.
+
+Com ``GROUP_COMMIT`` ligado, as escritas das requisições concorrentes vão
+para uma fila atendida por uma thread: ela junta o que chegou (até
+``GROUP_COMMIT_MAX_BATCH`` itens, esperando no máximo
+``GROUP_COMMIT_MAX_DELAY_MS`` por mais) e grava tudo em uma transação, com um
+único commit (um fsync no SQLite). Cada requisição recebe o próprio
+resultado, com o id gerado, só depois do commit: a garantia de durabilidade
+é a mesma do commit por requisição.
+
+Se qualquer item do lote falha (validação, índice único), o lote é desfeito
+e cada item é repetido em transação própria, para que só o item com problema
+receba o erro. Por isso ``stage`` não pode ter efeitos fora da sessão; o que
+depende do commit (invalidar o cache de respostas) vai em ``on_commit``.
+
+Desligado (padrão), ``write`` faz a escrita na hora, em sessão própria.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.metrics import Histogram, metrics_enabled, registry
+
+T = TypeVar('T')
+
+group_commit_enabled = os.getenv('GROUP_COMMIT', 'false').lower() in {'1', 'true', 'yes', 'on'}
+
+group_commit_batch_size = registry.register(Histogram(
+    'group_commit_batch_size',
+    'Escritas gravadas por commit do GroupCommitWriter.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+))
+
+
+@dataclass
+class _Pending:
+    stage: Callable[[Session], Any]
+    on_commit: Callable[[Any], None] | None
+    future: Future = field(default_factory=Future)
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        session_factory: sessionmaker[Session],
+        async_session_factory: async_sessionmaker[AsyncSession],
+        enabled: bool = group_commit_enabled,
+        max_batch: int | None = None,
+        max_delay: float | None = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._async_session_factory = async_session_factory
+        self.enabled = enabled
+        self.max_batch = max_batch or int(os.getenv('GROUP_COMMIT_MAX_BATCH', '64'))
+        self.max_delay = (
+            max_delay if max_delay is not None else float(os.getenv('GROUP_COMMIT_MAX_DELAY_MS', '2')) / 1000
+        )
+        self._queue: queue.SimpleQueue[_Pending | None] = queue.SimpleQueue()
+        self._last_batch = 1
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def write(self, stage: Callable[[Session], T], on_commit: Callable[[T], None] | None = None) -> T:
+        """Executa ``stage(session)``, faz o commit e devolve o resultado de ``stage``."""
+        if not self.enabled:
+            with self._session_factory() as session:
+                result = stage(session)
+                session.commit()
+            if on_commit is not None:
+                on_commit(result)
+            return result
+        return self._enqueue(stage, on_commit).result()
+
+    async def write_async(self, stage: Callable[[Session], T], on_commit: Callable[[T], None] | None = None) -> T:
+        if not self.enabled:
+            async with self._async_session_factory() as session:
+                result = await session.run_sync(stage)
+                await session.commit()
+            if on_commit is not None:
+                on_commit(result)
+            return result
+        return await asyncio.wrap_future(self._enqueue(stage, on_commit))
+
+    def _enqueue(self, stage: Callable[[Session], Any], on_commit: Callable[[Any], None] | None) -> Future:
+        pending = _Pending(stage, on_commit)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._thread.start()
+        self._queue.put(pending)
+        return pending.future
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Grava o que já está na fila e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _collect(self, first: _Pending) -> tuple[list[_Pending], bool]:
+        # O que chegou durante o commit anterior já entra sem espera. Só se
+        # espera até max_delay por mais itens quando há concorrência (o lote
+        # anterior teve mais de um): uma escrita isolada não paga a espera.
+        batch = [first]
+        deadline = time.monotonic() + (self.max_delay if self._last_batch > 1 else 0)
+        while len(batch) < self.max_batch:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if pending is None:
+                return batch, True
+            batch.append(pending)
+        self._last_batch = len(batch)
+        return batch, False
+
+    def _flush(self, batch: list[_Pending]) -> None:
+        try:
+            with self._session_factory() as session:
+                results = [pending.stage(session) for pending in batch]
+                session.commit()
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0].future.set_exception(exc)
+                return
+            for pending in batch:
+                self._flush([pending])
+            return
+
+        if metrics_enabled:
+            group_commit_batch_size.observe(len(batch))
+        for pending, result in zip(batch, results):
+            if pending.on_commit is not None:
+                try:
+                    pending.on_commit(result)
+                except Exception as exc:
+                    print(f"Group commit: on_commit failed: {exc}")
+            pending.future.set_result(result)
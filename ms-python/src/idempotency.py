@@ -0,0 +1,370 @@
+"""Chaves de idempotência (``Idempotency-Key``) para as rotas de criação.
+
+O cliente que repete um ``POST`` após um timeout envia a mesma chave e
+recebe os bytes da resposta original, sem que o pedido passe de novo pela
+validação, pelo catálogo ou pelo banco. A primeira requisição reserva a
+chave na tabela ``idempotency_keys`` (compartilhada entre workers) e grava a
+resposta ao terminar; as respostas concluídas ficam também num LRU em
+memória com TTL, que atende as repetições sem consultar o banco. Ao gravar
+uma resposta, as chaves vencidas são apagadas da tabela (no máximo uma vez
+por ``IDEMPOTENCY_PURGE_INTERVAL``), o que mantém o tamanho dela limitado ao
+volume de um TTL.
+
+- Mesma chave com corpo diferente: 422.
+- Mesma chave com a primeira requisição ainda em andamento: 409.
+- Respostas 5xx não são guardadas: a chave é liberada para nova tentativa.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    and_,
+    delete,
+    or_,
+    select,
+    update,
+)
+from starlette.concurrency import run_in_threadpool
+
+from src.dialects import dialect_insert
+from src.metrics import Counter, metrics_enabled, registry
+from src.serialization import dumps
+
+
+IDEMPOTENCY_HEADER = 'idempotency-key'
+
+idempotency_metadata = MetaData()
+
+idempotency_keys = Table(
+    'idempotency_keys',
+    idempotency_metadata,
+    Column('scope', String, primary_key=True),
+    Column('key', String, primary_key=True),
+    Column('fingerprint', String, nullable=False),
+    # NULL enquanto a primeira requisição está em andamento.
+    Column('statusCode', Integer, nullable=True),
+    Column('contentType', String, nullable=True),
+    Column('body', LargeBinary, nullable=True),
+    Column('createdAt', DateTime, nullable=False),
+    Column('expiresAt', DateTime, nullable=False),
+    Index('ix_idempotency_keys_expiresAt', 'expiresAt'),
+)
+
+idempotency_requests = registry.register(Counter(
+    'idempotency_requests_total',
+    'Requisições com Idempotency-Key por resultado (acquired, replayed, in_progress, mismatch).',
+    ('result',),
+))
+
+
+class Outcome(str, Enum):
+    ACQUIRED = 'acquired'
+    REPLAYED = 'replayed'
+    IN_PROGRESS = 'in_progress'
+    MISMATCH = 'mismatch'
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    content_type: str | None
+    body: bytes
+    expires_at: datetime
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    return hashlib.sha256(method.encode() + b' ' + path.encode() + b'\n' + body).hexdigest()
+
+
+class IdempotencyStore:
+    """Reserva e guarda respostas por (escopo, chave), no banco e em memória."""
+
+    def __init__(
+        self,
+        engine: Engine,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+        lock_timeout: float | None = None,
+        purge_interval: float | None = None,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self._engine = engine
+        self._ttl = timedelta(seconds=ttl if ttl is not None else float(os.getenv('IDEMPOTENCY_TTL', '86400')))
+        self._max_entries = max_entries or int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+        # Reserva sem resposta por mais que isso é tratada como abandonada (worker morto).
+        self._lock_timeout = timedelta(
+            seconds=lock_timeout if lock_timeout is not None else float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '30'))
+        )
+        self._purge_interval = timedelta(
+            seconds=purge_interval
+            if purge_interval is not None
+            else float(os.getenv('IDEMPOTENCY_PURGE_INTERVAL', '60'))
+        )
+        self._next_purge: datetime | None = None
+        self._clock = clock
+        self._memory: OrderedDict[tuple[str, str], StoredResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, scope: str, key: str, stored: StoredResponse) -> None:
+        with self._lock:
+            self._memory[(scope, key)] = stored
+            self._memory.move_to_end((scope, key))
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+
+    def _recall(self, scope: str, key: str) -> StoredResponse | None:
+        with self._lock:
+            stored = self._memory.get((scope, key))
+            if stored is None:
+                return None
+            if stored.expires_at <= self._clock():
+                del self._memory[(scope, key)]
+                return None
+            self._memory.move_to_end((scope, key))
+            return stored
+
+    def _compare(self, stored: StoredResponse, request_fingerprint: str) -> Outcome:
+        return Outcome.REPLAYED if stored.fingerprint == request_fingerprint else Outcome.MISMATCH
+
+    def begin(self, scope: str, key: str, request_fingerprint: str) -> tuple[Outcome, StoredResponse | None]:
+        """Reserva a chave ou devolve a resposta já gravada para ela."""
+        stored = self._recall(scope, key)
+        if stored is not None:
+            return self._count(self._compare(stored, request_fingerprint)), stored
+
+        now = self._clock()
+        table = idempotency_keys
+        with self._engine.begin() as connection:
+            insert = dialect_insert(connection.dialect.name)
+            reserved = connection.scalar(
+                insert(table)
+                .values(
+                    scope=scope,
+                    key=key,
+                    fingerprint=request_fingerprint,
+                    createdAt=now,
+                    expiresAt=now + self._ttl,
+                )
+                .on_conflict_do_nothing(index_elements=[table.c.scope, table.c.key])
+                .returning(table.c.key)
+            )
+            if reserved is not None:
+                return self._count(Outcome.ACQUIRED), None
+
+            # Chave expirada ou reserva abandonada: assume a chave.
+            taken = connection.execute(
+                update(table)
+                .where(
+                    table.c.scope == scope,
+                    table.c.key == key,
+                    or_(
+                        table.c.expiresAt <= now,
+                        and_(table.c.statusCode.is_(None), table.c.createdAt <= now - self._lock_timeout),
+                    ),
+                )
+                .values(
+                    fingerprint=request_fingerprint,
+                    statusCode=None,
+                    contentType=None,
+                    body=None,
+                    createdAt=now,
+                    expiresAt=now + self._ttl,
+                )
+            )
+            if taken.rowcount:
+                return self._count(Outcome.ACQUIRED), None
+
+            row = connection.execute(
+                select(table).where(table.c.scope == scope, table.c.key == key)
+            ).one_or_none()
+
+        if row is None:
+            # A reserva acabou de ser liberada por outra requisição: o cliente tenta de novo.
+            return self._count(Outcome.IN_PROGRESS), None
+        if row.statusCode is None:
+            if row.fingerprint != request_fingerprint:
+                return self._count(Outcome.MISMATCH), None
+            return self._count(Outcome.IN_PROGRESS), None
+        stored = StoredResponse(row.fingerprint, row.statusCode, row.contentType, row.body, row.expiresAt)
+        self._remember(scope, key, stored)
+        return self._count(self._compare(stored, request_fingerprint)), stored
+
+    def complete(
+        self,
+        scope: str,
+        key: str,
+        request_fingerprint: str,
+        status_code: int,
+        content_type: str | None,
+        body: bytes,
+    ) -> None:
+        expires_at = self._clock() + self._ttl
+        with self._engine.begin() as connection:
+            connection.execute(
+                update(idempotency_keys)
+                .where(idempotency_keys.c.scope == scope, idempotency_keys.c.key == key)
+                .values(statusCode=status_code, contentType=content_type, body=body, expiresAt=expires_at)
+            )
+        self._remember(scope, key, StoredResponse(request_fingerprint, status_code, content_type, body, expires_at))
+        self._purge_if_due()
+
+    def release(self, scope: str, key: str) -> None:
+        """Libera a reserva sem resposta (falha 5xx ou exceção), permitindo nova tentativa."""
+        with self._engine.begin() as connection:
+            connection.execute(
+                delete(idempotency_keys).where(
+                    idempotency_keys.c.scope == scope,
+                    idempotency_keys.c.key == key,
+                    idempotency_keys.c.statusCode.is_(None),
+                )
+            )
+
+    def _purge_if_due(self) -> None:
+        now = self._clock()
+        with self._lock:
+            if self._next_purge is not None and now < self._next_purge:
+                return
+            self._next_purge = now + self._purge_interval
+        self.purge_expired()
+
+    def purge_expired(self) -> int:
+        with self._engine.begin() as connection:
+            result = connection.execute(
+                delete(idempotency_keys).where(idempotency_keys.c.expiresAt <= self._clock())
+            )
+        return result.rowcount
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    @staticmethod
+    def _count(outcome: Outcome) -> Outcome:
+        if metrics_enabled:
+            idempotency_requests.inc(outcome.value)
+        return outcome
+
+
+class IdempotencyMiddleware:
+    """Middleware ASGI que aplica ``Idempotency-Key`` às rotas indicadas.
+
+    Na repetição o corpo nem é lido pelo FastAPI: a resposta gravada é
+    enviada direto, com o cabeçalho ``Idempotent-Replayed: true``. As
+    operações no banco rodam no pool de threads para não bloquear o loop.
+    """
+
+    def __init__(self, app, store: IdempotencyStore, routes: set[tuple[str, str]]) -> None:
+        self.app = app
+        self.store = store
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http' or (scope['method'], scope['path']) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, IDEMPOTENCY_HEADER)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        route = f"{scope['method']} {scope['path']}"
+        request_fingerprint = fingerprint(scope['method'], scope['path'], body)
+        outcome, stored = await run_in_threadpool(self.store.begin, route, key, request_fingerprint)
+
+        if outcome is Outcome.REPLAYED:
+            await _send_stored(send, stored)
+            return
+        if outcome is Outcome.MISMATCH:
+            await _send_error(send, 422, 'Idempotency-Key já usada com outro corpo de requisição')
+            return
+        if outcome is Outcome.IN_PROGRESS:
+            await _send_error(send, 409, 'Requisição com esta Idempotency-Key ainda em processamento')
+            return
+
+        status_code = 500
+        content_type = None
+        chunks: list[bytes] = []
+
+        async def replay_receive():
+            nonlocal body
+            if body is None:
+                return await receive()
+            message = {'type': 'http.request', 'body': body, 'more_body': False}
+            body = None
+            return message
+
+        async def capture_send(message) -> None:
+            nonlocal status_code, content_type
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                content_type = _header(message, 'content-type')
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await run_in_threadpool(self.store.release, route, key)
+            raise
+        if status_code >= 500:
+            await run_in_threadpool(self.store.release, route, key)
+            return
+        await run_in_threadpool(
+            self.store.complete, route, key, request_fingerprint, status_code, content_type, b''.join(chunks)
+        )
+
+
+def _header(message, name: str) -> str | None:
+    target = name.encode()
+    for header_name, value in message.get('headers', []):
+        if header_name.lower() == target:
+            return value.decode('latin-1')
+    return None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _send_stored(send, stored: StoredResponse) -> None:
+    headers = [
+        (b'content-length', str(len(stored.body)).encode()),
+        (b'idempotent-replayed', b'true'),
+    ]
+    if stored.content_type:
+        headers.append((b'content-type', stored.content_type.encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': stored.status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': stored.body})
+
+
+async def _send_error(send, status_code: int, detail: str) -> None:
+    body = dumps({'detail': detail})
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,294 @@
+"""Métricas no formato texto do Prometheus, sem dependências externas.
+
+As métricas são mantidas por processo (cada worker expõe as suas). O custo
+por observação é uma busca binária no vetor de buckets e um lock curto, o
+suficiente para manter o endpoint ``/metrics`` ligado em produção.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+
+metrics_enabled = os.getenv('METRICS_ENABLED', 'true').lower() in {'1', 'true', 'yes', 'on'}
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """Gauge calculado no momento da coleta a partir de uma função."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        collect: Callable[[], dict[tuple[str, ...], float]] | None = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._collectors: list[Callable[[], dict[tuple[str, ...], float]]] = [collect] if collect else []
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def add_collector(self, collect: Callable[[], dict[tuple[str, ...], float]]) -> None:
+        self._collectors.append(collect)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def render(self) -> list[str]:
+        values = dict(self._values)
+        for collect in self._collectors:
+            values.update(collect())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for labelvalues, value in values.items():
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._buckets = tuple(buckets)
+        # Por série: contagens por bucket (não acumuladas) + soma.
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self._buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labelvalues, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self._buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    'http_request_duration_seconds',
+    'Latência das requisições HTTP por rota e status.',
+    ('method', 'route', 'status'),
+))
+catalog_request_duration = registry.register(Histogram(
+    'catalog_request_duration_seconds',
+    'Consultas ao catálogo via ProductGatewayClient por resultado.',
+    ('outcome',),
+))
+catalog_resilience_events = registry.register(Counter(
+    'catalog_resilience_events_total',
+    'Eventos de resiliência do cliente do catálogo (retry, hedge, circuit_open...).',
+    ('event',),
+))
+db_transaction_duration = registry.register(Histogram(
+    'db_transaction_duration_seconds',
+    'Duração das transações das sessões SQLAlchemy (do begin ao fim).',
+))
+db_commit_duration = registry.register(Histogram(
+    'db_commit_duration_seconds',
+    'Duração dos commits das sessões SQLAlchemy (inclui o flush).',
+))
+db_pool_checked_out = registry.register(Gauge(
+    'db_pool_checked_out_connections',
+    'Conexões emprestadas do pool por engine.',
+    ('engine',),
+))
+db_pool_size = registry.register(Gauge(
+    'db_pool_size',
+    'Tamanho configurado do pool por engine.',
+    ('engine',),
+))
+threadpool_in_use = registry.register(Gauge(
+    'threadpool_in_use_threads',
+    'Threads do pool do anyio ocupadas por handlers e serviços síncronos.',
+))
+threadpool_capacity = registry.register(Gauge(
+    'threadpool_capacity_threads',
+    'Capacidade total do pool de threads do anyio.',
+))
+
+
+def observe_catalog(outcome: str, started: float) -> None:
+    if metrics_enabled:
+        catalog_request_duration.observe(time.perf_counter() - started, outcome)
+
+
+def count_catalog_event(event_name: str) -> None:
+    if metrics_enabled:
+        catalog_resilience_events.inc(event_name)
+
+
+def instrument_engine(name: str, engine: Engine) -> None:
+    """Expõe o uso do pool do engine como gauge, lido apenas na coleta."""
+    pool = engine.pool
+
+    def checked_out() -> dict[tuple[str, ...], float]:
+        if hasattr(pool, 'checkedout'):
+            return {(name,): pool.checkedout()}
+        return {}
+
+    def size() -> dict[tuple[str, ...], float]:
+        if hasattr(pool, 'size'):
+            return {(name,): pool.size()}
+        return {}
+
+    db_pool_checked_out.add_collector(checked_out)
+    db_pool_size.add_collector(size)
+
+
+_sessions_instrumented = False
+
+
+def instrument_sessions() -> None:
+    """Registra eventos globais de Session para medir transações e commits."""
+    global _sessions_instrumented
+    if _sessions_instrumented or not metrics_enabled:
+        return
+    _sessions_instrumented = True
+
+    @event.listens_for(Session, 'after_begin')
+    def _after_begin(session, transaction, connection):
+        session.info.setdefault('_metrics_began', time.perf_counter())
+
+    @event.listens_for(Session, 'after_transaction_end')
+    def _after_transaction_end(session, transaction):
+        if transaction.parent is None:
+            began = session.info.pop('_metrics_began', None)
+            if began is not None:
+                db_transaction_duration.observe(time.perf_counter() - began)
+
+    @event.listens_for(Session, 'before_commit')
+    def _before_commit(session):
+        session.info['_metrics_commit'] = time.perf_counter()
+
+    @event.listens_for(Session, 'after_commit')
+    def _after_commit(session):
+        began = session.info.pop('_metrics_commit', None)
+        if began is not None:
+            db_commit_duration.observe(time.perf_counter() - began)
+
+
+def collect_threadpool() -> None:
+    """Atualiza os gauges do pool de threads; deve rodar dentro do event loop."""
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    threadpool_in_use.set(limiter.borrowed_tokens)
+    threadpool_capacity.set(limiter.total_tokens)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro que mede a latência por rota (template) e status."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = '500'
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = str(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            http_request_duration.observe(time.perf_counter() - started, scope['method'], path, status)
@@ -0,0 +1,229 @@
+"""Migrações versionadas do banco do ms-python.
+
+Cada migração roda em transação própria e é registrada em
+``schema_migrations``; na inicialização apenas as pendentes são aplicadas.
+Também pode ser executado manualmente com ``python -m src.migrations``.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+
+from src.archive import archive_metadata
+from src.events.outbox import outbox_metadata
+from src.idempotency import idempotency_metadata
+from src.orders.model import TableSummaryModel
+from src.orders.model import table_registry as orders_table_registry
+from src.orders.table_summary import rebuild_table_summaries
+from src.payments.model import ACTIVE_PAYMENT_STATUSES, ACTIVE_STATUSES_CLAUSE, PaymentModel, PaymentStatus
+from src.payments.model import table_registry as payments_table_registry
+
+
+migrations_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations',
+    migrations_metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String, nullable=False),
+    Column('appliedAt', DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _execute_all(*statements: str) -> Callable[[Connection], None]:
+    def apply(connection: Connection) -> None:
+        for statement in statements:
+            connection.execute(text(statement))
+    return apply
+
+
+def _create_base_tables(connection: Connection) -> None:
+    orders_table_registry.metadata.create_all(bind=connection)
+    payments_table_registry.metadata.create_all(bind=connection)
+
+
+def _resolve_duplicate_active_payments(connection: Connection) -> None:
+    """Deixa no máximo um pagamento ativo por pedido antes de criar ux_payments_active_order.
+
+    A consulta prévia do serviço antigo permitia dois pagamentos ativos para o
+    mesmo pedido. Em cada pedido assim, os ``PENDING``/``PROCESSING`` passam a
+    ``CANCELLED``, menos o mais recente deles quando o pedido não tem
+    ``COMPLETED``. Pedidos com mais de um ``COMPLETED`` exigem correção manual:
+    a migração falha listando-os.
+    """
+    payments = PaymentModel.__table__
+    active = payments.c.status.in_(ACTIVE_PAYMENT_STATUSES)
+    duplicated = select(payments.c.orderNumber).where(active).group_by(payments.c.orderNumber).having(func.count() > 1)
+    rows = connection.execute(
+        select(payments.c.id, payments.c.orderNumber, payments.c.status)
+        .where(active, payments.c.orderNumber.in_(duplicated))
+        .order_by(payments.c.orderNumber, payments.c.createdAt.desc(), payments.c.id.desc())
+    ).all()
+
+    by_order: dict[int, list] = defaultdict(list)
+    for row in rows:
+        by_order[row.orderNumber].append(row)
+    completed = {
+        order_number: [row for row in group if row.status == PaymentStatus.COMPLETED.value]
+        for order_number, group in by_order.items()
+    }
+    conflicts = sorted(order_number for order_number, paid in completed.items() if len(paid) > 1)
+    if conflicts:
+        raise RuntimeError(f"Pedidos com mais de um pagamento COMPLETED; corrija antes de migrar: {conflicts}")
+
+    cancelled = []
+    for order_number, group in by_order.items():
+        keep = (completed[order_number] or group)[0]
+        cancelled.extend(row.id for row in group if row.id != keep.id)
+    if cancelled:
+        connection.execute(
+            update(payments)
+            .where(payments.c.id.in_(cancelled))
+            .values(status=PaymentStatus.CANCELLED.value, updatedAt=datetime.now())
+        )
+
+
+def _create_idempotency_keys(connection: Connection) -> None:
+    idempotency_metadata.create_all(bind=connection)
+    _resolve_duplicate_active_payments(connection)
+    # Substitui a consulta prévia de create_payment_service: o banco rejeita
+    # um segundo pagamento ativo para o mesmo pedido.
+    connection.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS "ux_payments_active_order" ON payments ("orderNumber") '
+        f'WHERE {ACTIVE_STATUSES_CLAUSE}'
+    ))
+
+
+def _create_table_summaries(connection: Connection) -> None:
+    # O preenchimento a partir dos dados existentes fica para a versão 5,
+    # depois que orders ganha as colunas de preço lidas pelo rebuild.
+    TableSummaryModel.__table__.create(bind=connection, checkfirst=True)
+
+
+def _add_missing_columns(table: str, columns: dict[str, str]) -> Callable[[Connection], None]:
+    """ALTER TABLE só para as colunas ausentes (o create_all da versão 1 já cria as novas)."""
+    def apply(connection: Connection) -> None:
+        existing = {column['name'] for column in inspect(connection).get_columns(table)}
+        for name, definition in columns.items():
+            if name not in existing:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN "{name}" {definition}'))
+    return apply
+
+
+def _add_price_snapshot(connection: Connection) -> None:
+    _add_missing_columns('orders', {'unitPrice': 'FLOAT', 'lineTotal': 'FLOAT'})(connection)
+    _add_missing_columns('table_summaries', {'billTotal': 'FLOAT NOT NULL DEFAULT 0'})(connection)
+    rebuild_table_summaries(connection)
+
+
+def _create_outbox(connection: Connection) -> None:
+    outbox_metadata.create_all(bind=connection)
+
+
+def _create_archive_index(connection: Connection) -> None:
+    archive_metadata.create_all(bind=connection)
+
+
+def _add_archive_frames(connection: Connection) -> None:
+    _add_missing_columns(
+        'archived_orders', {'file': 'VARCHAR', 'frameOffset': 'INTEGER', 'frameLength': 'INTEGER'}
+    )(connection)
+
+
+def _rebuild_open_table_summaries(connection: Connection) -> None:
+    rebuild_table_summaries(connection)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, 'tabelas de pedidos e pagamentos', _create_base_tables),
+    Migration(2, 'índices de pedidos e pagamentos', _execute_all(
+        'CREATE INDEX IF NOT EXISTS "ix_orders_orderNumber" ON orders ("orderNumber")',
+        'CREATE INDEX IF NOT EXISTS "ix_orders_tableNumber" ON orders ("tableNumber")',
+        'CREATE INDEX IF NOT EXISTS "ix_payments_orderNumber_status" ON payments ("orderNumber", status)',
+        'CREATE INDEX IF NOT EXISTS "ix_payments_createdAt" ON payments ("createdAt")',
+    )),
+    Migration(3, 'chaves de idempotência e pagamento ativo único por pedido', _create_idempotency_keys),
+    Migration(4, 'resumo incremental por mesa', _create_table_summaries),
+    # Os preços dos pedidos antigos vêm do backfill: python -m src.orders.pricing
+    Migration(5, 'preço unitário e total por item de pedido; preenche os resumos das mesas', _add_price_snapshot),
+    Migration(6, 'outbox de eventos e posição dos webhooks', _create_outbox),
+    Migration(7, 'índices dos pedidos e pagamentos arquivados', _create_archive_index),
+    Migration(8, 'posição do frame de cada pedido arquivado', _add_archive_frames),
+    Migration(9, 'resumos das mesas só com os pedidos em aberto', _rebuild_open_table_summaries),
+]
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    migrations_metadata.create_all(bind=engine)
+    return _registered_versions(engine)
+
+
+def pending_versions(engine: Engine, migrations: list[Migration] | None = None) -> list[int]:
+    """Versões ainda não aplicadas, sem escrever no banco (usado por quem só espera o esquema)."""
+    versions = sorted(migration.version for migration in migrations or MIGRATIONS)
+    if not inspect(engine).has_table(schema_migrations.name):
+        return versions
+    done = _registered_versions(engine)
+    return [version for version in versions if version not in done]
+
+
+def _registered_versions(engine: Engine) -> set[int]:
+    with engine.connect() as connection:
+        return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def run_migrations(engine: Engine, migrations: list[Migration] | None = None) -> list[int]:
+    """Aplica as migrações pendentes em ordem e devolve as versões aplicadas."""
+    done = applied_versions(engine)
+    applied: list[int] = []
+    for migration in sorted(migrations or MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        try:
+            with engine.begin() as connection:
+                migration.apply(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    appliedAt=datetime.now(),
+                ))
+        except IntegrityError:
+            # Só é corrida se outro processo registrou a mesma versão; qualquer
+            # outra violação é falha da migração e interrompe as seguintes.
+            if migration.version in _registered_versions(engine):
+                continue
+            raise
+        applied.append(migration.version)
+    return applied
+
+
+if __name__ == '__main__':
+    from src.storage import storage
+
+    for engine in storage.primary_engines():
+        versions = run_migrations(engine)
+        print(f"Migrações aplicadas em {engine.url.render_as_string()}: {versions or 'nenhuma'}")
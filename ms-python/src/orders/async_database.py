@@ -0,0 +1,70 @@
+import os
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.orders.database import (
+    DATABASE_URL,
+    apply_sqlite_pragmas,
+    echo_flag,
+    is_memory_database,
+    pool_settings,
+    profile_for,
+    sqlite_pragmas,
+)
+
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+async_mode = os.getenv('ASYNC_MODE', 'false').lower() in {'1', 'true', 'yes', 'on'}
+
+
+def to_async_url(database_url: str) -> str:
+    """Troca o driver síncrono da URL pelo equivalente assíncrono."""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver and url.drivername == url.get_backend_name():
+        url = url.set(drivername=driver)
+    return url.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or to_async_url(DATABASE_URL)
+
+
+def create_async_database_engine(
+    database_url: str,
+    profile: str | None = None,
+    echo: bool = echo_flag,
+) -> AsyncEngine:
+    profile = profile or profile_for(database_url)
+    engine_kwargs: dict[str, object] = {
+        'echo': echo,
+    }
+
+    is_sqlite = database_url.startswith('sqlite')
+    if is_sqlite:
+        if is_memory_database(database_url):
+            engine_kwargs['poolclass'] = StaticPool
+    else:
+        engine_kwargs.update(pool_settings(profile))
+
+    engine = create_async_engine(
+        database_url,
+        **engine_kwargs,
+    )
+    if is_sqlite:
+        apply_sqlite_pragmas(engine.sync_engine, sqlite_pragmas(profile))
+    return engine
+
+
+async_engine = create_async_database_engine(ASYNC_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
@@ -0,0 +1,242 @@
+"""Réplica local do catálogo de produtos do ms-kotlin.
+
+Com ``CATALOG_REPLICA`` ligado, a lista completa (``GET /ms-kotlin/produto``)
+é carregada na inicialização e atualizada a cada ``CATALOG_REPLICA_INTERVAL``
+segundos por uma thread em segundo plano. As atualizações são condicionais
+(``If-None-Match``/``If-Modified-Since``): sem mudanças, o gateway responde
+304 e nada é baixado de novo. Os clientes do catálogo consultam a réplica
+antes do cache e da rede; só códigos que ela não conhece viram consulta ao
+vivo por código.
+
+Com ``CATALOG_REPLICA_PATH``, o último snapshot também é gravado em um
+arquivo SQLite e lido na inicialização seguinte, antes da primeira
+sincronização: a instância atende pedidos mesmo com o catálogo fora do ar.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from sqlalchemy import Column, Float, Integer, LargeBinary, MetaData, String, Table, create_engine, delete, insert, select
+from sqlalchemy.engine import Engine
+
+from src.serialization import dumps, loads
+
+snapshot_metadata = MetaData()
+catalog_snapshot = Table(
+    'catalog_snapshot',
+    snapshot_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('etag', String),
+    Column('lastModified', String),
+    Column('syncedAt', Float, nullable=False),
+    Column('products', LargeBinary, nullable=False),
+)
+
+
+def _normalize(item: Any) -> dict[str, Any] | None:
+    """Converte um item da listagem para o formato de ``/produto/codigo/{código}``.
+
+    A listagem (``ProdutoResponseBusca``) traz o código do grupo de estoque em
+    ``cod`` e a descrição do grupo em ``codGruEst``.
+    """
+    try:
+        code = int(item['codigoProduto'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return {
+        'id': item.get('id'),
+        'codigoProduto': code,
+        'descricao': item.get('descricao'),
+        'preco': item.get('preco'),
+        'codGruEst': item['cod'] if 'cod' in item else item.get('codGruEst'),
+    }
+
+
+class CatalogReplica:
+    """Produtos do catálogo por ``codigoProduto``, substituídos em bloco a cada sincronização."""
+
+    def __init__(
+        self,
+        enabled: bool | None = None,
+        interval: float | None = None,
+        path: str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if enabled is None:
+            enabled = os.getenv('CATALOG_REPLICA', 'false').lower() in {'1', 'true', 'yes', 'on'}
+        self.enabled = enabled
+        self.interval = interval if interval is not None else float(os.getenv('CATALOG_REPLICA_INTERVAL', '60'))
+        self.path = path or os.getenv('CATALOG_REPLICA_PATH') or None
+        self._clock = clock
+        self._products: dict[int, dict[str, Any]] = {}
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        self._synced_at: float | None = None
+        self._error: str | None = None
+        self._engine: Engine | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.hits = 0
+        self.misses = 0
+        self.syncs = 0
+        self.not_modified = 0
+        self.failures = 0
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    @property
+    def loaded(self) -> bool:
+        return self._synced_at is not None
+
+    def get(self, product_code: int) -> dict[str, Any] | None:
+        """Cópia do produto, ou ``None`` se a réplica está desligada, vazia ou não o conhece."""
+        if not self.enabled or not self._products:
+            return None
+        product = self._products.get(product_code)
+        with self._lock:
+            if product is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(product)
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+        return headers
+
+    def apply(self, payload: list[dict[str, Any]], etag: str | None = None, last_modified: str | None = None) -> bool:
+        """Substitui o snapshot pela listagem recebida; devolve se algum produto mudou."""
+        if not isinstance(payload, list):
+            raise ValueError('Listagem do catálogo inválida')
+        products = {}
+        for item in payload:
+            product = _normalize(item)
+            if product is not None:
+                products[product['codigoProduto']] = product
+        with self._lock:
+            changed = products != self._products
+            # Troca da referência inteira: leitores sem lock veem o snapshot antigo ou o novo.
+            self._products = products
+            self._etag = etag
+            self._last_modified = last_modified
+            self._synced_at = self._clock()
+            self._error = None
+            self.syncs += 1
+        if changed:
+            self._save()
+        return changed
+
+    def mark_not_modified(self) -> None:
+        with self._lock:
+            self._synced_at = self._clock()
+            self._error = None
+            self.not_modified += 1
+
+    def mark_failure(self, exc: Exception) -> None:
+        """Registra a falha; o último snapshot continua em uso."""
+        with self._lock:
+            self._error = f'{type(exc).__name__}: {exc}'
+            self.failures += 1
+
+    def _get_engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = create_engine(f'sqlite:///{self.path}')
+            snapshot_metadata.create_all(self._engine)
+        return self._engine
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            row = {
+                'id': 1,
+                'etag': self._etag,
+                'lastModified': self._last_modified,
+                'syncedAt': self._synced_at,
+                'products': dumps(list(self._products.values())),
+            }
+        with self._get_engine().begin() as connection:
+            connection.execute(delete(catalog_snapshot))
+            connection.execute(insert(catalog_snapshot).values(**row))
+
+    def load(self) -> int:
+        """Lê o snapshot gravado em ``path``, se ainda não houver um em memória; devolve quantos produtos."""
+        if not self.path or self._products or not os.path.exists(self.path):
+            return len(self._products)
+        with self._get_engine().connect() as connection:
+            row = connection.execute(select(catalog_snapshot)).first()
+        if row is None:
+            return 0
+        products = {product['codigoProduto']: product for product in loads(row.products)}
+        with self._lock:
+            if not self._products:
+                self._products = products
+                self._etag = row.etag
+                self._last_modified = row.lastModified
+                self._synced_at = row.syncedAt
+        return len(self._products)
+
+    def start(self, sync: Callable[[], Any]) -> None:
+        """Chama ``sync`` a cada ``interval`` segundos em uma thread até ``stop``."""
+        if not self.enabled or self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Evento novo por thread: uma anterior ainda dentro de ``sync``
+            # continua parada mesmo depois deste start.
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(sync, self._stop), name='catalog-replica', daemon=True
+            )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Para a thread, espera ela sair de ``sync`` (até ``timeout``) e fecha o banco do snapshot."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                # Ainda gravando o snapshot: o engine fica para ela.
+                return
+        if self._engine is not None:
+            self._engine.dispose()
+
+    def _run(self, sync: Callable[[], Any], stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            try:
+                sync()
+            except Exception as exc:
+                self.mark_failure(exc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._products = {}
+            self._etag = None
+            self._last_modified = None
+            self._synced_at = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            age = None if self._synced_at is None else round(self._clock() - self._synced_at, 3)
+            return {
+                'enabled': self.enabled,
+                'size': len(self._products),
+                'etag': self._etag,
+                'ageSeconds': age,
+                'error': self._error,
+                'hits': self.hits,
+                'misses': self.misses,
+                'syncs': self.syncs,
+                'notModified': self.not_modified,
+                'failures': self.failures,
+            }
@@ -1,7 +1,20 @@
 from http import HTTPStatus
-from fastapi import APIRouter
-from src.orders.model import OrderResponse, OrderRequest
-from src.orders.service import get_orders_service, create_order_service
+from fastapi import APIRouter, Request, Response
+from starlette.concurrency import run_in_threadpool
+from src.orders.async_database import async_mode
+from src.response_cache import response_cache
+from src.orders.model import OrderResponse, OrderRequest, OrderBatchRequest, TableSummaryResponse
+from src.orders.service import (
+    orders_cache_key,
+    get_table_summary_service,
+    get_table_summary_service_async,
+    load_orders_response_service,
+    create_order_service,
+    create_order_batch_service,
+    load_orders_response_service_async,
+    create_order_service_async,
+    create_order_batch_service_async,
+)
 
 
 router = APIRouter(prefix='/order', tags=['order'])
@@ -13,8 +26,28 @@ router = APIRouter(prefix='/order', tags=['order'])
     response_model=list[OrderResponse],
     description='List all orders'
 )
-def get_orders(order_number: int) -> list[OrderResponse]:
-    return get_orders_service(order_number)
+async def get_orders(order_number: int, request: Request) -> Response:
+    # Resposta já serializada e com ETag: pollers recebem 304 se nada mudou,
+    # e um acerto no cache nem chega ao pool de threads.
+    key = orders_cache_key(order_number)
+    entry = response_cache.get(key)
+    if entry is None and async_mode:
+        entry = await load_orders_response_service_async(order_number)
+    elif entry is None:
+        entry = await run_in_threadpool(load_orders_response_service, order_number)
+    return response_cache.respond(request, key, entry)
+
+
+@router.get(
+    '/table/{table_number}/summary',
+    status_code=HTTPStatus.OK,
+    response_model=TableSummaryResponse,
+    description='Summary of a table: orders, items, quantities and payments'
+)
+async def get_table_summary(table_number: int) -> TableSummaryResponse:
+    if async_mode:
+        return await get_table_summary_service_async(table_number)
+    return await run_in_threadpool(get_table_summary_service, table_number)
 
 
 @router.post(
@@ -22,5 +55,19 @@ def get_orders(order_number: int) -> list[OrderResponse]:
     status_code=HTTPStatus.CREATED,
     description='Create an order'
 )
-def create_order(order: OrderRequest) -> OrderResponse:
-    return create_order_service(order)
+async def create_order(order: OrderRequest) -> OrderResponse:
+    if async_mode:
+        return await create_order_service_async(order)
+    return await run_in_threadpool(create_order_service, order)
+
+
+@router.post(
+    '/batch',
+    status_code=HTTPStatus.CREATED,
+    response_model=list[OrderResponse],
+    description='Create all items of a table under a single order number'
+)
+async def create_order_batch(batch: OrderBatchRequest) -> list[OrderResponse]:
+    if async_mode:
+        return await create_order_batch_service_async(batch)
+    return await run_in_threadpool(create_order_batch_service, batch)
@@ -1,27 +1,147 @@
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 
 
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./orders.db')
-echo_flag = os.getenv('SQLALCHEMY_ECHO', 'true').lower() in {'1', 'true', 'yes', 'on'}
+echo_flag = os.getenv('SQLALCHEMY_ECHO', 'false').lower() in {'1', 'true', 'yes', 'on'}
 
-engine_kwargs: dict[str, object] = {
-    'echo': echo_flag,
-    'future': True,
+# PRAGMAs aplicados a cada nova conexão SQLite, por perfil. Cada valor pode ser
+# sobrescrito por SQLITE_<NOME> (ex.: SQLITE_BUSY_TIMEOUT=10000).
+SQLITE_PROFILES: dict[str, dict[str, object]] = {
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
 }
 
-if DATABASE_URL.startswith('sqlite'):
-    engine_kwargs['connect_args'] = {'check_same_thread': False}
-    if DATABASE_URL.endswith(':memory:') or DATABASE_URL == 'sqlite://':
-        engine_kwargs['poolclass'] = StaticPool
+# Dimensionamento do pool. SQLite em arquivo: o WAL permite leitores
+# concorrentes, mas as escritas continuam serializadas no arquivo.
+# PostgreSQL: cada worker abre até pool_size + max_overflow conexões por
+# engine (primário e réplica contam separado); WEB_CONCURRENCY vezes esse
+# total precisa caber no max_connections do servidor (100 por padrão).
+POOL_PROFILES: dict[str, dict[str, int | bool]] = {
+    'default': {},
+    'performance': {'pool_size': 8, 'max_overflow': 8, 'pool_timeout': 10},
+    'postgresql': {
+        'pool_size': 10,
+        'max_overflow': 5,
+        'pool_timeout': 5,
+        # Conexões derrubadas por failover ou pelo PgBouncer não chegam aos handlers.
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    },
+}
 
-engine = create_engine(
-    DATABASE_URL,
-    **engine_kwargs,
-)
+
+# Perfis que cada backend aceita e o usado quando DB_PROFILE é de outro backend.
+BACKEND_PROFILES: dict[str, tuple[str, ...]] = {
+    'sqlite': tuple(SQLITE_PROFILES),
+    'postgresql': ('postgresql',),
+}
+
+
+def profile_for(database_url: str) -> str:
+    """Perfil de uma URL: ``DB_PROFILE`` só vale para o backend que o aceita.
+
+    Assim, com pedidos em SQLite e pagamentos ou réplicas em PostgreSQL (ou o
+    contrário), cada engine recebe o perfil do seu próprio backend.
+    """
+    configured = (os.getenv('DB_PROFILE') or '').lower()
+    if configured and configured not in POOL_PROFILES and configured not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil de banco desconhecido: {configured}")
+    accepted = BACKEND_PROFILES.get(make_url(database_url).get_backend_name())
+    if accepted is None:
+        return configured or 'default'
+    return configured if configured in accepted else accepted[0]
+
+
+DB_PROFILE = profile_for(DATABASE_URL)
+
+
+def is_memory_database(database_url: str) -> bool:
+    return database_url.endswith(':memory:') or database_url.endswith('://')
+
+
+def sqlite_pragmas(profile: str) -> dict[str, object]:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil de banco desconhecido: {profile}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store'):
+        override = os.getenv(f'SQLITE_{name.upper()}')
+        if override:
+            pragmas[name] = override
+    return pragmas
+
+
+def pool_settings(profile: str) -> dict[str, int | bool]:
+    settings = dict(POOL_PROFILES.get(profile, {}))
+    for name, env in (
+        ('pool_size', 'DB_POOL_SIZE'),
+        ('max_overflow', 'DB_MAX_OVERFLOW'),
+        ('pool_timeout', 'DB_POOL_TIMEOUT'),
+        ('pool_recycle', 'DB_POOL_RECYCLE'),
+    ):
+        override = os.getenv(env)
+        if override:
+            settings[name] = int(override)
+    return settings
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict[str, object]) -> None:
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def create_database_engine(
+    database_url: str,
+    profile: str | None = None,
+    echo: bool = echo_flag,
+) -> Engine:
+    profile = profile or profile_for(database_url)
+    engine_kwargs: dict[str, object] = {
+        'echo': echo,
+        'future': True,
+    }
+
+    is_sqlite = database_url.startswith('sqlite')
+    if is_sqlite:
+        engine_kwargs['connect_args'] = {'check_same_thread': False}
+        if is_memory_database(database_url):
+            engine_kwargs['poolclass'] = StaticPool
+        else:
+            settings = pool_settings(profile)
+            if settings:
+                engine_kwargs['poolclass'] = QueuePool
+                engine_kwargs.update(settings)
+    else:
+        engine_kwargs.update(pool_settings(profile))
+
+    engine = create_engine(
+        database_url,
+        **engine_kwargs,
+    )
+    if is_sqlite:
+        apply_sqlite_pragmas(engine, sqlite_pragmas(profile))
+    return engine
+
+
+engine = create_database_engine(DATABASE_URL)
 SessionLocal = sessionmaker(
     bind=engine,
     autoflush=False,
@@ -0,0 +1,267 @@
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+import requests
+
+from src.metrics import count_catalog_event
+
+_DEFAULT_FALLBACK = object()
+
+
+class ServiceDiscoveryError(RuntimeError):
+    """Raised when Consul discovery cannot return a healthy service instance."""
+
+
+def _base_url_from_entry(service_entry: dict[str, Any]) -> str | None:
+    """Monta a URL base a partir de uma entrada de /v1/health/service do Consul."""
+    service = service_entry.get("Service", {})
+    address = service.get("Address") or service_entry.get("Node", {}).get("Address")
+    port = service.get("Port")
+    if not address or not port:
+        return None
+    return f"http://{address}:{port}"
+
+
+def _parse_wait(value: str) -> float:
+    value = value.strip()
+    if value.endswith("ms"):
+        return float(value[:-2]) / 1000
+    if value.endswith("m"):
+        return float(value[:-1]) * 60
+    return float(value.rstrip("s"))
+
+
+@dataclass
+class InstanceStats:
+    outstanding: int = 0
+    failures: int = 0
+    ejected_until: float = 0.0
+
+
+class ServiceInstanceCache:
+    """Lista de instâncias saudáveis de um serviço, mantida pelo Consul.
+
+    A primeira consulta é feita sob demanda; depois uma thread em segundo
+    plano acompanha as mudanças com *blocking queries* (``index``/``wait``),
+    sem custo por requisição. ``choose`` escolhe a instância pela regra das
+    duas escolhas (a com menos requisições em andamento entre duas sorteadas)
+    e ignora instâncias ejetadas localmente após falhas consecutivas.
+    """
+
+    def __init__(
+        self,
+        consul_addr: str | None = None,
+        service: str | None = None,
+        fallback_base_url: str | None | object = _DEFAULT_FALLBACK,
+        session: requests.Session | None = None,
+        wait: str | None = None,
+        ejection_failures: int | None = None,
+        ejection_period: float | None = None,
+        watch: bool | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.consul_addr = consul_addr or os.getenv("CONSUL_HTTP_ADDR", "http://localhost:8500")
+        self.service = service or os.getenv("GATEWAY_SERVICE_NAME", "api-gateway")
+        if fallback_base_url is _DEFAULT_FALLBACK:
+            env_fallback = os.getenv("GATEWAY_BASE_URL")
+            fallback_base_url = env_fallback or "http://127.0.0.1:8080"
+        self.fallback_base_url = fallback_base_url or None
+        self._session = session or requests.Session()
+        self._wait = wait or os.getenv("CONSUL_WATCH_WAIT", "30s")
+        self._ejection_failures = ejection_failures or int(os.getenv("CATALOG_EJECTION_FAILURES", "3"))
+        self._ejection_period = ejection_period if ejection_period is not None else float(
+            os.getenv("CATALOG_EJECTION_PERIOD", "30")
+        )
+        if watch is None:
+            watch = os.getenv("CONSUL_WATCH", "true").lower() in {"1", "true", "yes", "on"}
+        self._watch_enabled = watch
+        self._clock = clock
+
+        self._instances: dict[str, InstanceStats] = {}
+        self._index = 0
+        self._loaded = False
+        self._error: str | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.consul_addr}/v1/health/service/{self.service}"
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def using_fallback(self) -> bool:
+        return not self._instances and self.fallback_base_url is not None
+
+    def query_params(self, blocking: bool = False) -> dict[str, str]:
+        params = {"passing": "true"}
+        if blocking and self._index:
+            params["index"] = str(self._index)
+            params["wait"] = self._wait
+        return params
+
+    def apply(self, payload: list[dict[str, Any]], index: str | int | None = None) -> None:
+        """Atualiza a lista preservando contadores e ejeções das instâncias que seguem saudáveis."""
+        urls = [url for url in map(_base_url_from_entry, payload or []) if url]
+        with self._lock:
+            self._instances = {url: self._instances.get(url) or InstanceStats() for url in urls}
+            new_index = int(index or 0)
+            # Índice que volta para trás indica reinício do Consul: recomeça do zero.
+            self._index = new_index if new_index >= self._index else 0
+            self._loaded = True
+            if urls:
+                self._error = None
+            elif payload:
+                self._error = "Resposta do Consul incompleta para o gateway"
+            else:
+                self._error = f"Nenhuma instância saudável encontrada para {self.service}"
+
+    def fail(self, message: str) -> None:
+        """Registra falha ao consultar o Consul; a última lista conhecida é mantida."""
+        with self._lock:
+            self._loaded = True
+            self._error = message
+
+    def refresh(self, blocking: bool = False, session: requests.Session | None = None) -> bool:
+        timeout = _parse_wait(self._wait) + 5 if blocking else 5
+        try:
+            response = (session or self._session).get(
+                self.url, params=self.query_params(blocking), timeout=timeout
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError):
+            self.fail(f"Não foi possível consultar o Consul para {self.service}")
+            return False
+        self.apply(payload, response.headers.get("X-Consul-Index"))
+        return True
+
+    def ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.refresh()
+        self.start()
+
+    def start(self) -> None:
+        if not self._watch_enabled or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Evento novo por thread: uma anterior ainda presa na consulta
+            # bloqueante continua parada mesmo depois deste start.
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._watch, args=(self._stop,), name=f"consul-watch-{self.service}", daemon=True
+            )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Encerra o acompanhamento; com ``timeout``, espera a thread sair da consulta em curso."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None and timeout:
+            thread.join(timeout)
+
+    def _watch(self, stop: threading.Event) -> None:
+        session = requests.Session()
+        delay = 1.0
+        while not stop.is_set():
+            started = time.monotonic()
+            if self.refresh(blocking=True, session=session):
+                delay = 1.0
+                # Respostas imediatas (índice inalterado ou sem suporte a
+                # blocking query) não podem virar um laço apertado.
+                pause = 1.0 - (time.monotonic() - started)
+            else:
+                pause = delay
+                delay = min(delay * 2, 30.0)
+            if pause > 0:
+                stop.wait(pause)
+        session.close()
+
+    def _candidates(self, exclude: Iterable[str]) -> list[str]:
+        excluded = set(exclude)
+        now = self._clock()
+        available = [url for url in self._instances if url not in excluded]
+        healthy = [url for url in available if self._instances[url].ejected_until <= now]
+        # Com todas as instâncias ejetadas, volta a usar todas em vez de parar.
+        return healthy or available
+
+    def choose(self, exclude: Iterable[str] = ()) -> str | None:
+        """Escolhe uma instância; ``None`` quando só restam as excluídas.
+
+        Sem nenhuma instância conhecida, usa o fallback ou levanta
+        ``ServiceDiscoveryError``.
+        """
+        with self._lock:
+            if not self._instances:
+                if self.fallback_base_url:
+                    return None if self.fallback_base_url in set(exclude) else self.fallback_base_url
+                raise ServiceDiscoveryError(
+                    self._error or f"Nenhuma instância saudável encontrada para {self.service}"
+                )
+            candidates = self._candidates(exclude)
+            if not candidates:
+                return None
+            if len(candidates) == 1:
+                return candidates[0]
+            first, second = random.sample(candidates, 2)
+            if self._instances[second].outstanding < self._instances[first].outstanding:
+                return second
+            return first
+
+    def begin(self, url: str) -> None:
+        with self._lock:
+            stats = self._instances.get(url)
+            if stats is not None:
+                stats.outstanding += 1
+
+    def end(self, url: str, ok: bool) -> None:
+        """Fecha uma requisição; falhas consecutivas ejetam a instância por um período."""
+        with self._lock:
+            stats = self._instances.get(url)
+            if stats is None:
+                return
+            stats.outstanding = max(stats.outstanding - 1, 0)
+            if ok:
+                stats.failures = 0
+                return
+            stats.failures += 1
+            if stats.failures < self._ejection_failures:
+                return
+            stats.failures = 0
+            stats.ejected_until = self._clock() + self._ejection_period
+        count_catalog_event("ejection")
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            return [
+                {
+                    "url": url,
+                    "outstanding": stats.outstanding,
+                    "failures": stats.failures,
+                    "ejected": stats.ejected_until > now,
+                }
+                for url, stats in self._instances.items()
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._instances = {}
+            self._index = 0
+            self._loaded = False
+            self._error = None
@@ -1,6 +1,8 @@
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, mapped_column, registry
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import datetime
 
 
 table_registry = registry()
@@ -9,6 +11,10 @@ table_registry = registry()
 @table_registry.mapped_as_dataclass
 class OrderModel:
     __tablename__ = 'orders'
+    __table_args__ = (
+        Index('ix_orders_orderNumber', 'orderNumber'),
+        Index('ix_orders_tableNumber', 'tableNumber'),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True, autoincrement=True, init=False
     )
@@ -30,6 +36,60 @@ class OrderModel:
     productCode: Mapped[int] = mapped_column(
         nullable=False
     )
+    # Preço do catálogo no momento do pedido; NULL em pedidos ainda sem backfill.
+    unitPrice: Mapped[Optional[float]] = mapped_column(
+        nullable=True, default=None
+    )
+    lineTotal: Mapped[Optional[float]] = mapped_column(
+        nullable=True, default=None
+    )
+
+
+@table_registry.mapped_as_dataclass
+class OrderSequenceModel:
+    __tablename__ = 'order_sequences'
+    name: Mapped[str] = mapped_column(
+        primary_key=True
+    )
+    nextValue: Mapped[int] = mapped_column(
+        nullable=False
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TableSummaryModel:
+    """Totais dos pedidos em aberto da mesa, atualizados na mesma transação das escritas de pedidos e pagamentos."""
+    __tablename__ = 'table_summaries'
+    tableNumber: Mapped[int] = mapped_column(
+        primary_key=True, autoincrement=False
+    )
+    orderCount: Mapped[int] = mapped_column(
+        nullable=False, default=0
+    )
+    itemCount: Mapped[int] = mapped_column(
+        nullable=False, default=0
+    )
+    quantity: Mapped[int] = mapped_column(
+        nullable=False, default=0
+    )
+    billTotal: Mapped[float] = mapped_column(
+        nullable=False, default=0.0
+    )
+    pendingPayments: Mapped[int] = mapped_column(
+        nullable=False, default=0
+    )
+    pendingAmount: Mapped[float] = mapped_column(
+        nullable=False, default=0.0
+    )
+    completedPayments: Mapped[int] = mapped_column(
+        nullable=False, default=0
+    )
+    paidAmount: Mapped[float] = mapped_column(
+        nullable=False, default=0.0
+    )
+    updatedAt: Mapped[Optional[datetime]] = mapped_column(
+        nullable=True, default=None
+    )
 
 
 class Order(BaseModel):
@@ -39,6 +99,8 @@ class Order(BaseModel):
     description: Optional[str] = None
     codGruEst: int
     productCode: int
+    unitPrice: Optional[float] = None
+    lineTotal: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -53,5 +115,26 @@ class OrderRequest(BaseModel):
     tableNumber: int
     quantity: int
 
+class OrderBatchItem(BaseModel):
+    productCode: int
+    quantity: int
+
+class OrderBatchRequest(BaseModel):
+    tableNumber: int
+    items: list[OrderBatchItem] = Field(min_length=1)
+
 class OrderResponse(Order):
     id: int
+
+class TableSummaryResponse(BaseModel):
+    tableNumber: int
+    orderCount: int
+    itemCount: int
+    quantity: int
+    billTotal: float
+    pendingPayments: int
+    pendingAmount: float
+    completedPayments: int
+    paidAmount: float
+    paymentStatus: str
+    updatedAt: Optional[datetime] = None
@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import deque
+
+from sqlalchemy import Connection, Engine, func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.dialects import dialect_insert
+from src.orders.model import OrderModel, OrderSequenceModel
+
+
+sequences = OrderSequenceModel.__table__
+
+
+class OrderNumberAllocator:
+    """Distribui números de pedido reservando blocos na tabela ``order_sequences``.
+
+    Cada reserva é um único ``UPDATE ... RETURNING`` em transação própria, de
+    modo que processos diferentes nunca recebem o mesmo intervalo. Os números
+    do bloco são entregues da memória, sem acesso ao banco; blocos não usados
+    quando o processo termina viram lacunas na numeração. O tamanho do bloco
+    vem de ``ORDER_NUMBER_BLOCK_SIZE`` (1 mantém a numeração sem lacunas).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        async_engine: AsyncEngine | None = None,
+        block_size: int | None = None,
+        sequence: str = 'orders',
+    ) -> None:
+        self._engine = engine
+        self._async_engine = async_engine
+        self._block_size = block_size or int(os.getenv('ORDER_NUMBER_BLOCK_SIZE', '10'))
+        self._sequence = sequence
+        self._blocks: deque[list[int]] = deque()
+        self._lock = threading.Lock()
+
+    def _take(self) -> int | None:
+        while self._blocks:
+            block = self._blocks[0]
+            if block[0] < block[1]:
+                block[0] += 1
+                return block[0] - 1
+            self._blocks.popleft()
+        return None
+
+    def _reserve_on(self, connection: Connection) -> list[int]:
+        reserve = (
+            update(sequences)
+            .where(sequences.c.name == self._sequence)
+            .values(nextValue=sequences.c.nextValue + self._block_size)
+            .returning(sequences.c.nextValue)
+        )
+        next_value = connection.scalar(reserve)
+        if next_value is None:
+            # Primeira reserva: semeia a sequência a partir dos pedidos existentes.
+            seed = (connection.scalar(select(func.max(OrderModel.orderNumber))) or 0) + 1
+            insert = dialect_insert(connection.dialect.name)
+            connection.execute(
+                insert(sequences)
+                .values(name=self._sequence, nextValue=seed)
+                .on_conflict_do_nothing(index_elements=[sequences.c.name])
+            )
+            next_value = connection.scalar(reserve)
+        return [next_value - self._block_size, next_value]
+
+    def allocate(self) -> int:
+        with self._lock:
+            number = self._take()
+            if number is None:
+                with self._engine.begin() as connection:
+                    self._blocks.append(self._reserve_on(connection))
+                number = self._take()
+            return number
+
+    async def allocate_async(self) -> int:
+        with self._lock:
+            number = self._take()
+        if number is not None:
+            return number
+
+        async with self._async_engine.begin() as connection:
+            block = await connection.run_sync(self._reserve_on)
+        with self._lock:
+            self._blocks.append(block)
+            return self._take()
+
+    def reset(self) -> None:
+        """Descarta os blocos em memória (útil em testes)."""
+        with self._lock:
+            self._blocks.clear()
@@ -0,0 +1,94 @@
+"""Preços gravados nos pedidos e total do pedido calculado localmente.
+
+O preço (``preco``) lido do catálogo na criação do pedido fica em
+``orders.unitPrice`` junto com ``lineTotal``; cobrança e validação de
+pagamentos usam esses valores sem voltar ao ms-kotlin.
+
+Pedidos gravados antes dessas colunas são preenchidos com
+``python -m src.orders.pricing``, que consulta o catálogo em lotes de
+códigos distintos (``ORDER_BACKFILL_BATCH_SIZE``) e grava o preço atual do
+catálogo, já que o preço da época não foi guardado.
+"""
+import os
+from typing import Any
+
+from sqlalchemy import Engine, bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from src.orders.model import OrderModel
+from src.orders.table_summary import rebuild_table_summaries
+
+
+orders = OrderModel.__table__
+
+
+def parse_price(product: dict[str, Any]) -> float | None:
+    """Lê ``preco`` do produto; ``None`` se o catálogo não informar, ``ValueError`` se inválido."""
+    price = product.get("preco")
+    if price is None:
+        return None
+    return round(float(price), 2)
+
+
+def line_total(unit_price: float | None, quantity: int) -> float | None:
+    if unit_price is None:
+        return None
+    return round(unit_price * quantity, 2)
+
+
+def order_total(session: Session, order_number: int) -> float | None:
+    """Soma dos itens do pedido; ``None`` se o pedido não existe ou tem itens sem preço."""
+    items, priced, total = session.execute(
+        select(func.count(), func.count(OrderModel.lineTotal), func.sum(OrderModel.lineTotal))
+        .where(OrderModel.orderNumber == order_number)
+    ).one()
+    if items == 0 or priced < items:
+        return None
+    return round(total, 2)
+
+
+def backfill_order_prices(engine: Engine, client, batch_size: int | None = None) -> dict[str, Any]:
+    """Preenche ``unitPrice``/``lineTotal`` dos pedidos antigos e recalcula os resumos das mesas."""
+    batch_size = batch_size or int(os.getenv("ORDER_BACKFILL_BATCH_SIZE", "100"))
+    fill = (
+        update(orders)
+        .where(orders.c.productCode == bindparam("code"), orders.c.unitPrice.is_(None))
+        .values(unitPrice=bindparam("price"), lineTotal=func.round(orders.c.quantity * bindparam("price"), 2))
+    )
+    updated = 0
+    unpriced: list[int] = []
+    while True:
+        with engine.connect() as connection:
+            codes = connection.scalars(
+                select(orders.c.productCode)
+                .where(orders.c.unitPrice.is_(None), orders.c.productCode.not_in(unpriced))
+                .distinct()
+                .limit(batch_size)
+            ).all()
+        if not codes:
+            break
+
+        products, missing = client.find_products_by_codes(codes)
+        unpriced.extend(missing)
+        prices = []
+        for code, product in products.items():
+            price = parse_price(product)
+            if price is None:
+                unpriced.append(code)
+            else:
+                prices.append({"code": code, "price": price})
+        if prices:
+            with engine.begin() as connection:
+                updated += connection.execute(fill, prices).rowcount
+
+    with engine.begin() as connection:
+        rebuild_table_summaries(connection)
+    return {"updated": updated, "unpriced": sorted(unpriced)}
+
+
+if __name__ == "__main__":
+    from src.orders.database import engine
+    from src.orders.service import product_client
+
+    result = backfill_order_prices(engine, product_client)
+    print(f"Itens atualizados: {result['updated']}; produtos sem preço: {result['unpriced'] or 'nenhum'}")
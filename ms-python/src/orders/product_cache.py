@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable
+
+
+class CacheState(str, Enum):
+    FRESH = "FRESH"
+    STALE = "STALE"
+    MISS = "MISS"
+
+
+# Marcador armazenado no lugar do produto quando o catálogo respondeu 404.
+NOT_FOUND = object()
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    value: Any
+    expires_at: float
+    stale_until: float
+
+
+class ProductCache:
+    """Cache LRU limitado, com TTL por entrada, cache negativo e stale-while-revalidate.
+
+    Entradas vencidas continuam sendo servidas por ``stale_ttl`` segundos
+    (estado ``STALE``) enquanto o chamador revalida em segundo plano. Respostas
+    404 ficam em cache por ``negative_ttl`` segundos e nunca são servidas
+    vencidas. Configurável por ``PRODUCT_CACHE_MAX_ENTRIES``,
+    ``PRODUCT_CACHE_TTL``, ``PRODUCT_CACHE_NEGATIVE_TTL`` e
+    ``PRODUCT_CACHE_STALE_TTL``; ``max_entries=0`` desativa o cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+        stale_ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "1024")) if max_entries is None else max_entries
+        self._ttl = float(os.getenv("PRODUCT_CACHE_TTL", "300")) if ttl is None else ttl
+        self._negative_ttl = float(os.getenv("PRODUCT_CACHE_NEGATIVE_TTL", "30")) if negative_ttl is None else negative_ttl
+        self._stale_ttl = float(os.getenv("PRODUCT_CACHE_STALE_TTL", "600")) if stale_ttl is None else stale_ttl
+        self._clock = clock
+        self._entries: OrderedDict[int, _CacheEntry] = OrderedDict()
+        self._refreshing: set[int] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    def lookup(self, product_code: int) -> tuple[CacheState, Any]:
+        """Retorna o estado da entrada e o valor (produto ou ``NOT_FOUND``)."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(product_code)
+            if entry is None or now >= entry.stale_until:
+                if entry is not None:
+                    del self._entries[product_code]
+                self.misses += 1
+                return CacheState.MISS, None
+
+            self._entries.move_to_end(product_code)
+            if now < entry.expires_at:
+                if entry.value is NOT_FOUND:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return CacheState.FRESH, entry.value
+
+            self.stale_hits += 1
+            return CacheState.STALE, entry.value
+
+    def store(self, product_code: int, product: dict[str, Any]) -> None:
+        self._put(product_code, product, self._ttl, self._stale_ttl)
+
+    def store_missing(self, product_code: int) -> None:
+        self._put(product_code, NOT_FOUND, self._negative_ttl, 0.0)
+
+    def _put(self, product_code: int, value: Any, ttl: float, stale_ttl: float) -> None:
+        if not self.enabled:
+            return
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._entries[product_code] = _CacheEntry(value, expires_at, expires_at + stale_ttl)
+            self._entries.move_to_end(product_code)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin_refresh(self, product_code: int) -> bool:
+        """Marca a revalidação de um código; retorna False se já houver uma em curso."""
+        with self._lock:
+            if product_code in self._refreshing:
+                return False
+            self._refreshing.add(product_code)
+            return True
+
+    def end_refresh(self, product_code: int) -> None:
+        with self._lock:
+            self._refreshing.discard(product_code)
+
+    def invalidate(self, product_code: int) -> bool:
+        with self._lock:
+            return self._entries.pop(product_code, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxEntries": self._max_entries,
+                "hits": self.hits,
+                "staleHits": self.stale_hits,
+                "negativeHits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
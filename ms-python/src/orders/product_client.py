@@ -1,14 +1,62 @@
+import asyncio
 import os
-import random
-from typing import Any
-
-_DEFAULT_FALLBACK = object()
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Iterable
 
+import httpx
 import requests
 
+from src.metrics import count_catalog_event, observe_catalog
+from src.orders.catalog_replica import CatalogReplica
+from src.orders.discovery import _DEFAULT_FALLBACK, ServiceDiscoveryError, ServiceInstanceCache
+from src.orders.product_cache import NOT_FOUND, CacheState, ProductCache
+from src.orders.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from src.singleflight import SingleFlight
+
+
+def _from_cache(value: Any) -> dict[str, Any]:
+    if value is NOT_FOUND:
+        raise ValueError("Produto não encontrado")
+    return dict(value)
+
+
+def _missing_products_error(missing: list[int]) -> ValueError:
+    return ValueError(f"Produtos não encontrados: {', '.join(str(code) for code in sorted(missing))}")
+
+
+def _success_outcome(discovery: ServiceInstanceCache) -> str:
+    return "fallback" if discovery.using_fallback else "ok"
+
+
+def _from_replica(replica: CatalogReplica | None, product_code: int) -> dict[str, Any] | None:
+    if replica is None:
+        return None
+    started = time.perf_counter()
+    product = replica.get(product_code)
+    if product is not None:
+        observe_catalog("replica", started)
+    return product
+
+
+def _hedge_delay_from_env() -> float | None:
+    value = os.getenv("CATALOG_HEDGE_DELAY")
+    return float(value) if value else None
+
+
+def _circuit_open_error() -> CircuitOpenError:
+    count_catalog_event("circuit_open")
+    return CircuitOpenError("Catálogo de produtos indisponível (circuito aberto)")
+
 
-class ServiceDiscoveryError(RuntimeError):
-    """Raised when Consul discovery cannot return a healthy service instance."""
+def _is_retryable(exc: Exception) -> bool:
+    """Falhas de conexão, timeouts e 5xx indicam instância degradada."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)) and exc.response is not None:
+        return exc.response.status_code >= 500
+    return False
 
 
 class ProductGatewayClient:
@@ -20,65 +68,378 @@ class ProductGatewayClient:
         gateway_service: str | None = None,
         session: requests.Session | None = None,
         fallback_base_url: str | None | object = _DEFAULT_FALLBACK,
+        cache: ProductCache | None = None,
+        timeout: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        retry: RetryPolicy | None = None,
+        hedge_delay: float | None = None,
+        discovery: ServiceInstanceCache | None = None,
+        replica: CatalogReplica | None = None,
+        flight: SingleFlight | None = None,
     ) -> None:
-        self._consul_addr = consul_addr or os.getenv("CONSUL_HTTP_ADDR", "http://localhost:8500")
-        self._gateway_service = gateway_service or os.getenv("GATEWAY_SERVICE_NAME", "api-gateway")
         self._session = session or requests.Session()
-        if fallback_base_url is _DEFAULT_FALLBACK:
-            env_fallback = os.getenv("GATEWAY_BASE_URL")
-            fallback_base_url = env_fallback or "http://127.0.0.1:8080"
-        self._fallback_base_url = fallback_base_url or None
-        self._gateway_base_url: str | None = None
-
-    def _discover_gateway(self) -> str:
-        """Consulta o Consul por uma instância saudável do API Gateway."""
+        self._discovery = discovery or ServiceInstanceCache(
+            consul_addr, gateway_service, fallback_base_url, session=requests.Session()
+        )
+        self._cache = cache or ProductCache()
+        self._timeout = timeout or float(os.getenv("CATALOG_TIMEOUT", "5"))
+        self._breaker = breaker or CircuitBreaker()
+        self._retry = retry or RetryPolicy()
+        self._hedge_delay = hedge_delay if hedge_delay is not None else _hedge_delay_from_env()
+        self._replica = replica
+        self._flight = flight or SingleFlight("catalog")
+        self._bulk_concurrency = int(os.getenv("CATALOG_BULK_CONCURRENCY", "8"))
+        self._executor: ThreadPoolExecutor | None = None
+        self._hedge_executor: ThreadPoolExecutor | None = None
+
+    def _discover_gateway(self) -> None:
+        """Consulta o Consul imediatamente, sem esperar a thread de acompanhamento."""
+        self._discovery.refresh()
+
+    def _get_gateway_base_url(self, exclude: Iterable[str] = ()) -> str:
+        self._discovery.ensure_loaded()
+        base_url = self._discovery.choose(exclude)
+        if base_url is None:
+            # Todas as instâncias conhecidas já falharam nesta consulta.
+            count_catalog_event("rediscovery")
+            self._discover_gateway()
+            base_url = self._discovery.choose(exclude) or self._discovery.choose()
+        return base_url
+
+    def _get_product_at(self, base_url: str, product_code: int, timeout: float) -> dict[str, Any]:
+        response = self._session.get(
+            f"{base_url}/ms-kotlin/produto/codigo/{product_code}",
+            timeout=timeout,
+        )
+
+        if response.status_code == 404:
+            raise ValueError("Produto não encontrado")
+
+        response.raise_for_status()
+        return response.json()
+
+    def _request_product(self, base_url: str, product_code: int, timeout: float) -> dict[str, Any]:
+        """Consulta uma instância contabilizando requisições em andamento e falhas."""
+        self._discovery.begin(base_url)
         try:
-            response = self._session.get(
-                f"{self._consul_addr}/v1/health/service/{self._gateway_service}",
-                params={"passing": True},
-                timeout=5,
-            )
-            response.raise_for_status()
-            payload = response.json()
-        except requests.RequestException as exc:
-            if self._fallback_base_url:
-                self._gateway_base_url = self._fallback_base_url
-                return self._gateway_base_url
-            raise ServiceDiscoveryError(
-                f"Não foi possível consultar o Consul para {self._gateway_service}"
-            ) from exc
-        if not payload:
-            if self._fallback_base_url:
-                self._gateway_base_url = self._fallback_base_url
-                return self._gateway_base_url
-            raise ServiceDiscoveryError(
-                f"Nenhuma instância saudável encontrada para {self._gateway_service}"
-            )
+            product = self._get_product_at(base_url, product_code, timeout)
+        except Exception as exc:
+            self._discovery.end(base_url, ok=not _is_retryable(exc))
+            raise
+        self._discovery.end(base_url, ok=True)
+        return product
+
+    def _request_hedged(self, base_url: str, product_code: int, timeout: float) -> dict[str, Any]:
+        """Dispara uma segunda consulta a outra instância se a primeira demorar.
+
+        Vale a primeira resposta bem-sucedida; um 404 é definitivo.
+        """
+        alternate = self._discovery.choose(exclude=(base_url,))
+        if self._hedge_delay is None or alternate is None:
+            return self._request_product(base_url, product_code, timeout)
+
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._request_product, base_url, product_code, timeout)
+        done, _ = wait([primary], timeout=self._hedge_delay)
+        if done:
+            return primary.result()
+
+        count_catalog_event("hedge")
+        hedge = executor.submit(self._request_product, alternate, product_code, timeout)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    if future is hedge:
+                        count_catalog_event("hedge_win")
+                    return future.result()
+                if isinstance(exc, ValueError):
+                    raise exc
+        return primary.result()
+
+    def _fetch_product(self, product_code: int) -> dict[str, Any]:
+        """Consulta o catálogo com disjuntor, novas tentativas e hedging.
+
+        Falhas de conexão, timeouts e 5xx contam para o disjuntor, descartam a
+        instância em uso e são repetidas com backoff enquanto couberem em
+        ``RetryPolicy.deadline``.
+        """
+        deadline = time.monotonic() + self._retry.deadline
+        tried: list[str] = []
+        while True:
+            base_url = self._get_gateway_base_url(tried)
+            if not self._breaker.allow_request():
+                raise _circuit_open_error()
+            timeout = min(self._timeout, max(deadline - time.monotonic(), 0.001))
+            try:
+                product = self._request_hedged(base_url, product_code, timeout)
+            except Exception as exc:
+                if not _is_retryable(exc):
+                    # 404 e demais respostas 4xx mostram que o catálogo está de pé.
+                    self._breaker.record_success()
+                    raise
+                self._breaker.record_failure()
+                tried.append(base_url)
+                delay = self._retry.backoff(len(tried))
+                if len(tried) >= self._retry.max_attempts or time.monotonic() + delay >= deadline:
+                    raise
+                count_catalog_event("retry")
+                time.sleep(delay)
+                continue
+            self._breaker.record_success()
+            return product
+
+    def _load_product(self, product_code: int) -> dict[str, Any]:
+        """Consulta o catálogo; chamadas simultâneas para o mesmo código esperam a que já está em curso."""
+        return dict(self._flight.do(product_code, lambda: self._load_product_now(product_code)))
+
+    def _load_product_now(self, product_code: int) -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            product = self._fetch_product(product_code)
+        except ValueError:
+            self._cache.store_missing(product_code)
+            observe_catalog("not_found", started)
+            raise
+        except ServiceDiscoveryError:
+            observe_catalog("discovery_failure", started)
+            raise
+        except CircuitOpenError:
+            observe_catalog("circuit_open", started)
+            raise
+        except Exception:
+            observe_catalog("error", started)
+            raise
+        self._cache.store(product_code, product)
+        observe_catalog(_success_outcome(self._discovery), started)
+        return dict(product)
+
+    def _refresh_in_background(self, product_code: int) -> None:
+        if not self._cache.begin_refresh(product_code):
+            return
 
-        service_entry = random.choice(payload)
-        service = service_entry.get("Service", {})
-        address = service.get("Address") or service_entry.get("Node", {}).get("Address")
-        port = service.get("Port")
-        if not address or not port:
-            if self._fallback_base_url:
-                self._gateway_base_url = self._fallback_base_url
-                return self._gateway_base_url
-            raise ServiceDiscoveryError("Resposta do Consul incompleta para o gateway")
+        def refresh() -> None:
+            try:
+                self._load_product(product_code)
+            except Exception:
+                # Mantém a entrada antiga; ela expira ao fim da janela stale.
+                pass
+            finally:
+                self._cache.end_refresh(product_code)
 
-        self._gateway_base_url = f"http://{address}:{port}"
-        return self._gateway_base_url
+        threading.Thread(target=refresh, name=f"product-refresh-{product_code}", daemon=True).start()
 
-    def _get_gateway_base_url(self) -> str:
-        if self._gateway_base_url:
-            return self._gateway_base_url
-        return self._discover_gateway()
+    def _lookup_cached(self, product_code: int) -> tuple[bool, Any]:
+        started = time.perf_counter()
+        state, value = self._cache.lookup(product_code)
+        if state is CacheState.STALE and value is not NOT_FOUND:
+            self._refresh_in_background(product_code)
+        if state is CacheState.MISS:
+            return False, None
+        observe_catalog("hit", started)
+        return True, value
+
+    def _try_load_product(self, product_code: int) -> Any:
+        try:
+            return self._load_product(product_code)
+        except ValueError:
+            return NOT_FOUND
 
     def get_product_by_code(self, product_code: int) -> dict[str, Any]:
-        """Obtém o produto via rota do gateway que aponta para o ms-kotlin."""
+        """Obtém o produto via rota do gateway que aponta para o ms-kotlin.
+
+        Consulta primeiro a réplica do catálogo e o cache local; entradas
+        vencidas dentro da janela stale são devolvidas imediatamente e
+        revalidadas em segundo plano.
+        """
+        product = _from_replica(self._replica, product_code)
+        if product is not None:
+            return product
+        found, value = self._lookup_cached(product_code)
+        if found:
+            return _from_cache(value)
+        return self._load_product(product_code)
+
+    def get_products_by_codes(self, product_codes: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """Resolve vários códigos de uma vez, sem repetir consultas.
+
+        O ms-kotlin não expõe rota de busca em lote, então os códigos que não
+        estão em cache são consultados em paralelo (``CATALOG_BULK_CONCURRENCY``).
+        Levanta ``ValueError`` listando todos os códigos inexistentes.
+        """
+        resolved, missing = self.find_products_by_codes(product_codes)
+        if missing:
+            raise _missing_products_error(missing)
+        return resolved
+
+    def find_products_by_codes(self, product_codes: Iterable[int]) -> tuple[dict[int, dict[str, Any]], list[int]]:
+        """Como ``get_products_by_codes``, mas devolve os inexistentes em vez de falhar."""
+        resolved: dict[int, dict[str, Any]] = {}
+        missing: list[int] = []
+        pending: list[int] = []
+        for product_code in dict.fromkeys(product_codes):
+            product = _from_replica(self._replica, product_code)
+            if product is not None:
+                resolved[product_code] = product
+                continue
+            found, value = self._lookup_cached(product_code)
+            if not found:
+                pending.append(product_code)
+            elif value is NOT_FOUND:
+                missing.append(product_code)
+            else:
+                resolved[product_code] = dict(value)
+
+        if len(pending) > 1:
+            loaded = list(self._get_executor().map(self._try_load_product, pending))
+        else:
+            loaded = [self._try_load_product(product_code) for product_code in pending]
+
+        for product_code, product in zip(pending, loaded):
+            if product is NOT_FOUND:
+                missing.append(product_code)
+            else:
+                resolved[product_code] = product
+        return resolved, missing
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._bulk_concurrency, thread_name_prefix="catalog-lookup"
+            )
+        return self._executor
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        # Separado do executor de lote para que as consultas paralelas não
+        # esperem por vagas ocupadas por elas mesmas.
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=self._bulk_concurrency * 2, thread_name_prefix="catalog-hedge"
+            )
+        return self._hedge_executor
+
+    def sync_catalog(self) -> bool:
+        """Baixa a listagem completa do catálogo para a réplica; devolve se ela mudou.
+
+        A consulta é condicional: com a listagem inalterada o gateway responde
+        304 e a réplica só registra a verificação.
+        """
+        if self._replica is None:
+            raise RuntimeError("Cliente sem réplica do catálogo")
         base_url = self._get_gateway_base_url()
         response = self._session.get(
+            f"{base_url}/ms-kotlin/produto",
+            headers=self._replica.conditional_headers(),
+            timeout=self._timeout,
+        )
+        if response.status_code == 304:
+            self._replica.mark_not_modified()
+            return False
+        response.raise_for_status()
+        return self._replica.apply(
+            response.json(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+        )
+
+    def invalidate_product(self, product_code: int) -> bool:
+        """Remove um produto do cache (ex.: após alteração no catálogo)."""
+        return self._cache.invalidate(product_code)
+
+    def cache_stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+    def breaker_state(self) -> str:
+        return self._breaker.state.value
+
+    def clear_cache(self) -> None:
+        """Limpa as instâncias descobertas, a réplica, o cache de produtos e o disjuntor (útil em testes)."""
+        self._discovery.reset()
+        self._cache.clear()
+        self._breaker.reset()
+        if self._replica is not None:
+            self._replica.clear()
+
+
+class AsyncProductGatewayClient:
+    """Versão assíncrona do cliente, com pool de conexões keep-alive via httpx.
+
+    Os limites do pool podem ser ajustados pelos parâmetros ou pelas variáveis
+    ``CATALOG_MAX_CONNECTIONS``, ``CATALOG_MAX_KEEPALIVE_CONNECTIONS``,
+    ``CATALOG_KEEPALIVE_EXPIRY`` e ``CATALOG_TIMEOUT``.
+    """
+
+    def __init__(
+        self,
+        consul_addr: str | None = None,
+        gateway_service: str | None = None,
+        client: httpx.AsyncClient | None = None,
+        fallback_base_url: str | None | object = _DEFAULT_FALLBACK,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        timeout: float | None = None,
+        cache: ProductCache | None = None,
+        breaker: CircuitBreaker | None = None,
+        retry: RetryPolicy | None = None,
+        hedge_delay: float | None = None,
+        discovery: ServiceInstanceCache | None = None,
+        replica: CatalogReplica | None = None,
+        flight: SingleFlight | None = None,
+    ) -> None:
+        self._discovery = discovery or ServiceInstanceCache(consul_addr, gateway_service, fallback_base_url)
+
+        self._limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("CATALOG_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=max_keepalive_connections
+            or int(os.getenv("CATALOG_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("CATALOG_KEEPALIVE_EXPIRY", "30")),
+        )
+        self._timeout = timeout or float(os.getenv("CATALOG_TIMEOUT", "5"))
+        self._client = client
+        self._owns_client = client is None
+        self._cache = cache or ProductCache()
+        self._breaker = breaker or CircuitBreaker()
+        self._retry = retry or RetryPolicy()
+        self._hedge_delay = hedge_delay if hedge_delay is not None else _hedge_delay_from_env()
+        self._replica = replica
+        self._flight = flight or SingleFlight("catalog")
+        self._refresh_tasks: set[asyncio.Task] = set()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Criado sob demanda para que o pool pertença ao event loop em uso.
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+        return self._client
+
+    async def _discover_gateway(self) -> None:
+        """Consulta o Consul imediatamente, sem bloquear o event loop."""
+        try:
+            response = await self._get_client().get(
+                self._discovery.url, params=self._discovery.query_params()
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (httpx.HTTPError, ValueError):
+            self._discovery.fail(f"Não foi possível consultar o Consul para {self._discovery.service}")
+            return
+        self._discovery.apply(payload, response.headers.get("X-Consul-Index"))
+
+    async def _get_gateway_base_url(self, exclude: Iterable[str] = ()) -> str:
+        if not self._discovery.loaded:
+            await self._discover_gateway()
+        self._discovery.start()
+        base_url = self._discovery.choose(exclude)
+        if base_url is None:
+            count_catalog_event("rediscovery")
+            await self._discover_gateway()
+            base_url = self._discovery.choose(exclude) or self._discovery.choose()
+        return base_url
+
+    async def _get_product_at(self, base_url: str, product_code: int, timeout: float) -> dict[str, Any]:
+        response = await self._get_client().get(
             f"{base_url}/ms-kotlin/produto/codigo/{product_code}",
-            timeout=5,
+            timeout=timeout,
         )
 
         if response.status_code == 404:
@@ -87,6 +448,196 @@ class ProductGatewayClient:
         response.raise_for_status()
         return response.json()
 
+    async def _request_product(self, base_url: str, product_code: int, timeout: float) -> dict[str, Any]:
+        self._discovery.begin(base_url)
+        try:
+            product = await self._get_product_at(base_url, product_code, timeout)
+        except Exception as exc:
+            self._discovery.end(base_url, ok=not _is_retryable(exc))
+            raise
+        self._discovery.end(base_url, ok=True)
+        return product
+
+    async def _request_hedged(self, base_url: str, product_code: int, timeout: float) -> dict[str, Any]:
+        """Dispara uma segunda consulta a outra instância se a primeira demorar.
+
+        Vale a primeira resposta bem-sucedida; um 404 é definitivo. A consulta
+        perdedora é cancelada.
+        """
+        alternate = self._discovery.choose(exclude=(base_url,))
+        if self._hedge_delay is None or alternate is None:
+            return await self._request_product(base_url, product_code, timeout)
+
+        primary = asyncio.ensure_future(self._request_product(base_url, product_code, timeout))
+        hedge: asyncio.Future | None = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay)
+            if done:
+                return primary.result()
+
+            count_catalog_event("hedge")
+            hedge = asyncio.ensure_future(self._request_product(alternate, product_code, timeout))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        if task is hedge:
+                            count_catalog_event("hedge_win")
+                        return task.result()
+                    if isinstance(exc, ValueError):
+                        raise exc
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _fetch_product(self, product_code: int) -> dict[str, Any]:
+        """Consulta o catálogo com disjuntor, novas tentativas e hedging."""
+        deadline = time.monotonic() + self._retry.deadline
+        tried: list[str] = []
+        while True:
+            base_url = await self._get_gateway_base_url(tried)
+            if not self._breaker.allow_request():
+                raise _circuit_open_error()
+            timeout = min(self._timeout, max(deadline - time.monotonic(), 0.001))
+            try:
+                product = await self._request_hedged(base_url, product_code, timeout)
+            except Exception as exc:
+                if not _is_retryable(exc):
+                    self._breaker.record_success()
+                    raise
+                self._breaker.record_failure()
+                tried.append(base_url)
+                delay = self._retry.backoff(len(tried))
+                if len(tried) >= self._retry.max_attempts or time.monotonic() + delay >= deadline:
+                    raise
+                count_catalog_event("retry")
+                await asyncio.sleep(delay)
+                continue
+            self._breaker.record_success()
+            return product
+
+    async def _load_product(self, product_code: int) -> dict[str, Any]:
+        product = await self._flight.do_async(product_code, lambda: self._load_product_now(product_code))
+        return dict(product)
+
+    async def _load_product_now(self, product_code: int) -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            product = await self._fetch_product(product_code)
+        except ValueError:
+            self._cache.store_missing(product_code)
+            observe_catalog("not_found", started)
+            raise
+        except ServiceDiscoveryError:
+            observe_catalog("discovery_failure", started)
+            raise
+        except CircuitOpenError:
+            observe_catalog("circuit_open", started)
+            raise
+        except Exception:
+            observe_catalog("error", started)
+            raise
+        self._cache.store(product_code, product)
+        observe_catalog(_success_outcome(self._discovery), started)
+        return dict(product)
+
+    def _refresh_in_background(self, product_code: int) -> None:
+        if not self._cache.begin_refresh(product_code):
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._load_product(product_code)
+            except Exception:
+                pass
+            finally:
+                self._cache.end_refresh(product_code)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    def _lookup_cached(self, product_code: int) -> tuple[bool, Any]:
+        started = time.perf_counter()
+        state, value = self._cache.lookup(product_code)
+        if state is CacheState.STALE and value is not NOT_FOUND:
+            self._refresh_in_background(product_code)
+        if state is CacheState.MISS:
+            return False, None
+        observe_catalog("hit", started)
+        return True, value
+
+    async def _try_load_product(self, product_code: int) -> Any:
+        try:
+            return await self._load_product(product_code)
+        except ValueError:
+            return NOT_FOUND
+
+    async def get_product_by_code(self, product_code: int) -> dict[str, Any]:
+        """Obtém o produto via rota do gateway que aponta para o ms-kotlin."""
+        product = _from_replica(self._replica, product_code)
+        if product is not None:
+            return product
+        found, value = self._lookup_cached(product_code)
+        if found:
+            return _from_cache(value)
+        return await self._load_product(product_code)
+
+    async def get_products_by_codes(self, product_codes: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """Resolve vários códigos de uma vez; os ausentes do cache são buscados em paralelo."""
+        resolved: dict[int, dict[str, Any]] = {}
+        missing: list[int] = []
+        pending: list[int] = []
+        for product_code in dict.fromkeys(product_codes):
+            product = _from_replica(self._replica, product_code)
+            if product is not None:
+                resolved[product_code] = product
+                continue
+            found, value = self._lookup_cached(product_code)
+            if not found:
+                pending.append(product_code)
+            elif value is NOT_FOUND:
+                missing.append(product_code)
+            else:
+                resolved[product_code] = dict(value)
+
+        loaded = await asyncio.gather(*(self._try_load_product(code) for code in pending))
+        for product_code, product in zip(pending, loaded):
+            if product is NOT_FOUND:
+                missing.append(product_code)
+            else:
+                resolved[product_code] = product
+
+        if missing:
+            raise _missing_products_error(missing)
+        return resolved
+
+    def invalidate_product(self, product_code: int) -> bool:
+        """Remove um produto do cache (ex.: após alteração no catálogo)."""
+        return self._cache.invalidate(product_code)
+
+    def cache_stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+    def breaker_state(self) -> str:
+        return self._breaker.state.value
+
     def clear_cache(self) -> None:
-        """Permite limpar a URL cacheada do gateway (útil em testes)."""
-        self._gateway_base_url = None
+        """Limpa as instâncias descobertas, a réplica, o cache de produtos e o disjuntor (útil em testes)."""
+        self._discovery.reset()
+        self._cache.clear()
+        self._breaker.reset()
+        if self._replica is not None:
+            self._replica.clear()
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões (chamado no shutdown da aplicação)."""
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,106 @@
+import os
+import random
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the circuit breaker rejects a call to a degraded dependency."""
+
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """Disjuntor clássico: abre após falhas consecutivas e sonda antes de fechar.
+
+    Em ``OPEN`` todas as chamadas são rejeitadas até ``reset_timeout``; depois
+    o estado passa a ``HALF_OPEN`` e apenas ``half_open_max_calls`` sondagens
+    são liberadas. Um sucesso fecha o circuito, uma falha o reabre.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold or int(os.getenv("CATALOG_BREAKER_FAILURES", "5"))
+        self._reset_timeout = reset_timeout if reset_timeout is not None else float(
+            os.getenv("CATALOG_BREAKER_RESET", "10")
+        )
+        self._half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state is CircuitState.OPEN and self._clock() - self._opened_at >= self._reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._probes = 0
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._maybe_half_open()
+            if self._state is CircuitState.CLOSED:
+                return True
+            if self._state is CircuitState.HALF_OPEN and self._probes < self._half_open_max_calls:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.HALF_OPEN or self._failures >= self._failure_threshold:
+                self._state = CircuitState.OPEN
+                self._opened_at = self._clock()
+
+
+class RetryPolicy:
+    """Tentativas limitadas com backoff exponencial e jitter completo.
+
+    ``deadline`` limita o tempo total gasto com uma consulta, somando as
+    tentativas e as esperas entre elas.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_delay: float | None = None,
+        deadline: float | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts or int(os.getenv("CATALOG_RETRY_ATTEMPTS", "3"))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("CATALOG_RETRY_BASE_DELAY", "0.05"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("CATALOG_RETRY_MAX_DELAY", "0.5"))
+        self.deadline = deadline if deadline is not None else float(os.getenv("CATALOG_DEADLINE", "8"))
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
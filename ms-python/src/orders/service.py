@@ -1,52 +1,334 @@
+import os
+from typing import Any
+
 from fastapi import HTTPException
-from sqlalchemy import select, func
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from src.archive import archived_order_items
+from src.events.outbox import record_event
+from src.orders.catalog_replica import CatalogReplica
+from src.orders.discovery import ServiceInstanceCache
+from src.orders.model import (
+    OrderBatchRequest,
+    OrderModel,
+    OrderRequest,
+    OrderResponse,
+    TableSummaryModel,
+    TableSummaryResponse,
+)
+from src.orders.order_number import OrderNumberAllocator
+from src.orders.pricing import line_total, parse_price
+from src.orders.product_cache import ProductCache
+from src.orders.product_client import (
+    AsyncProductGatewayClient,
+    ProductGatewayClient,
+    ServiceDiscoveryError,
+)
+from src.orders.resilience import CircuitBreaker, CircuitOpenError
+from src.orders.table_summary import payment_status, record_order_items
+from src.response_cache import CachedResponse, response_cache
+from src.serialization import dumps, dumps_result
+from src.singleflight import SingleFlight
+from src.storage import storage, writer
+
+# Os dois clientes compartilham o mesmo cache de produtos.
+product_cache = ProductCache()
+# O disjuntor é compartilhado: falhas vistas por um modo abrem o circuito para ambos.
+catalog_breaker = CircuitBreaker()
+# Assim como a lista de instâncias do gateway, acompanhada por uma única thread.
+gateway_discovery = ServiceInstanceCache()
+# Com CATALOG_REPLICA, o catálogo inteiro fica em memória e só códigos desconhecidos vão à rede.
+catalog_replica = CatalogReplica()
+# Consultas simultâneas ao mesmo produto viram uma só chamada ao gateway.
+catalog_flight = SingleFlight('catalog')
+product_client = ProductGatewayClient(
+    cache=product_cache,
+    breaker=catalog_breaker,
+    discovery=gateway_discovery,
+    replica=catalog_replica,
+    flight=catalog_flight,
+)
+async_product_client = AsyncProductGatewayClient(
+    cache=product_cache,
+    breaker=catalog_breaker,
+    discovery=gateway_discovery,
+    replica=catalog_replica,
+    flight=catalog_flight,
+)
+order_number_allocator = OrderNumberAllocator(storage.orders.primary, storage.orders.async_primary)
+# Produtos mais pedidos carregados no cache durante a inicialização (0 desliga).
+CATALOG_WARMUP_PRODUCTS = int(os.getenv('CATALOG_WARMUP_PRODUCTS', '50'))
+
+# Colunas na ordem dos campos de OrderResponse, para o caminho rápido de leitura.
+ORDER_COLUMNS = (
+    OrderModel.orderNumber,
+    OrderModel.tableNumber,
+    OrderModel.quantity,
+    OrderModel.description,
+    OrderModel.codGruEst,
+    OrderModel.productCode,
+    OrderModel.unitPrice,
+    OrderModel.lineTotal,
+    OrderModel.id,
+)
+
+
+def orders_cache_key(order_number: int) -> tuple[str, int]:
+    return ("order", order_number)
+
+
+def _catalog_error(exc: Exception) -> HTTPException:
+    if isinstance(exc, ValueError):
+        return HTTPException(status_code=404, detail=str(exc))
+    if isinstance(exc, (ServiceDiscoveryError, CircuitOpenError)):
+        return HTTPException(status_code=503, detail=str(exc))
+    return HTTPException(status_code=502, detail="Falha ao consultar catálogo de produtos")
+
+
+def _parse_product(product: dict[str, Any]) -> tuple[str | None, int, float | None]:
+    try:
+        cod_gru_est = int(product["codGruEst"])
+        unit_price = parse_price(product)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise HTTPException(status_code=502, detail="Resposta do catálogo de produtos inválida") from exc
+
+    return product.get("descricao"), cod_gru_est, unit_price
+
+
+def _stage_order(
+    session: Session,
+    order: OrderRequest,
+    order_number: int,
+    description: str | None,
+    cod_gru_est: int,
+    unit_price: float | None = None,
+) -> OrderResponse:
+    """Grava o item, o resumo da mesa e o evento na sessão, sem commit."""
+    order_db = OrderModel(
+        orderNumber=order_number,
+        description=description,
+        codGruEst=cod_gru_est,
+        unitPrice=unit_price,
+        lineTotal=line_total(unit_price, order.quantity),
+        **order.model_dump(),
+    )
+    session.add(order_db)
+    record_order_items(session, order.tableNumber, [order.quantity], order_db.lineTotal or 0.0)
+    session.flush()
+    created = OrderResponse.model_validate(order_db)
+    _record_order_created(session, order_number, order.tableNumber, [created])
+    return created
 
-from src.orders.database import SessionLocal
-from src.orders.model import OrderModel, OrderRequest, OrderResponse
-from src.orders.product_client import ProductGatewayClient, ServiceDiscoveryError
 
-product_client = ProductGatewayClient()
+def _invalidate_order(order_number: int) -> None:
+    storage.written(orders_cache_key(order_number))
+    response_cache.invalidate(orders_cache_key(order_number))
+
+
+def _record_order_created(session: Session, order_number: int, table_number: int, items: list[OrderResponse]) -> None:
+    record_event(session, 'order.created', order_number, {
+        "orderNumber": order_number,
+        "tableNumber": table_number,
+        "items": [item.model_dump() for item in items],
+    })
+
+
+def _stage_order_batch(
+    session: Session,
+    batch: OrderBatchRequest,
+    order_number: int,
+    products: dict[int, tuple[str | None, int, float | None]],
+) -> list[OrderResponse]:
+    """Grava todos os itens da mesa sob um único número de pedido, sem commit."""
+    rows = []
+    for item in batch.items:
+        description, cod_gru_est, unit_price = products[item.productCode]
+        rows.append({
+            "orderNumber": order_number,
+            "tableNumber": batch.tableNumber,
+            "quantity": item.quantity,
+            "description": description,
+            "codGruEst": cod_gru_est,
+            "productCode": item.productCode,
+            "unitPrice": unit_price,
+            "lineTotal": line_total(unit_price, item.quantity),
+        })
+
+    orders = session.scalars(
+        insert(OrderModel).returning(OrderModel, sort_by_parameter_order=True),
+        rows,
+    ).all()
+    created = [OrderResponse.model_validate(order) for order in orders]
+    bill_total = sum(row["lineTotal"] or 0.0 for row in rows)
+    record_order_items(session, batch.tableNumber, [item.quantity for item in batch.items], bill_total)
+    _record_order_created(session, order_number, batch.tableNumber, created)
+    return created
+
+
+def _table_summary_response(summary: TableSummaryModel | None, table_number: int) -> TableSummaryResponse:
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Nenhum pedido para a mesa {table_number}")
+    return TableSummaryResponse(
+        tableNumber=summary.tableNumber,
+        orderCount=summary.orderCount,
+        itemCount=summary.itemCount,
+        quantity=summary.quantity,
+        billTotal=round(summary.billTotal, 2),
+        pendingPayments=summary.pendingPayments,
+        pendingAmount=round(summary.pendingAmount, 2),
+        completedPayments=summary.completedPayments,
+        paidAmount=round(summary.paidAmount, 2),
+        paymentStatus=payment_status(summary),
+        updatedAt=summary.updatedAt,
+    )
+
+
+def warm_product_cache_service(limit: int = CATALOG_WARMUP_PRODUCTS) -> int:
+    """Descobre o gateway e carrega no cache os produtos mais pedidos; devolve quantos foram carregados."""
+    gateway_discovery.ensure_loaded()
+    if limit <= 0:
+        return 0
+    with storage.read_session() as session:
+        codes = session.scalars(
+            select(OrderModel.productCode)
+            .group_by(OrderModel.productCode)
+            .order_by(func.count().desc())
+            .limit(limit)
+        ).all()
+    resolved, _ = product_client.find_products_by_codes(codes)
+    return len(resolved)
+
+
+def start_catalog_replica_service() -> int:
+    """Carrega a réplica do catálogo (arquivo local e gateway) e agenda as atualizações; devolve o tamanho."""
+    catalog_replica.load()
+    gateway_discovery.ensure_loaded()
+    try:
+        product_client.sync_catalog()
+    finally:
+        # Mesmo com a primeira sincronização falhando, a thread segue tentando.
+        catalog_replica.start(product_client.sync_catalog)
+    return len(catalog_replica)
+
+
+def get_table_summary_service(table_number: int) -> TableSummaryResponse:
+    with storage.read_session() as session:
+        return _table_summary_response(session.get(TableSummaryModel, table_number), table_number)
 
 
 def get_orders_service(order_number: int) -> list[OrderResponse]:
-    with SessionLocal() as session:
+    with storage.read_session(orders_cache_key(order_number)) as session:
         orders = session.scalars(
             select(OrderModel).where(
                 OrderModel.orderNumber == order_number
             )
         ).all()
-        return [OrderResponse.model_validate(order) for order in orders]
+        if orders:
+            return [OrderResponse.model_validate(order) for order in orders]
+    return _archived_orders(order_number)
+
+
+def _archived_orders(order_number: int) -> list[OrderResponse]:
+    """Itens do pedido já arquivado (ver src.archive); vazio se o pedido não existe."""
+    return [OrderResponse.model_validate(item) for item in archived_order_items(order_number)]
+
+
+def _archived_orders_json(order_number: int) -> bytes:
+    return dumps([order.model_dump() for order in _archived_orders(order_number)])
+
+
+def _orders_columns_query(order_number: int):
+    return select(*ORDER_COLUMNS).where(OrderModel.orderNumber == order_number)
+
+
+def get_orders_json_service(order_number: int) -> bytes:
+    """Mesmo conteúdo de get_orders_service, serializado direto das tuplas do banco."""
+    with storage.read_session(orders_cache_key(order_number)) as session:
+        body = dumps_result(session.connection().execute(_orders_columns_query(order_number)))
+    return body if body != b"[]" else _archived_orders_json(order_number)
+
+
+def load_orders_response_service(order_number: int) -> CachedResponse:
+    """Consulta os itens do pedido e guarda o JSON serializado no cache de respostas."""
+    return response_cache.load(orders_cache_key(order_number), lambda: get_orders_json_service(order_number))
 
 
 def create_order_service(order: OrderRequest) -> OrderResponse:
     try:
         product = product_client.get_product_by_code(order.productCode)
-    except ValueError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
-    except ServiceDiscoveryError as exc:
-        raise HTTPException(status_code=503, detail=str(exc)) from exc
-    except Exception as exc:  # pragma: no cover - fallback genérico
-        raise HTTPException(status_code=502, detail="Falha ao consultar catálogo de produtos") from exc
+    except Exception as exc:
+        raise _catalog_error(exc) from exc
+
+    description, cod_gru_est, unit_price = _parse_product(product)
+
+    order_number = order_number_allocator.allocate()
+    return writer.write(
+        lambda session: _stage_order(session, order, order_number, description, cod_gru_est, unit_price),
+        lambda created: _invalidate_order(order_number),
+    )
+
 
+def create_order_batch_service(batch: OrderBatchRequest) -> list[OrderResponse]:
     try:
-        cod_gru_est = int(product["codGruEst"])
-    except (KeyError, TypeError, ValueError) as exc:
-        raise HTTPException(status_code=502, detail="Resposta do catálogo de produtos inválida") from exc
+        products = product_client.get_products_by_codes(item.productCode for item in batch.items)
+    except Exception as exc:
+        raise _catalog_error(exc) from exc
+
+    parsed = {code: _parse_product(product) for code, product in products.items()}
+
+    order_number = order_number_allocator.allocate()
+    return writer.write(
+        lambda session: _stage_order_batch(session, batch, order_number, parsed),
+        lambda created: _invalidate_order(order_number),
+    )
+
+
+async def get_table_summary_service_async(table_number: int) -> TableSummaryResponse:
+    async with storage.async_read_session() as session:
+        return _table_summary_response(await session.get(TableSummaryModel, table_number), table_number)
+
+
+async def create_order_service_async(order: OrderRequest) -> OrderResponse:
+    """Mesmo fluxo de create_order_service sem bloquear uma thread do pool."""
+    try:
+        product = await async_product_client.get_product_by_code(order.productCode)
+    except Exception as exc:
+        raise _catalog_error(exc) from exc
+
+    description, cod_gru_est, unit_price = _parse_product(product)
+
+    order_number = await order_number_allocator.allocate_async()
+    return await writer.write_async(
+        lambda session: _stage_order(session, order, order_number, description, cod_gru_est, unit_price),
+        lambda created: _invalidate_order(order_number),
+    )
+
+
+async def create_order_batch_service_async(batch: OrderBatchRequest) -> list[OrderResponse]:
+    try:
+        products = await async_product_client.get_products_by_codes(item.productCode for item in batch.items)
+    except Exception as exc:
+        raise _catalog_error(exc) from exc
+
+    parsed = {code: _parse_product(product) for code, product in products.items()}
+
+    order_number = await order_number_allocator.allocate_async()
+    return await writer.write_async(
+        lambda session: _stage_order_batch(session, batch, order_number, parsed),
+        lambda created: _invalidate_order(order_number),
+    )
+
+
+async def get_orders_json_service_async(order_number: int) -> bytes:
+    async with storage.async_read_session(orders_cache_key(order_number)) as session:
+        connection = await session.connection()
+        body = dumps_result(await connection.execute(_orders_columns_query(order_number)))
+    return body if body != b"[]" else await run_in_threadpool(_archived_orders_json, order_number)
+
 
-    description = product.get("descricao")
-
-    with SessionLocal() as session:
-        order_number = (session.scalar(
-            select(func.max(OrderModel.orderNumber))
-        ) or 0) + 1
-
-        order_db = OrderModel(
-            orderNumber=order_number,
-            description=description,
-            codGruEst=cod_gru_est,
-            **order.model_dump(),
-        )
-        session.add(order_db)
-        session.commit()
-        session.refresh(order_db)
-        return OrderResponse.model_validate(order_db)
+async def load_orders_response_service_async(order_number: int) -> CachedResponse:
+    return await response_cache.load_async(
+        orders_cache_key(order_number), lambda: get_orders_json_service_async(order_number)
+    )
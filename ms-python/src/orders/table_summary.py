@@ -0,0 +1,281 @@
+"""Resumo por mesa mantido de forma incremental em ``table_summaries``.
+
+As escritas de pedidos e pagamentos somam seus deltas à linha da mesa na
+mesma transação em que gravam (``UPDATE ... SET col = col + delta``), de modo
+que a leitura do resumo é um acesso por chave, sem ``GROUP BY`` sobre
+``orders`` e ``payments``. Pagamentos chegam à mesa pelo ``tableNumber`` do
+pedido; pagamentos de pedidos inexistentes não entram no resumo.
+
+O resumo é a conta em aberto da mesa: só contam os pedidos ainda não
+fechados (ver ``closed_orders``). Quando um pagamento fecha o pedido, os
+itens e os pagamentos dele saem dos totais; uma mesa sem pedidos em aberto
+fica zerada, com ``paymentStatus`` ``CLOSED``. Como os pedidos arquivados
+(``src.archive``) já estão fechados, recalcular depois do arquivamento não
+muda os totais.
+
+Para recalcular tudo a partir das tabelas (dados anteriores ao resumo ou
+correção manual): ``python -m src.orders.table_summary``.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import Connection, Select, bindparam, case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.dialects import dialect_insert
+from src.orders.model import OrderModel, TableSummaryModel
+from src.payments.model import CLOSING_PAYMENT_STATUSES, OPEN_PAYMENT_STATUSES, PaymentModel, PaymentStatus
+
+
+summaries = TableSummaryModel.__table__
+
+# Colunas (contagem, valor) afetadas por pagamentos em cada status; FAILED e
+# CANCELLED não contam para a mesa.
+PAYMENT_BUCKETS: dict[str, tuple[str, str]] = {
+    PaymentStatus.PENDING.value: ('pendingPayments', 'pendingAmount'),
+    PaymentStatus.PROCESSING.value: ('pendingPayments', 'pendingAmount'),
+    PaymentStatus.COMPLETED.value: ('completedPayments', 'paidAmount'),
+}
+SUMMARY_COLUMNS = (
+    'orderCount', 'itemCount', 'quantity', 'billTotal',
+    'pendingPayments', 'pendingAmount', 'completedPayments', 'paidAmount',
+)
+
+
+def record_order_items(
+    session: Session,
+    table_number: int,
+    quantities: Iterable[int],
+    bill_total: float = 0.0,
+) -> None:
+    """Soma um pedido (com seus itens) ao resumo da mesa, criando a linha se preciso."""
+    quantities = list(quantities)
+    insert_for = dialect_insert(session.get_bind().dialect.name)
+    statement = insert_for(summaries).values(
+        tableNumber=table_number,
+        orderCount=1,
+        itemCount=len(quantities),
+        quantity=sum(quantities),
+        billTotal=bill_total,
+        pendingPayments=0,
+        pendingAmount=0.0,
+        completedPayments=0,
+        paidAmount=0.0,
+        updatedAt=datetime.now(),
+    )
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[summaries.c.tableNumber],
+        set_={
+            'orderCount': summaries.c.orderCount + statement.excluded.orderCount,
+            'itemCount': summaries.c.itemCount + statement.excluded.itemCount,
+            'quantity': summaries.c.quantity + statement.excluded.quantity,
+            'billTotal': summaries.c.billTotal + statement.excluded.billTotal,
+            'updatedAt': statement.excluded.updatedAt,
+        },
+    ))
+
+
+def record_payment_change(
+    session: Session,
+    order_number: int,
+    amount: float,
+    old_status: str | None,
+    new_status: str | None,
+) -> None:
+    """Atualiza o resumo da mesa depois da mudança de status de um pagamento (já gravada na sessão)."""
+    record_payment_changes(session, [(order_number, amount)], old_status, new_status)
+
+
+def record_payment_changes(
+    session: Session,
+    changes: Iterable[tuple[int, float]],
+    old_status: str | None,
+    new_status: str | None,
+) -> None:
+    """Versão em lote de ``record_payment_change`` para pares (pedido, valor) com a mesma transição.
+
+    Uma consulta por tabela lê o estado dos pedidos envolvidos, já com a
+    mudança aplicada; o estado anterior sai dele desfazendo a transição. A
+    diferença entre as contribuições dos dois estados (um pedido que fecha
+    sai inteiro do resumo, um que reabre volta inteiro) é somada por mesa em
+    um único ``UPDATE`` (executemany).
+    """
+    if _status_class(old_status) == _status_class(new_status):
+        return
+    moved: dict[int, list] = defaultdict(lambda: [0, 0.0])
+    for order_number, amount in changes:
+        moved[order_number][0] += 1
+        moved[order_number][1] += amount
+    if not moved:
+        return
+
+    deltas: dict[int, dict[str, float]] = defaultdict(lambda: dict.fromkeys(SUMMARY_COLUMNS, 0))
+    for order_number, state in _order_states(session, list(moved)).items():
+        before = state.reverted(old_status, new_status, *moved[order_number])
+        delta = deltas[state.table_number]
+        for column, value in state.totals().items():
+            delta[column] += value
+        for column, value in before.totals().items():
+            delta[column] -= value
+    params = [
+        {'summary_table': table_number, **{f'delta_{column}': value for column, value in delta.items()}}
+        for table_number, delta in deltas.items()
+        if any(delta.values())
+    ]
+    if not params:
+        return
+
+    session.execute(
+        update(summaries)
+        .where(summaries.c.tableNumber == bindparam('summary_table'))
+        .values(
+            updatedAt=datetime.now(),
+            **{column: summaries.c[column] + bindparam(f'delta_{column}') for column in SUMMARY_COLUMNS},
+        ),
+        params,
+    )
+
+
+def _status_class(status: str | None) -> tuple:
+    """O que um status muda no resumo: o total em que o valor entra e se mantém ou fecha o pedido."""
+    return PAYMENT_BUCKETS.get(status), status in OPEN_PAYMENT_STATUSES, status in CLOSING_PAYMENT_STATUSES
+
+
+@dataclass
+class _OrderState:
+    table_number: int
+    items: int
+    quantity: int
+    bill_total: float
+    payments: dict[str, list] = field(default_factory=dict)  # status -> [contagem, valor]
+
+    def _count(self, statuses: tuple[str, ...]) -> int:
+        return sum(self.payments.get(status, (0, 0.0))[0] for status in statuses)
+
+    def closed(self) -> bool:
+        return not self._count(OPEN_PAYMENT_STATUSES) and self._count(CLOSING_PAYMENT_STATUSES) > 0
+
+    def totals(self) -> dict[str, float]:
+        """Contribuição do pedido para o resumo da mesa (nenhuma depois de fechado)."""
+        if self.closed():
+            return {}
+        totals = {'orderCount': 1, 'itemCount': self.items, 'quantity': self.quantity, 'billTotal': self.bill_total}
+        for status, (count, amount) in self.payments.items():
+            if status in PAYMENT_BUCKETS:
+                count_column, amount_column = PAYMENT_BUCKETS[status]
+                totals[count_column] = totals.get(count_column, 0) + count
+                totals[amount_column] = totals.get(amount_column, 0.0) + amount
+        return totals
+
+    def reverted(self, old_status: str | None, new_status: str | None, count: int, amount: float) -> '_OrderState':
+        """O pedido antes de ``count`` pagamentos (somando ``amount``) irem de ``old_status`` para ``new_status``."""
+        payments = {status: list(totals) for status, totals in self.payments.items()}
+        for status, sign in ((new_status, -1), (old_status, 1)):
+            if status is not None:
+                totals = payments.setdefault(status, [0, 0.0])
+                totals[0] += sign * count
+                totals[1] += sign * amount
+        return replace(self, payments=payments)
+
+
+def _order_states(session: Session, order_numbers: list[int]) -> dict[int, _OrderState]:
+    states = {
+        order_number: _OrderState(table_number, items, quantity, bill_total)
+        for order_number, table_number, items, quantity, bill_total in session.execute(
+            select(
+                OrderModel.orderNumber,
+                OrderModel.tableNumber,
+                func.count(),
+                func.coalesce(func.sum(OrderModel.quantity), 0),
+                func.coalesce(func.sum(OrderModel.lineTotal), 0.0),
+            )
+            .where(OrderModel.orderNumber.in_(order_numbers))
+            .group_by(OrderModel.orderNumber, OrderModel.tableNumber)
+        )
+    }
+    for order_number, status, count, amount in session.execute(
+        select(PaymentModel.orderNumber, PaymentModel.status, func.count(), func.sum(PaymentModel.amount))
+        .where(PaymentModel.orderNumber.in_(order_numbers))
+        .group_by(PaymentModel.orderNumber, PaymentModel.status)
+    ):
+        if order_number in states:
+            states[order_number].payments[status] = [count, amount]
+    return states
+
+
+def closed_orders() -> Select:
+    """Números dos pedidos fechados: sem pagamento em andamento e com ao menos um ``COMPLETED`` ou ``CANCELLED``."""
+    return (
+        select(PaymentModel.orderNumber)
+        .group_by(PaymentModel.orderNumber)
+        .having(
+            func.sum(case((PaymentModel.status.in_(OPEN_PAYMENT_STATUSES), 1), else_=0)) == 0,
+            func.sum(case((PaymentModel.status.in_(CLOSING_PAYMENT_STATUSES), 1), else_=0)) > 0,
+        )
+    )
+
+
+def payment_status(summary: TableSummaryModel) -> str:
+    if not summary.orderCount:
+        return 'CLOSED'
+    if summary.pendingPayments:
+        return 'PENDING'
+    if not summary.completedPayments:
+        return 'OPEN'
+    if summary.paidAmount + 0.005 < summary.billTotal:
+        return 'PARTIAL'
+    return 'PAID'
+
+
+def rebuild_table_summaries(connection: Connection) -> int:
+    """Recalcula todos os resumos com ``GROUP BY`` sobre os pedidos em aberto e devolve o número de mesas.
+
+    Mesas que já têm resumo ou pedidos só fechados ficam com a linha zerada,
+    como a escrita incremental as deixa.
+    """
+    now = datetime.now()
+    tables = set(connection.scalars(select(summaries.c.tableNumber)))
+    tables.update(connection.scalars(select(OrderModel.tableNumber).distinct()))
+    rows: dict[int, dict] = {
+        table_number: dict.fromkeys(SUMMARY_COLUMNS, 0) | {'tableNumber': table_number, 'updatedAt': now}
+        for table_number in tables
+    }
+
+    open_order = OrderModel.orderNumber.not_in(closed_orders())
+    order_totals = select(
+        OrderModel.tableNumber,
+        func.count(func.distinct(OrderModel.orderNumber)),
+        func.count(),
+        func.coalesce(func.sum(OrderModel.quantity), 0),
+        func.coalesce(func.sum(OrderModel.lineTotal), 0.0),
+    ).where(open_order).group_by(OrderModel.tableNumber)
+    for table_number, order_count, item_count, quantity, bill_total in connection.execute(order_totals):
+        rows[table_number].update(
+            orderCount=order_count, itemCount=item_count, quantity=quantity, billTotal=bill_total
+        )
+
+    order_tables = select(OrderModel.orderNumber, OrderModel.tableNumber).where(open_order).distinct().subquery()
+    payment_totals = (
+        select(order_tables.c.tableNumber, PaymentModel.status, func.count(), func.sum(PaymentModel.amount))
+        .join(order_tables, order_tables.c.orderNumber == PaymentModel.orderNumber)
+        .where(PaymentModel.status.in_(PAYMENT_BUCKETS))
+        .group_by(order_tables.c.tableNumber, PaymentModel.status)
+    )
+    for table_number, status, count, amount in connection.execute(payment_totals):
+        count_column, amount_column = PAYMENT_BUCKETS[status]
+        rows[table_number][count_column] += count
+        rows[table_number][amount_column] += amount
+
+    connection.execute(delete(summaries))
+    if rows:
+        connection.execute(insert(summaries), list(rows.values()))
+    return len(rows)
+
+if __name__ == '__main__':
+    from src.orders.database import engine
+
+    with engine.begin() as connection:
+        tables = rebuild_table_summaries(connection)
+    print(f"Resumos recalculados: {tables} mesa(s)")
@@ -1,12 +1,37 @@
+from datetime import datetime
 from http import HTTPStatus
-from fastapi import APIRouter, HTTPException
-from src.payments.model import PaymentResponse, PaymentRequest, PaymentUpdateRequest
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from src.orders.async_database import async_mode
+from src.response_cache import response_cache
+from src.serialization import json_response
+from src.payments.model import (
+    PaymentResponse,
+    PaymentRequest,
+    PaymentUpdateRequest,
+    PaymentFilter,
+    PaymentPage,
+    PaymentBulkStatusRequest,
+    PaymentBulkStatusResponse,
+)
 from src.payments.service import (
     create_payment_service,
     get_payment_by_id_service,
-    get_payments_by_order_service,
+    load_payments_response_service,
+    payments_cache_key,
     update_payment_status_service,
-    list_all_payments_service
+    bulk_update_payment_status_service,
+    list_all_payments_json_service,
+    export_payments_service,
+    create_payment_service_async,
+    get_payment_by_id_service_async,
+    load_payments_response_service_async,
+    update_payment_status_service_async,
+    bulk_update_payment_status_service_async,
+    list_all_payments_json_service_async,
+    export_payments_service_async,
 )
 
 
@@ -19,8 +44,33 @@ router = APIRouter(prefix='/payment', tags=['payment'])
     response_model=PaymentResponse,
     description='Criar um novo pagamento'
 )
-def create_payment(payment: PaymentRequest) -> PaymentResponse:
-    return create_payment_service(payment)
+async def create_payment(payment: PaymentRequest) -> PaymentResponse:
+    if async_mode:
+        return await create_payment_service_async(payment)
+    return await run_in_threadpool(create_payment_service, payment)
+
+
+def payment_filter(
+    status: Optional[str] = None,
+    method: Optional[str] = None,
+    createdFrom: Optional[datetime] = None,
+    createdTo: Optional[datetime] = None,
+) -> PaymentFilter:
+    return PaymentFilter(status=status, paymentMethod=method, createdFrom=createdFrom, createdTo=createdTo)
+
+
+@router.get(
+    '/export',
+    status_code=HTTPStatus.OK,
+    response_class=StreamingResponse,
+    description='Exportar pagamentos filtrados em NDJSON (streaming)'
+)
+async def export_payments(filters: PaymentFilter = Depends(payment_filter)) -> StreamingResponse:
+    if async_mode:
+        stream = export_payments_service_async(filters)
+    else:
+        stream = export_payments_service(filters)
+    return StreamingResponse(stream, media_type='application/x-ndjson')
 
 
 @router.get(
@@ -29,8 +79,10 @@ def create_payment(payment: PaymentRequest) -> PaymentResponse:
     response_model=PaymentResponse,
     description='Buscar pagamento por ID'
 )
-def get_payment_by_id(payment_id: int) -> PaymentResponse:
-    return get_payment_by_id_service(payment_id)
+async def get_payment_by_id(payment_id: int) -> PaymentResponse:
+    if async_mode:
+        return await get_payment_by_id_service_async(payment_id)
+    return await run_in_threadpool(get_payment_by_id_service, payment_id)
 
 
 @router.get(
@@ -39,8 +91,26 @@ def get_payment_by_id(payment_id: int) -> PaymentResponse:
     response_model=list[PaymentResponse],
     description='Buscar pagamentos por número do pedido'
 )
-def get_payments_by_order(order_number: int) -> list[PaymentResponse]:
-    return get_payments_by_order_service(order_number)
+async def get_payments_by_order(order_number: int, request: Request) -> Response:
+    key = payments_cache_key(order_number)
+    entry = response_cache.get(key)
+    if entry is None and async_mode:
+        entry = await load_payments_response_service_async(order_number)
+    elif entry is None:
+        entry = await run_in_threadpool(load_payments_response_service, order_number)
+    return response_cache.respond(request, key, entry)
+
+
+@router.put(
+    '/status',
+    status_code=HTTPStatus.OK,
+    response_model=PaymentBulkStatusResponse,
+    description='Atualizar o status de vários pagamentos de uma vez (conciliação)'
+)
+async def bulk_update_payment_status(request: PaymentBulkStatusRequest) -> PaymentBulkStatusResponse:
+    if async_mode:
+        return await bulk_update_payment_status_service_async(request)
+    return await run_in_threadpool(bulk_update_payment_status_service, request)
 
 
 @router.put(
@@ -49,16 +119,26 @@ def get_payments_by_order(order_number: int) -> list[PaymentResponse]:
     response_model=PaymentResponse,
     description='Atualizar status do pagamento'
 )
-def update_payment_status(payment_id: int, update: PaymentUpdateRequest) -> PaymentResponse:
-    return update_payment_status_service(payment_id, update)
+async def update_payment_status(payment_id: int, update: PaymentUpdateRequest) -> PaymentResponse:
+    if async_mode:
+        return await update_payment_status_service_async(payment_id, update)
+    return await run_in_threadpool(update_payment_status_service, payment_id, update)
 
 
 @router.get(
     '/',
     status_code=HTTPStatus.OK,
-    response_model=list[PaymentResponse],
-    description='Listar todos os pagamentos'
+    response_model=PaymentPage,
+    description='Listar pagamentos (paginação por cursor, mais recentes primeiro)'
 )
-def list_all_payments() -> list[PaymentResponse]:
-    return list_all_payments_service()
-
+async def list_all_payments(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    filters: PaymentFilter = Depends(payment_filter),
+) -> Response:
+    # response_model documenta o contrato; o corpo sai pronto das tuplas do banco.
+    if async_mode:
+        body = await list_all_payments_json_service_async(filters, limit, cursor)
+    else:
+        body = await run_in_threadpool(list_all_payments_json_service, filters, limit, cursor)
+    return json_response(body)
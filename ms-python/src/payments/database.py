@@ -1,5 +1,7 @@
-from src.orders.database import engine, SessionLocal
+from src.storage import storage
 
-# Reutiliza o mesmo engine do banco de pedidos
-__all__ = ['engine', 'SessionLocal']
+# Primário dos pagamentos: o mesmo engine dos pedidos, salvo PAYMENTS_DATABASE_URL (ver src.storage).
+engine = storage.payments.primary
+SessionLocal = storage.session
 
+__all__ = ['engine', 'SessionLocal']
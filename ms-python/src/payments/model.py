@@ -1,5 +1,6 @@
+from sqlalchemy import Index, text
 from sqlalchemy.orm import Mapped, mapped_column, registry
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -16,9 +17,57 @@ class PaymentStatus(str, Enum):
     CANCELLED = "CANCELLED"
 
 
+# Transições permitidas a partir de cada status; COMPLETED, FAILED e
+# CANCELLED são finais. Nenhuma transição leva um pagamento inativo de volta
+# a um status ativo, então mudar status nunca viola ux_payments_active_order.
+PAYMENT_TRANSITIONS: dict[str, frozenset[str]] = {
+    PaymentStatus.PENDING.value: frozenset({
+        PaymentStatus.PROCESSING.value,
+        PaymentStatus.COMPLETED.value,
+        PaymentStatus.FAILED.value,
+        PaymentStatus.CANCELLED.value,
+    }),
+    PaymentStatus.PROCESSING.value: frozenset({
+        PaymentStatus.COMPLETED.value,
+        PaymentStatus.FAILED.value,
+        PaymentStatus.CANCELLED.value,
+    }),
+    PaymentStatus.COMPLETED.value: frozenset(),
+    PaymentStatus.FAILED.value: frozenset(),
+    PaymentStatus.CANCELLED.value: frozenset(),
+}
+
+
+def allowed_sources(target: str) -> list[str]:
+    """Status a partir dos quais ``target`` pode ser alcançado."""
+    return [source for source, targets in PAYMENT_TRANSITIONS.items() if target in targets]
+
+
+# Pagamentos em andamento e os que fecham o pedido: um pedido está fechado
+# quando não tem nenhum em andamento e tem ao menos um COMPLETED ou CANCELLED.
+OPEN_PAYMENT_STATUSES = (PaymentStatus.PENDING.value, PaymentStatus.PROCESSING.value)
+CLOSING_PAYMENT_STATUSES = (PaymentStatus.COMPLETED.value, PaymentStatus.CANCELLED.value)
+
+# Ativos: no máximo um por pedido (ux_payments_active_order).
+ACTIVE_PAYMENT_STATUSES = OPEN_PAYMENT_STATUSES + (PaymentStatus.COMPLETED.value,)
+ACTIVE_STATUSES_CLAUSE = "status IN ('PENDING', 'PROCESSING', 'COMPLETED')"
+
+
 @table_registry.mapped_as_dataclass
 class PaymentModel:
     __tablename__ = 'payments'
+    __table_args__ = (
+        Index('ix_payments_orderNumber_status', 'orderNumber', 'status'),
+        Index('ix_payments_createdAt', 'createdAt'),
+        # No máximo um pagamento ativo por pedido (ver _stage_payment).
+        Index(
+            'ux_payments_active_order',
+            'orderNumber',
+            unique=True,
+            sqlite_where=text(ACTIVE_STATUSES_CLAUSE),
+            postgresql_where=text(ACTIVE_STATUSES_CLAUSE),
+        ),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True, autoincrement=True, init=False
     )
@@ -68,7 +117,41 @@ class PaymentResponse(BaseModel):
         from_attributes = True
 
 
+class PaymentFilter(BaseModel):
+    status: Optional[str] = None
+    paymentMethod: Optional[str] = None
+    createdFrom: Optional[datetime] = None
+    createdTo: Optional[datetime] = None
+
+
+class PaymentPage(BaseModel):
+    items: list[PaymentResponse]
+    nextCursor: Optional[str] = None
+
+
 class PaymentUpdateRequest(BaseModel):
     status: str
     transactionId: Optional[str] = None
 
+
+class PaymentStatusChange(BaseModel):
+    id: int
+    status: str
+    transactionId: Optional[str] = None
+
+
+class PaymentBulkStatusRequest(BaseModel):
+    updates: list[PaymentStatusChange] = Field(min_length=1, max_length=10000)
+
+
+class PaymentRejectedChange(BaseModel):
+    id: int
+    currentStatus: str
+    requestedStatus: str
+
+
+class PaymentBulkStatusResponse(BaseModel):
+    updated: list[int]
+    unchanged: list[int]
+    rejected: list[PaymentRejectedChange]
+    notFound: list[int]
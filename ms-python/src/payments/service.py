@@ -1,95 +1,480 @@
+import base64
+import binascii
+from typing import AsyncIterator, Iterator
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import Select, and_, case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
 from datetime import datetime
 
-from src.orders.database import SessionLocal
-from src.payments.model import PaymentModel, PaymentRequest, PaymentResponse, PaymentUpdateRequest, PaymentStatus
+from starlette.concurrency import run_in_threadpool
 
+from src.archive import archived_order_payments, find_archived_payment, is_archived
+from src.events.outbox import record_event, record_events
+from src.orders.pricing import order_total
+from src.orders.table_summary import PAYMENT_BUCKETS, record_payment_change, record_payment_changes
+from src.payments.model import (
+    PaymentBulkStatusRequest,
+    PaymentBulkStatusResponse,
+    PaymentFilter,
+    PaymentModel,
+    PaymentPage,
+    PaymentRejectedChange,
+    PaymentRequest,
+    PaymentResponse,
+    PaymentStatus,
+    PaymentStatusChange,
+    PaymentUpdateRequest,
+    allowed_sources,
+)
+from src.response_cache import CachedResponse, response_cache
+from src.serialization import dumps, dumps_result, rows_to_dicts
+from src.storage import storage, writer
 
-def create_payment_service(payment: PaymentRequest) -> PaymentResponse:
+EXPORT_BATCH_SIZE = 1000
+# Ids por UPDATE na atualização em lote (bem abaixo do limite de parâmetros do SQLite).
+BULK_STATUS_CHUNK_SIZE = 500
+
+payments_table = PaymentModel.__table__
+# Conexão crua da sessão no engine dos pagamentos (que pode não ser o dos pedidos).
+PAYMENTS_BIND = {"mapper": PaymentModel}
+
+# Colunas na ordem dos campos de PaymentResponse (caminho rápido e exportação).
+PAYMENT_COLUMNS = (
+    PaymentModel.id,
+    PaymentModel.orderNumber,
+    PaymentModel.amount,
+    PaymentModel.paymentMethod,
+    PaymentModel.status,
+    PaymentModel.transactionId,
+    PaymentModel.createdAt,
+    PaymentModel.updatedAt,
+)
+
+def payments_cache_key(order_number: int) -> tuple[str, int]:
+    return ("payment-order", order_number)
+
+
+def _validate_payment_request(payment: PaymentRequest) -> None:
     # Validar método de pagamento
     valid_methods = ["CREDIT_CARD", "DEBIT_CARD", "PIX", "CASH", "DIGITAL_WALLET"]
     if payment.paymentMethod.upper() not in valid_methods:
         raise HTTPException(
-            status_code=400, 
+            status_code=400,
             detail=f"Método de pagamento inválido. Use: {', '.join(valid_methods)}"
         )
-    
+
     # Validar valor
     if payment.amount <= 0:
         raise HTTPException(status_code=400, detail="O valor do pagamento deve ser maior que zero")
 
-    with SessionLocal() as session:
-        # Verificar se já existe pagamento para este pedido
-        existing = session.scalar(
-            select(PaymentModel).where(
-                PaymentModel.orderNumber == payment.orderNumber,
-                PaymentModel.status.in_([PaymentStatus.PENDING, PaymentStatus.PROCESSING, PaymentStatus.COMPLETED])
-            )
+
+def _validate_status_update(update: PaymentUpdateRequest) -> None:
+    valid_statuses = [s.value for s in PaymentStatus]
+    if update.status.upper() not in valid_statuses:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Status inválido. Use: {', '.join(valid_statuses)}"
         )
-        
-        if existing:
-            raise HTTPException(
-                status_code=409, 
-                detail=f"Já existe um pagamento ativo para o pedido {payment.orderNumber}"
-            )
-
-        payment_db = PaymentModel(
-            orderNumber=payment.orderNumber,
-            amount=payment.amount,
-            paymentMethod=payment.paymentMethod.upper(),
-            status=PaymentStatus.PENDING.value
+
+
+def _encode_cursor(created_at: datetime, payment_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{payment_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, payment_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(payment_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido") from exc
+
+
+def _filtered_payments(query: Select, filters: PaymentFilter) -> Select:
+    if filters.status:
+        query = query.where(PaymentModel.status == filters.status.upper())
+    if filters.paymentMethod:
+        query = query.where(PaymentModel.paymentMethod == filters.paymentMethod.upper())
+    if filters.createdFrom:
+        query = query.where(PaymentModel.createdAt >= filters.createdFrom)
+    if filters.createdTo:
+        query = query.where(PaymentModel.createdAt < filters.createdTo)
+    return query.order_by(PaymentModel.createdAt.desc(), PaymentModel.id.desc())
+
+
+def _payments_page_query(filters: PaymentFilter, limit: int, cursor: str | None, *entities) -> Select:
+    """Paginação por chave (createdAt, id): cada página parte do último item da anterior."""
+    query = select(*(entities or (PaymentModel,)))
+    if cursor:
+        created_at, payment_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            PaymentModel.createdAt < created_at,
+            and_(PaymentModel.createdAt == created_at, PaymentModel.id < payment_id),
+        ))
+    # Um item extra indica se existe próxima página.
+    return _filtered_payments(query, filters).limit(limit + 1)
+
+
+def _to_page(payments: list[PaymentModel], limit: int) -> PaymentPage:
+    items = [PaymentResponse.model_validate(payment) for payment in payments[:limit]]
+    next_cursor = None
+    if len(payments) > limit:
+        last = items[-1]
+        next_cursor = _encode_cursor(last.createdAt, last.id)
+    return PaymentPage(items=items, nextCursor=next_cursor)
+
+
+def _page_json(result, limit: int) -> bytes:
+    """Equivalente a _to_page para um resultado de PAYMENT_COLUMNS, já serializado."""
+    rows = result.all()
+    items = rows_to_dicts(tuple(result.keys()), rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = _encode_cursor(last["createdAt"], last["id"])
+    return dumps({"items": items, "nextCursor": next_cursor})
+
+
+def _ndjson_chunk(keys, rows) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows_to_dicts(keys, rows))
+
+
+def _payments_by_order_query(order_number: int, *entities) -> Select:
+    return select(*(entities or (PaymentModel,))).where(
+        PaymentModel.orderNumber == order_number
+    ).order_by(PaymentModel.createdAt.desc())
+
+
+def _active_payment_conflict(order_number: int) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"Já existe um pagamento ativo para o pedido {order_number}"
+    )
+
+
+def _validate_against_order_total(session: Session, payment: PaymentRequest) -> None:
+    # Total a partir dos preços gravados no pedido, sem consultar o catálogo.
+    total = order_total(session, payment.orderNumber)
+    if total is None and is_archived(session, payment.orderNumber):
+        raise HTTPException(status_code=409, detail=f"O pedido {payment.orderNumber} já foi fechado e arquivado")
+    if total is not None and abs(payment.amount - total) >= 0.005:
+        raise HTTPException(
+            status_code=400,
+            detail=f"O valor do pagamento ({payment.amount:.2f}) difere do total do pedido ({total:.2f})"
         )
-        session.add(payment_db)
-        session.commit()
-        session.refresh(payment_db)
-        return PaymentResponse.model_validate(payment_db)
+
+
+def _stage_payment(session: Session, payment: PaymentRequest) -> PaymentResponse:
+    """Grava o pagamento, o resumo da mesa e o evento na sessão, sem commit."""
+    _validate_against_order_total(session, payment)
+    # O índice único parcial ux_payments_active_order garante um único
+    # pagamento ativo por pedido, sem consulta prévia.
+    payment_db = PaymentModel(
+        orderNumber=payment.orderNumber,
+        amount=payment.amount,
+        paymentMethod=payment.paymentMethod.upper(),
+        status=PaymentStatus.PENDING.value
+    )
+    session.add(payment_db)
+    try:
+        session.flush()
+    except IntegrityError as exc:
+        raise _active_payment_conflict(payment.orderNumber) from exc
+    # O resumo lê os pagamentos do pedido já com o novo.
+    record_payment_change(session, payment_db.orderNumber, payment_db.amount, None, payment_db.status)
+    created = PaymentResponse.model_validate(payment_db)
+    record_event(session, 'payment.created', created.orderNumber, created.model_dump())
+    return created
+
+
+def _invalidate_payments(created: PaymentResponse) -> None:
+    _invalidate_order_payments(created.orderNumber)
+
+
+def _invalidate_order_payments(order_number: int) -> None:
+    storage.written(payments_cache_key(order_number))
+    response_cache.invalidate(payments_cache_key(order_number))
+
+
+def _source_groups(target: str) -> list[list[str]]:
+    """Origens permitidas de ``target``, agrupadas pelo total da mesa em que estão.
+
+    Um único ``UPDATE`` por grupo basta para saber de qual total o valor sai,
+    já que o SQLite não devolve o valor anterior no ``RETURNING``.
+    """
+    groups: dict[tuple[str, str] | None, list[str]] = {}
+    for source in allowed_sources(target):
+        groups.setdefault(PAYMENT_BUCKETS.get(source), []).append(source)
+    return list(groups.values())
+
+
+def _invalid_transition(current: str, target: str) -> HTTPException:
+    return HTTPException(status_code=409, detail=f"Transição de status inválida: {current} → {target}")
+
+
+def _transition_values(target: str, transaction_id, now: datetime) -> dict:
+    # Callbacks sem transactionId não apagam o que já foi gravado.
+    return {
+        "status": target,
+        "transactionId": func.coalesce(transaction_id, payments_table.c.transactionId),
+        "updatedAt": now,
+    }
+
+
+def _apply_status_update(session: Session, payment_id: int, change: PaymentUpdateRequest) -> PaymentResponse:
+    """Aplica a transição com um ``UPDATE ... WHERE id = ? AND status IN (...) RETURNING``.
+
+    Chamadas concorrentes não se sobrescrevem: só a que encontra o status de
+    origem ainda válido altera a linha. Repetir a transição já aplicada
+    devolve o pagamento sem alterá-lo (callbacks repetidos do provedor).
+    """
+    target = change.status.upper()
+    values = _transition_values(target, change.transactionId, datetime.now())
+    for sources in _source_groups(target):
+        row = session.execute(
+            update(payments_table)
+            .where(payments_table.c.id == payment_id, payments_table.c.status.in_(sources))
+            .values(**values)
+            .returning(*PAYMENT_COLUMNS)
+        ).one_or_none()
+        if row is not None:
+            record_payment_change(session, row.orderNumber, row.amount, sources[0], target)
+            record_event(session, 'payment.status_changed', row.orderNumber, dict(row._mapping))
+            session.commit()
+            _invalidate_order_payments(row.orderNumber)
+            return PaymentResponse(**row._mapping)
+
+    current = session.execute(
+        select(*PAYMENT_COLUMNS).where(PaymentModel.id == payment_id)
+    ).one_or_none()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    if current.status != target:
+        raise _invalid_transition(current.status, target)
+    return PaymentResponse(**current._mapping)
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _apply_bulk_status_update(session: Session, request: PaymentBulkStatusRequest) -> PaymentBulkStatusResponse:
+    """Concilia vários pagamentos em uma transação, com um ``UPDATE`` por status e lote de ids."""
+    changes = {change.id: change for change in request.updates}  # vale a última de cada id
+    by_target: dict[str, list[PaymentStatusChange]] = {}
+    for change in changes.values():
+        by_target.setdefault(change.status.upper(), []).append(change)
+
+    now = datetime.now()
+    updated: set[int] = set()
+    order_numbers: set[int] = set()
+    for target, targeted in by_target.items():
+        for sources in _source_groups(target):
+            remaining = [change for change in targeted if change.id not in updated]
+            for chunk in _chunks(remaining, BULK_STATUS_CHUNK_SIZE):
+                transaction_ids = {change.id: change.transactionId for change in chunk if change.transactionId}
+                transaction_id = case(transaction_ids, value=payments_table.c.id) if transaction_ids else None
+                rows = session.execute(
+                    update(payments_table)
+                    .where(
+                        payments_table.c.id.in_([change.id for change in chunk]),
+                        payments_table.c.status.in_(sources),
+                    )
+                    .values(**_transition_values(target, transaction_id, now))
+                    .returning(*PAYMENT_COLUMNS)
+                ).all()
+                record_payment_changes(session, [(row.orderNumber, row.amount) for row in rows], sources[0], target)
+                record_events(
+                    session, 'payment.status_changed', [(row.orderNumber, dict(row._mapping)) for row in rows]
+                )
+                updated.update(row.id for row in rows)
+                order_numbers.update(row.orderNumber for row in rows)
+
+    current: dict[int, str] = {}
+    for chunk in _chunks([payment_id for payment_id in changes if payment_id not in updated], BULK_STATUS_CHUNK_SIZE):
+        current.update(session.execute(
+            select(payments_table.c.id, payments_table.c.status).where(payments_table.c.id.in_(chunk))
+        ).all())
+    session.commit()
+    for order_number in order_numbers:
+        _invalidate_order_payments(order_number)
+
+    response = PaymentBulkStatusResponse(updated=sorted(updated), unchanged=[], rejected=[], notFound=[])
+    for payment_id, change in changes.items():
+        if payment_id in updated:
+            continue
+        status = current.get(payment_id)
+        if status is None:
+            response.notFound.append(payment_id)
+        elif status == change.status.upper():
+            response.unchanged.append(payment_id)
+        else:
+            response.rejected.append(PaymentRejectedChange(
+                id=payment_id, currentStatus=status, requestedStatus=change.status.upper()
+            ))
+    return response
+
+
+def create_payment_service(payment: PaymentRequest) -> PaymentResponse:
+    _validate_payment_request(payment)
+
+    return writer.write(lambda session: _stage_payment(session, payment), _invalidate_payments)
+
+
+def _archived_payment(payment_id: int) -> PaymentResponse:
+    archived = find_archived_payment(payment_id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    return PaymentResponse.model_validate(archived)
+
+
+def _archived_payments(order_number: int) -> list[PaymentResponse]:
+    return [PaymentResponse.model_validate(payment) for payment in archived_order_payments(order_number)]
+
+
+def _archived_payments_json(order_number: int) -> bytes:
+    return dumps([payment.model_dump() for payment in _archived_payments(order_number)])
 
 
 def get_payment_by_id_service(payment_id: int) -> PaymentResponse:
-    with SessionLocal() as session:
+    with storage.read_session() as session:
         payment = session.get(PaymentModel, payment_id)
-        if not payment:
-            raise HTTPException(status_code=404, detail="Pagamento não encontrado")
-        return PaymentResponse.model_validate(payment)
+        if payment:
+            return PaymentResponse.model_validate(payment)
+    return _archived_payment(payment_id)
 
 
 def get_payments_by_order_service(order_number: int) -> list[PaymentResponse]:
-    with SessionLocal() as session:
-        payments = session.scalars(
-            select(PaymentModel).where(
-                PaymentModel.orderNumber == order_number
-            ).order_by(PaymentModel.createdAt.desc())
-        ).all()
-        return [PaymentResponse.model_validate(payment) for payment in payments]
+    with storage.read_session(payments_cache_key(order_number)) as session:
+        payments = session.scalars(_payments_by_order_query(order_number)).all()
+        if payments:
+            return [PaymentResponse.model_validate(payment) for payment in payments]
+    return _archived_payments(order_number)
+
+
+def get_payments_by_order_json_service(order_number: int) -> bytes:
+    """Mesmo conteúdo de get_payments_by_order_service, serializado direto das tuplas."""
+    with storage.read_session(payments_cache_key(order_number)) as session:
+        query = _payments_by_order_query(order_number, *PAYMENT_COLUMNS)
+        body = dumps_result(session.connection(PAYMENTS_BIND).execute(query))
+    return body if body != b"[]" else _archived_payments_json(order_number)
+
+
+def load_payments_response_service(order_number: int) -> CachedResponse:
+    """Consulta os pagamentos do pedido e guarda o JSON serializado no cache de respostas."""
+    return response_cache.load(
+        payments_cache_key(order_number), lambda: get_payments_by_order_json_service(order_number)
+    )
 
 
 def update_payment_status_service(payment_id: int, update: PaymentUpdateRequest) -> PaymentResponse:
-    valid_statuses = [s.value for s in PaymentStatus]
-    if update.status.upper() not in valid_statuses:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Status inválido. Use: {', '.join(valid_statuses)}"
-        )
+    _validate_status_update(update)
+
+    with storage.session() as session:
+        return _apply_status_update(session, payment_id, update)
+
+
+def bulk_update_payment_status_service(request: PaymentBulkStatusRequest) -> PaymentBulkStatusResponse:
+    for change in request.updates:
+        _validate_status_update(change)
+
+    with storage.session() as session:
+        return _apply_bulk_status_update(session, request)
+
+
+def list_all_payments_service(
+    filters: PaymentFilter,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> PaymentPage:
+    query = _payments_page_query(filters, limit, cursor)
+    with storage.read_session() as session:
+        payments = session.scalars(query).all()
+        return _to_page(payments, limit)
+
+
+def list_all_payments_json_service(
+    filters: PaymentFilter,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> bytes:
+    """Mesma página de list_all_payments_service, serializada direto das tuplas."""
+    query = _payments_page_query(filters, limit, cursor, *PAYMENT_COLUMNS)
+    with storage.read_session() as session:
+        return _page_json(session.connection(PAYMENTS_BIND).execute(query), limit)
+
+
+def export_payments_service(filters: PaymentFilter) -> Iterator[bytes]:
+    """Gera os pagamentos em NDJSON, lendo o banco em lotes (yield_per)."""
+    query = _filtered_payments(select(*PAYMENT_COLUMNS), filters)
+    with storage.read_session() as session:
+        result = session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        keys = tuple(result.keys())
+        for rows in result.partitions():
+            yield _ndjson_chunk(keys, rows)
+
+
+async def create_payment_service_async(payment: PaymentRequest) -> PaymentResponse:
+    _validate_payment_request(payment)
+
+    return await writer.write_async(lambda session: _stage_payment(session, payment), _invalidate_payments)
+
+
+async def get_payment_by_id_service_async(payment_id: int) -> PaymentResponse:
+    async with storage.async_read_session() as session:
+        payment = await session.get(PaymentModel, payment_id)
+        if payment:
+            return PaymentResponse.model_validate(payment)
+    return await run_in_threadpool(_archived_payment, payment_id)
+
+
+async def get_payments_by_order_json_service_async(order_number: int) -> bytes:
+    async with storage.async_read_session(payments_cache_key(order_number)) as session:
+        connection = await session.connection(PAYMENTS_BIND)
+        body = dumps_result(await connection.execute(_payments_by_order_query(order_number, *PAYMENT_COLUMNS)))
+    return body if body != b"[]" else await run_in_threadpool(_archived_payments_json, order_number)
+
+
+async def load_payments_response_service_async(order_number: int) -> CachedResponse:
+    return await response_cache.load_async(
+        payments_cache_key(order_number), lambda: get_payments_by_order_json_service_async(order_number)
+    )
+
+
+async def update_payment_status_service_async(payment_id: int, update: PaymentUpdateRequest) -> PaymentResponse:
+    _validate_status_update(update)
+
+    async with storage.async_session() as session:
+        return await session.run_sync(_apply_status_update, payment_id, update)
+
+
+async def bulk_update_payment_status_service_async(request: PaymentBulkStatusRequest) -> PaymentBulkStatusResponse:
+    for change in request.updates:
+        _validate_status_update(change)
+
+    async with storage.async_session() as session:
+        return await session.run_sync(_apply_bulk_status_update, request)
+
+
+async def list_all_payments_json_service_async(
+    filters: PaymentFilter,
+    limit: int = 50,
+    cursor: str | None = None,
+) -> bytes:
+    query = _payments_page_query(filters, limit, cursor, *PAYMENT_COLUMNS)
+    async with storage.async_read_session() as session:
+        connection = await session.connection(PAYMENTS_BIND)
+        return _page_json(await connection.execute(query), limit)
 
-    with SessionLocal() as session:
-        payment = session.get(PaymentModel, payment_id)
-        if not payment:
-            raise HTTPException(status_code=404, detail="Pagamento não encontrado")
-        
-        payment.status = update.status.upper()
-        payment.transactionId = update.transactionId
-        payment.updatedAt = datetime.now()
-        
-        session.commit()
-        session.refresh(payment)
-        return PaymentResponse.model_validate(payment)
-
-
-def list_all_payments_service() -> list[PaymentResponse]:
-    with SessionLocal() as session:
-        payments = session.scalars(
-            select(PaymentModel).order_by(PaymentModel.createdAt.desc())
-        ).all()
-        return [PaymentResponse.model_validate(payment) for payment in payments]
 
+async def export_payments_service_async(filters: PaymentFilter) -> AsyncIterator[bytes]:
+    query = _filtered_payments(select(*PAYMENT_COLUMNS), filters)
+    async with storage.async_read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        keys = tuple(result.keys())
+        async for rows in result.partitions():
+            yield _ndjson_chunk(keys, rows)
@@ -0,0 +1,210 @@
+"""Cache de respostas GET já serializadas, com ETag e invalidação na escrita.
+
+Pensado para as consultas de polling (telas da cozinha e PDVs) em
+``GET /order/{n}`` e ``GET /payment/order/{n}``: um acerto devolve os bytes
+prontos sem abrir sessão nem validar modelos, e um ``If-None-Match`` igual
+vira um 304 sem corpo.
+
+O cache é por processo. Escritas feitas no próprio worker invalidam a
+entrada na hora; com ``WORKERS`` > 1 as entradas dos outros workers só
+expiram pelo ``RESPONSE_CACHE_TTL``.
+
+Falhas simultâneas na mesma chave (vários pollers logo após uma
+invalidação) fazem uma única consulta ao banco: ``load`` coalesce as
+chamadas por chave e versão. As versões são por chave: a escrita de um
+pedido não descarta nem separa as leituras em curso dos outros.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable
+
+from fastapi import Request, Response
+
+from src.metrics import Counter, metrics_enabled, registry
+from src.singleflight import SingleFlight
+
+
+# Custo aproximado de uma entrada além do corpo (chave, ETag, nó do dict).
+ENTRY_OVERHEAD = 200
+# Chaves invalidadas cuja versão é lembrada; as mais antigas passam a valer o piso.
+MAX_TRACKED_VERSIONS = 10_000
+
+response_cache_requests = registry.register(Counter(
+    'response_cache_requests_total',
+    'Consultas ao cache de respostas por espaço de chaves e resultado (hit, miss, not_modified).',
+    ('namespace', 'result'),
+))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    stored_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+class ResponseCache:
+    """LRU limitado pelo total de bytes armazenados.
+
+    ``version(key)`` deve ser lido antes de consultar o banco e repassado a
+    ``put``: se a chave foi invalidada no meio, o resultado pode estar
+    desatualizado e não é guardado.
+
+    As versões vêm de um contador único: ``invalidate`` dá à chave o próximo
+    valor e as chaves nunca invalidadas valem o piso. Para o dicionário não
+    crescer sem limite, só as ``MAX_TRACKED_VERSIONS`` chaves invalidadas mais
+    recentes são lembradas; ao esquecer uma, o piso sobe até a versão dela,
+    o que só descarta, uma vez, as leituras em curso das chaves no piso.
+    ``clear`` esquece todas.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_bytes is None:
+            max_bytes = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+        self.max_bytes = max_bytes
+        self.ttl = ttl if ttl is not None else float(os.getenv('RESPONSE_CACHE_TTL', '5'))
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._versions: OrderedDict[Hashable, int] = OrderedDict()
+        self._last_version = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self.loads = SingleFlight('responses')
+
+    def version(self, key: tuple) -> int:
+        with self._lock:
+            return self._versions.get(key, self._floor)
+
+    def _bump(self, key: tuple) -> None:
+        self._last_version += 1
+        self._versions[key] = self._last_version
+        self._versions.move_to_end(key)
+        while len(self._versions) > MAX_TRACKED_VERSIONS:
+            _, self._floor = self._versions.popitem(last=False)
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and self._clock() - entry.stored_at >= self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        _count(key, 'hit' if entry is not None else 'miss')
+        return entry
+
+    def put(self, key: tuple, body: bytes, version: int) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=make_etag(body), stored_at=self._clock())
+        size = len(body) + ENTRY_OVERHEAD
+        with self._lock:
+            if version != self._versions.get(key, self._floor) or size > self.max_bytes:
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+        return entry
+
+    def load(self, key: tuple, query: Callable[[], bytes]) -> CachedResponse:
+        """Executa ``query`` e guarda o corpo; chamadas simultâneas para a mesma chave esperam a primeira.
+
+        A versão da chave faz parte da chave da coalescência: quem chega
+        depois de uma invalidação dela não recebe um resultado lido antes.
+        """
+        version = self.version(key)
+        return self.loads.do((key, version), lambda: self.put(key, query(), version))
+
+    async def load_async(self, key: tuple, query: Callable[[], Awaitable[bytes]]) -> CachedResponse:
+        version = self.version(key)
+
+        async def run() -> CachedResponse:
+            return self.put(key, await query(), version)
+
+        return await self.loads.do_async((key, version), run)
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._bump(key)
+            if key in self._entries:
+                self._remove(key)
+                self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._last_version += 1
+            self._floor = self._last_version
+            self._versions.clear()
+            self._entries.clear()
+            self._bytes = 0
+
+    def record_not_modified(self, key: tuple) -> None:
+        with self._lock:
+            self._not_modified += 1
+        _count(key, 'not_modified')
+
+    def respond(self, request: Request, key: tuple, entry: CachedResponse) -> Response:
+        """Monta a resposta a partir da entrada, com 304 quando o ETag do cliente confere."""
+        headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(request.headers.get('if-none-match'), entry.etag):
+            self.record_not_modified(key)
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type='application/json', headers=headers)
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body) + ENTRY_OVERHEAD
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'notModified': self._not_modified,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'hitRatio': round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _count(key: tuple, result: str) -> None:
+    if metrics_enabled:
+        response_cache_requests.inc(str(key[0]), result)
+
+
+response_cache = ResponseCache()
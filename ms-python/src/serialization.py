@@ -0,0 +1,50 @@
+"""Serialização JSON direta das linhas do banco, sem modelos por linha.
+
+As consultas das rotas de listagem selecionam só as colunas da resposta, na
+ordem dos campos do modelo Pydantic correspondente, e são executadas pela
+conexão (Core), sem o processamento de resultados do ORM; as tuplas viram
+JSON aqui. Usa o ``orjson`` quando instalado; sem ele, cai no ``json`` da stdlib
+com a mesma saída (compacta, UTF-8, datas em ISO 8601).
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Sequence
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+    """Monta os dicts com as chaves resolvidas uma única vez (``Row._asdict`` é caro por linha)."""
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def dumps_result(result: Any) -> bytes:
+    """Serializa todas as linhas de um ``Result`` de ``select(*colunas)``."""
+    return dumps(rows_to_dicts(tuple(result.keys()), result.all()))
+
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,107 @@
+"""Coalescência de consultas idênticas simultâneas (*singleflight*).
+
+Enquanto a consulta de uma chave está em andamento, quem pede a mesma chave
+espera por ela em vez de disparar outra: a primeira chamada executa a
+função e todas recebem o mesmo resultado, ou a mesma exceção. Terminada a
+consulta, a chave sai do mapa; a próxima chamada executa de novo (o que
+guardar resultado é papel dos caches).
+
+``do`` atende as threads (serviços síncronos no pool do FastAPI) e
+``do_async`` as corrotinas de um event loop; os dois caminhos não se
+misturam. No assíncrono, a consulta roda em uma task própria: se o chamador
+que a iniciou for cancelado (cliente desconectado), os demais continuam
+esperando o resultado.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from src.metrics import Counter, metrics_enabled, registry
+
+T = TypeVar('T')
+
+singleflight_calls = registry.register(Counter(
+    'singleflight_calls_total',
+    'Chamadas por grupo de coalescência e papel (leader executou, coalesced esperou outra).',
+    ('group', 'role'),
+))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """Executa ``func`` ou espera a execução já em andamento para ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._record(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Versão para corrotinas: ``func()`` é aguardada uma vez por chave em andamento."""
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        with self._lock:
+            self._record(leader)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Com todos os chamadores cancelados, ninguém lê a exceção.
+        if not task.cancelled():
+            task.exception()
+
+    def _record(self, leader: bool) -> None:
+        if leader:
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        if metrics_enabled:
+            singleflight_calls.inc(self.name, 'leader' if leader else 'coalesced')
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.leaders + self.coalesced,
+                'coalesced': self.coalesced,
+                'inFlight': len(self._calls) + len(self._tasks),
+            }
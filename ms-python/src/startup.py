@@ -0,0 +1,108 @@
+"""Tarefas de inicialização executadas em segundo plano pelo lifespan.
+
+O servidor aceita conexões logo após o import; migrações, registro no Consul
+e aquecimento do catálogo rodam em threads enquanto isso. ``/health/live``
+responde assim que o processo atende HTTP; ``/health/ready`` só responde 200
+quando todas as tarefas obrigatórias (``required``) terminaram. As demais
+aparecem no relatório, mas não seguram o tráfego.
+
+Uma tarefa que falha é repetida com backoff exponencial (até ``max_delay``)
+enquanto o processo estiver de pé, ou até ``max_attempts`` tentativas.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+@dataclass
+class StartupTask:
+    name: str
+    func: Callable[[], Any]
+    required: bool = True
+    requires: tuple[str, ...] = ()
+    max_attempts: int | None = None
+    status: str = 'pending'
+    attempts: int = 0
+    error: str | None = None
+    duration: float | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class StartupTasks:
+    def __init__(self, base_delay: float = 0.5, max_delay: float = 30.0) -> None:
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._tasks: dict[str, StartupTask] = {}
+        self._running: list[asyncio.Task] = []
+        self._started = time.monotonic()
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        required: bool = True,
+        requires: tuple[str, ...] = (),
+        max_attempts: int | None = None,
+    ) -> None:
+        """Agenda ``func`` (bloqueante, roda em thread) depois das tarefas de ``requires``."""
+        task = StartupTask(name, func, required, requires, max_attempts)
+        self._tasks[name] = task
+        self._running.append(asyncio.create_task(self._run(task), name=f'startup-{name}'))
+
+    async def _run(self, task: StartupTask) -> None:
+        for dependency in task.requires:
+            await self._tasks[dependency].done.wait()
+        task.status = 'running'
+        began = time.monotonic()
+        while True:
+            task.attempts += 1
+            try:
+                await asyncio.to_thread(task.func)
+            except Exception as exc:
+                task.error = f"{type(exc).__name__}: {exc}"
+                print(f"Startup task {task.name} failed (attempt {task.attempts}): {task.error}")
+                if task.max_attempts is not None and task.attempts >= task.max_attempts:
+                    task.status = 'failed'
+                    task.duration = time.monotonic() - began
+                    return
+                await asyncio.sleep(min(self.max_delay, self.base_delay * 2 ** (task.attempts - 1)))
+                continue
+            task.status = 'done'
+            task.error = None
+            task.duration = time.monotonic() - began
+            task.done.set()
+            return
+
+    @property
+    def ready(self) -> bool:
+        return all(task.status == 'done' for task in self._tasks.values() if task.required)
+
+    async def wait_ready(self, timeout: float | None = None) -> bool:
+        required = [task.done.wait() for task in self._tasks.values() if task.required]
+        try:
+            await asyncio.wait_for(asyncio.gather(*required), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'status': 'UP' if self.ready else 'DOWN',
+            'uptime': round(time.monotonic() - self._started, 3),
+            'checks': {
+                task.name: {
+                    'status': task.status,
+                    'required': task.required,
+                    'attempts': task.attempts,
+                    'error': task.error,
+                    'duration': round(task.duration, 3) if task.duration is not None else None,
+                }
+                for task in self._tasks.values()
+            },
+        }
+
+    async def cancel(self) -> None:
+        for running in self._running:
+            running.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
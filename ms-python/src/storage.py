@@ -0,0 +1,218 @@
+"""Engines por domínio (pedidos e pagamentos) e roteamento leitura/escrita.
+
+- ``DATABASE_URL``: primário dos pedidos (e das tabelas auxiliares: resumo
+  das mesas, outbox, idempotência, numeração).
+- ``PAYMENTS_DATABASE_URL``: primário dos pagamentos; sem ela, os
+  pagamentos ficam no mesmo engine dos pedidos.
+- ``DATABASE_REPLICA_URL`` / ``PAYMENTS_DATABASE_REPLICA_URL``: réplicas de
+  leitura de cada domínio (sem pagamentos próprios, os pagamentos usam a
+  réplica dos pedidos).
+
+Cada URL recebe o perfil de pool do seu backend (``profile_for`` em
+``src.orders.database``), então os domínios podem misturar SQLite e
+PostgreSQL.
+
+As sessões de ``storage.session()`` escrevem nos primários; as consultas
+somente leitura dos serviços usam ``storage.read_session()``, que vai para as
+réplicas. Nos dois casos cada tabela é roteada para o engine do seu domínio
+(``binds`` da sessão), então uma mesma sessão continua lendo pedidos e
+gravando pagamentos. Com bancos separados, a escrita de um pagamento e a do
+resumo da mesa ou do outbox são dois commits, sem atomicidade entre eles
+(o arquivamento, que apaga nos dois bancos, ordena os commits e se completa
+na execução seguinte; ver ``src.archive``).
+
+A réplica pode ainda não ter uma escrita recente, e o cache de respostas
+guardaria a versão antiga. Por isso, durante ``DATABASE_REPLICA_STICKY``
+segundos, vão ao primário:
+
+- as leituras da mesma requisição (thread ou task) que fez o commit;
+- as leituras de uma chave marcada com ``storage.written(chave)`` (as mesmas
+  chaves do cache de respostas, ex.: os itens de um pedido).
+
+As demais leituras continuam nas réplicas, mesmo sob escrita constante.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+from sqlalchemy import Engine, Table, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.group_commit import GroupCommitWriter
+from src.orders.async_database import async_engine, create_async_database_engine, to_async_url
+from src.orders.database import create_database_engine, engine
+from src.payments.model import PaymentModel
+
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+PAYMENTS_DATABASE_URL = os.getenv('PAYMENTS_DATABASE_URL')
+PAYMENTS_DATABASE_REPLICA_URL = os.getenv('PAYMENTS_DATABASE_REPLICA_URL')
+DATABASE_REPLICA_STICKY = float(os.getenv('DATABASE_REPLICA_STICKY', '2'))
+
+
+@dataclass(frozen=True)
+class DomainEngines:
+    """Primário e réplica (opcional) de um domínio, nas versões síncrona e assíncrona."""
+
+    primary: Engine
+    async_primary: AsyncEngine
+    replica: Engine | None = None
+    async_replica: AsyncEngine | None = None
+
+    @classmethod
+    def from_urls(cls, url: str, replica_url: str | None = None) -> 'DomainEngines':
+        return cls(*_engines(url), *_engines(replica_url))
+
+    @property
+    def read(self) -> Engine:
+        return self.replica or self.primary
+
+    @property
+    def async_read(self) -> AsyncEngine:
+        return self.async_replica or self.async_primary
+
+
+class Storage:
+    def __init__(
+        self,
+        orders: DomainEngines,
+        payments: DomainEngines | None = None,
+        payment_tables: tuple[Table, ...] = (PaymentModel.__table__,),
+        sticky: float = DATABASE_REPLICA_STICKY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.orders = orders
+        self.payments = payments or orders
+        self.sticky = sticky
+        self._clock = clock
+        # Por contexto: o commit de uma requisição não desvia as leituras das outras.
+        self._primary_until: ContextVar[float] = ContextVar(f'primary_until_{id(self)}', default=0.0)
+        self._written: OrderedDict[Hashable, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Subclasse própria: o evento de commit vale só para as sessões de escrita deste storage.
+        primary_session = type('PrimarySession', (Session,), {})
+        event.listen(primary_session, 'after_commit', self._committed)
+
+        def binds(engine):
+            return {table: engine for table in payment_tables}
+
+        self.session = sessionmaker(
+            class_=primary_session,
+            bind=orders.primary,
+            binds=binds(self.payments.primary),
+            autoflush=False,
+        )
+        self.async_session = async_sessionmaker(
+            sync_session_class=primary_session,
+            bind=orders.async_primary,
+            binds=binds(self.payments.async_primary),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        self._replica_session = sessionmaker(
+            bind=orders.read,
+            binds=binds(self.payments.read),
+            autoflush=False,
+        )
+        self._async_replica_session = async_sessionmaker(
+            bind=orders.async_read,
+            binds=binds(self.payments.async_read),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    def _committed(self, session: Session) -> None:
+        self._primary_until.set(self._clock() + self.sticky)
+
+    def written(self, key: Hashable) -> None:
+        """Marca ``key`` como recém-escrita: as leituras dela vão ao primário por ``sticky`` segundos."""
+        now = self._clock()
+        with self._lock:
+            self._written[key] = now + self.sticky
+            self._written.move_to_end(key)
+            # Mesmo ``sticky`` para todas: as marcas vencem na ordem de inserção.
+            while self._written and next(iter(self._written.values())) <= now:
+                self._written.popitem(last=False)
+
+    def reading_from_primary(self, key: Hashable | None = None) -> bool:
+        now = self._clock()
+        if now < self._primary_until.get():
+            return True
+        if key is None:
+            return False
+        with self._lock:
+            return now < self._written.get(key, 0.0)
+
+    def read_session(self, key: Hashable | None = None) -> Session:
+        """Sessão para consultas: réplicas, ou primários logo após uma escrita desta requisição ou de ``key``."""
+        if self.reading_from_primary(key):
+            return self.session()
+        return self._replica_session()
+
+    def async_read_session(self, key: Hashable | None = None) -> AsyncSession:
+        if self.reading_from_primary(key):
+            return self.async_session()
+        return self._async_replica_session()
+
+    def primary_engines(self) -> list[Engine]:
+        """Primários distintos (onde rodam as migrações)."""
+        return _distinct([self.orders.primary, self.payments.primary])
+
+    def engines(self) -> dict[str, Engine]:
+        """Engines síncronos distintos, com um rótulo para as métricas do pool."""
+        labeled = {
+            'orders': self.orders.primary,
+            'orders_replica': self.orders.replica,
+            'payments': self.payments.primary,
+            'payments_replica': self.payments.replica,
+        }
+        seen: set[int] = set()
+        result = {}
+        for label, candidate in labeled.items():
+            if candidate is not None and id(candidate) not in seen:
+                seen.add(id(candidate))
+                result[label] = candidate
+        return result
+
+    async def dispose(self) -> None:
+        for candidate in _distinct([
+            self.orders.async_primary,
+            self.orders.async_replica,
+            self.payments.async_primary,
+            self.payments.async_replica,
+        ]):
+            await candidate.dispose()
+
+
+def _distinct(engines: list) -> list:
+    result = []
+    for candidate in engines:
+        if candidate is not None and all(candidate is not other for other in result):
+            result.append(candidate)
+    return result
+
+
+def _engines(url: str | None) -> tuple[Engine | None, AsyncEngine | None]:
+    if not url:
+        return None, None
+    return create_database_engine(url), create_async_database_engine(to_async_url(url))
+
+
+def _payments_engines(orders: DomainEngines) -> DomainEngines:
+    if PAYMENTS_DATABASE_URL:
+        return DomainEngines.from_urls(PAYMENTS_DATABASE_URL, PAYMENTS_DATABASE_REPLICA_URL)
+    if PAYMENTS_DATABASE_REPLICA_URL:
+        return DomainEngines(orders.primary, orders.async_primary, *_engines(PAYMENTS_DATABASE_REPLICA_URL))
+    return orders
+
+
+# O primário dos pedidos é o mesmo engine de src.orders.database (numeração, outbox, idempotência).
+_orders = DomainEngines(engine, async_engine, *_engines(DATABASE_REPLICA_URL))
+storage = Storage(_orders, _payments_engines(_orders))
+# Inserções de pedidos e pagamentos (commit em grupo com GROUP_COMMIT, ver src.group_commit).
+writer = GroupCommitWriter(storage.session, storage.async_session)
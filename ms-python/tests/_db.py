@@ -0,0 +1,57 @@
+"""Banco temporário para os testes que passam pelos serviços.
+
+Engines, modelos e serviços são criados na importação a partir de
+``DATABASE_URL`` (e das demais variáveis do storage). ``reload_modules``
+aponta a URL para o banco do teste e recarrega a cadeia na ordem das
+dependências; ``create_schema`` cria as tabelas de pedidos, pagamentos,
+outbox e arquivo num engine. ``add_order`` e ``add_order_batch`` gravam
+pedidos pelo mesmo caminho das rotas (``writer.write`` com ``_stage_*``),
+sem passar pelo catálogo.
+"""
+import importlib
+import os
+from types import ModuleType
+
+from sqlalchemy import Engine
+
+MODULES = (
+    "src.orders.database",
+    "src.orders.async_database",
+    "src.orders.model",
+    "src.payments.model",
+    "src.storage",
+    "src.archive",
+    "src.orders.table_summary",
+    "src.orders.service",
+    "src.payments.service",
+)
+
+
+def reload_modules(database_url: str, *extra: str) -> dict[str, ModuleType]:
+    """Recarrega a cadeia e, depois dela, os módulos de ``extra``; devolve os módulos pelo nome."""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SQLALCHEMY_ECHO"] = "0"
+    return {name: importlib.reload(importlib.import_module(name)) for name in MODULES + extra}
+
+
+def create_schema(engine: Engine) -> None:
+    for name in ("src.orders.model", "src.payments.model"):
+        importlib.import_module(name).table_registry.metadata.create_all(bind=engine)
+    importlib.import_module("src.events.outbox").outbox_metadata.create_all(bind=engine)
+    importlib.import_module("src.archive").archive_metadata.create_all(bind=engine)
+
+
+def add_order(request, order_number: int, description: str | None, cod_gru_est: int, unit_price: float | None = None):
+    service = importlib.import_module("src.orders.service")
+    return service.writer.write(
+        lambda session: service._stage_order(session, request, order_number, description, cod_gru_est, unit_price),
+        lambda created: service._invalidate_order(order_number),
+    )
+
+
+def add_order_batch(batch, order_number: int, products: dict[int, tuple[str | None, int, float | None]]):
+    service = importlib.import_module("src.orders.service")
+    return service.writer.write(
+        lambda session: service._stage_order_batch(session, batch, order_number, products),
+        lambda created: service._invalidate_order(order_number),
+    )
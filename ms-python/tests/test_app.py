@@ -0,0 +1,122 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import main  # noqa: E402
+from src.migrations import run_migrations  # noqa: E402
+
+
+class AppFactoryTests(unittest.TestCase):
+    def test_factory_builds_independent_apps(self):
+        first, second = main.create_app(), main.create_app()
+
+        self.assertIsNot(first, second)
+        paths = {route.path for route in first.routes}
+        self.assertTrue({"/health", "/order/", "/payment/"} <= paths)
+
+    def test_serve_migrates_once_in_parent_without_delaying_workers(self):
+        calls = []
+        release = threading.Event()
+        threads = []
+
+        def migrate():
+            release.wait(5)
+            calls.append("migrate")
+
+        def migrate_in_background(start=main.migrate_in_background):
+            threads.append(start())
+            return threads[-1]
+
+        env = {"WORKERS": "4", "PORT": "18080", "SERVICE_ADDRESS": "10.0.0.5"}
+        with mock.patch.dict(os.environ, env), \
+                mock.patch.object(main, "migrate", side_effect=migrate), \
+                mock.patch.object(main, "migrate_in_background", side_effect=migrate_in_background), \
+                mock.patch.object(main, "register", side_effect=lambda addr, port: calls.append("register")), \
+                mock.patch.object(main.atexit, "register"), \
+                mock.patch("uvicorn.run", side_effect=lambda *a, **kw: calls.append(("run", a, kw))):
+            main.serve()
+            self.assertEqual("18080", os.environ["PORT"])
+            self.assertEqual("false", os.environ["MIGRATE_ON_STARTUP"])
+            release.set()
+            threads[0].join(5)
+
+        # uvicorn.run não esperou as migrações, que rodaram uma única vez no processo principal.
+        self.assertEqual(2, len(calls))
+        _, args, kwargs = calls[0]
+        self.assertEqual("migrate", calls[1])
+        self.assertEqual(("main:create_app",), args)
+        self.assertTrue(kwargs["factory"])
+        self.assertEqual(4, kwargs["workers"])
+        self.assertEqual(18080, kwargs["port"])
+
+    def test_workers_wait_for_parent_migrations_instead_of_running_them(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine = create_engine(f"sqlite:///{Path(tmpdir) / 'orders.db'}")
+            with mock.patch.dict(os.environ, {"MIGRATE_ON_STARTUP": "false"}), \
+                    mock.patch.object(main.storage, "primary_engines", return_value=[engine]), \
+                    mock.patch.object(main.outbox_dispatcher, "start") as start_outbox:
+                with self.assertRaisesRegex(RuntimeError, "Migrações pendentes"):
+                    main.prepare_database()
+                self.assertEqual([], inspect(engine).get_table_names())
+                start_outbox.assert_not_called()
+
+                run_migrations(engine)
+                main.prepare_database()
+                start_outbox.assert_called_once()
+            engine.dispose()
+
+
+class StartupLifespanTests(unittest.TestCase):
+    def test_ready_only_after_database_while_live_answers_immediately(self):
+        release = threading.Event()
+        registered = []
+        with mock.patch.dict(os.environ, {"PORT": "18080", "SERVICE_ADDRESS": "10.0.0.5"}), \
+                mock.patch.object(main, "prepare_database", side_effect=lambda: release.wait(5)), \
+                mock.patch.object(main, "warm_product_cache_service", return_value=0), \
+                mock.patch.object(main, "register", side_effect=lambda addr, port: registered.append((addr, port))), \
+                TestClient(main.create_app()) as client:
+            self.assertEqual(200, client.get("/health/live").status_code)
+            response = client.get("/health/ready")
+            self.assertEqual(503, response.status_code)
+            self.assertEqual("running", response.json()["checks"]["database"]["status"])
+
+            release.set()
+            deadline = time.monotonic() + 5
+            while client.get("/health").status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            checks = client.get("/health/ready").json()["checks"]
+        self.assertEqual("done", checks["database"]["status"])
+        self.assertEqual([("10.0.0.5", 18080)], registered)
+
+    def test_consul_failure_does_not_block_readiness(self):
+        with mock.patch.dict(os.environ, {"PORT": "18080", "SERVICE_ADDRESS": "10.0.0.5"}), \
+                mock.patch.object(main, "prepare_database"), \
+                mock.patch.object(main, "warm_product_cache_service", return_value=0), \
+                mock.patch.object(main, "register", side_effect=RuntimeError("Consul fora do ar")), \
+                TestClient(main.create_app()) as client:
+            deadline = time.monotonic() + 5
+            while client.get("/health/ready").status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            response = client.get("/health/ready")
+
+        self.assertEqual(200, response.status_code)
+        consul = response.json()["checks"]["consul"]
+        self.assertFalse(consul["required"])
+        self.assertIn("Consul fora do ar", consul["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
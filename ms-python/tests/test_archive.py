@@ -0,0 +1,254 @@
+import asyncio
+import gzip
+import importlib
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlalchemy import text, update
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import add_order, create_schema, reload_modules  # noqa: E402
+
+NOW = datetime(2026, 6, 15, 12, 0)
+
+
+class ArchiveTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        os.environ["ARCHIVE_DIR"] = str(Path(cls._tmpdir.name) / "archive")
+        modules = reload_modules(f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}")
+        cls.database_module = modules["src.orders.database"]
+        cls.orders_model = modules["src.orders.model"]
+        cls.payments_model = modules["src.payments.model"]
+        cls.archive = modules["src.archive"]
+        cls.table_summary = modules["src.orders.table_summary"]
+        cls.orders_service = modules["src.orders.service"]
+        cls.payments_service = modules["src.payments.service"]
+        create_schema(cls.database_module.engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.environ.pop("ARCHIVE_DIR", None)
+        cls.database_module.engine.dispose()
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        with self.database_module.SessionLocal() as session:
+            for table in ("orders", "payments", "table_summaries", "archived_orders", "archived_payments"):
+                session.execute(text(f"DELETE FROM {table}"))
+            session.commit()
+        store = self.archive.archive_store
+        store.clear_memory()
+        if store.directory.exists():
+            for path in store.directory.iterdir():
+                path.unlink()
+
+    def _order(self, order_number, quantity=2):
+        request = self.orders_model.OrderRequest(productCode=101, tableNumber=4, quantity=quantity)
+        add_order(request, order_number, "Café", 100, 5.0)
+
+    def _pay(self, order_number, status=None, closed_at=None):
+        payment = self.payments_service.create_payment_service(
+            self.payments_model.PaymentRequest(orderNumber=order_number, amount=10.0, paymentMethod="pix")
+        )
+        if status:
+            self.payments_service.update_payment_status_service(
+                payment.id, self.payments_model.PaymentUpdateRequest(status=status, transactionId=f"tx-{payment.id}")
+            )
+        if closed_at:
+            payments = self.payments_model.PaymentModel.__table__
+            with self.database_module.engine.begin() as connection:
+                connection.execute(
+                    update(payments).where(payments.c.id == payment.id).values(createdAt=closed_at, updatedAt=closed_at)
+                )
+        return payment
+
+    def _run(self, **kwargs):
+        return self.archive.archive_closed_orders(timedelta(days=30), now=NOW, **kwargs)
+
+    def _hot_count(self, table, order_number):
+        with self.database_module.engine.connect() as connection:
+            return connection.scalar(text(f'SELECT COUNT(*) FROM {table} WHERE "orderNumber" = {order_number}'))
+
+    def test_moves_only_old_closed_orders(self):
+        self._order(1)
+        old_payment = self._pay(1, "COMPLETED", datetime(2026, 3, 10))
+        self._order(2)
+        self._pay(2, None, datetime(2026, 3, 10))           # ainda pendente
+        self._order(3)
+        self._pay(3, "COMPLETED", NOW - timedelta(days=2))  # fechado há pouco
+        self._order(4)                                      # sem pagamento
+
+        self.assertEqual(1, self._run())
+
+        self.assertEqual(0, self._hot_count("orders", 1))
+        self.assertEqual(0, self._hot_count("payments", 1))
+        for order_number in (2, 3, 4):
+            self.assertEqual(1, self._hot_count("orders", order_number))
+        files = sorted(path.name for path in self.archive.archive_store.directory.iterdir())
+        self.assertEqual([f"2026-03{self.archive.archive_store.suffix}"], files)
+
+        record = self.archive.find_archived_order(1)
+        self.assertEqual([2], [item["quantity"] for item in record["orders"]])
+        self.assertEqual([old_payment.id], [payment["id"] for payment in record["payments"]])
+
+    def _responses(self, order_number):
+        """Corpos de GET /order/{n} e GET /payment/order/{n}, pelos caminhos síncrono e assíncrono das rotas."""
+        cache = importlib.import_module("src.response_cache").response_cache
+        bodies = []
+        for load in (
+            self.orders_service.load_orders_response_service,
+            self.payments_service.load_payments_response_service,
+        ):
+            cache.clear()
+            bodies.append(json.loads(load(order_number).body))
+        for load in (
+            self.orders_service.load_orders_response_service_async,
+            self.payments_service.load_payments_response_service_async,
+        ):
+            cache.clear()
+            bodies.append(json.loads(asyncio.run(load(order_number)).body))
+        cache.clear()
+        return bodies
+
+    def test_reads_fall_back_to_archive(self):
+        self._order(1)
+        payment = self._pay(1, "COMPLETED", datetime(2026, 1, 5))
+        hot = self._responses(1)
+        self._run()
+
+        self.assertEqual(0, self._hot_count("orders", 1))
+        self.assertEqual(hot, self._responses(1))
+        self.assertEqual([1], [item["orderNumber"] for item in hot[0]])
+        self.assertEqual([payment.id], [item["id"] for item in hot[1]])
+
+        archived = self.payments_service.get_payment_by_id_service(payment.id)
+        self.assertEqual(("COMPLETED", f"tx-{payment.id}"), (archived.status, archived.transactionId))
+        self.assertEqual(archived, asyncio.run(self.payments_service.get_payment_by_id_service_async(payment.id)))
+
+        self.assertEqual([[], [], [], []], self._responses(99))
+        with self.assertRaises(HTTPException) as raised:
+            self.payments_service.get_payment_by_id_service(999)
+        self.assertEqual(404, raised.exception.status_code)
+
+    def test_archiving_does_not_change_table_summaries(self):
+        self._order(1)
+        self._pay(1, "COMPLETED", datetime(2026, 1, 5))
+        self._order(2)
+        self._pay(2, "CANCELLED", datetime(2026, 2, 5))
+        self._order(3)
+        self._pay(3)
+        self._order(4, quantity=1)
+        summaries = self.table_summary.summaries
+
+        def stored():
+            with self.database_module.engine.connect() as connection:
+                return [row._asdict() | {"updatedAt": None} for row in connection.execute(summaries.select())]
+
+        incremental = stored()
+        self.assertEqual([(4, 2, 3, 15.0, 1)], [
+            (row["tableNumber"], row["orderCount"], row["quantity"], row["billTotal"], row["pendingPayments"])
+            for row in incremental
+        ])
+        self.assertEqual(2, self._run())
+        with self.database_module.engine.begin() as connection:
+            self.table_summary.rebuild_table_summaries(connection)
+        self.assertEqual(incremental, stored())
+
+    def test_archived_order_rejects_new_payment(self):
+        self._order(1)
+        self._pay(1, "CANCELLED", datetime(2026, 1, 5))
+        self._run()
+
+        with self.assertRaises(HTTPException) as raised:
+            self._pay(1)
+        self.assertEqual(409, raised.exception.status_code)
+
+    def test_batches_until_done_and_groups_by_month(self):
+        for order_number, month in ((1, 1), (2, 2), (3, 2)):
+            self._order(order_number)
+            self._pay(order_number, "COMPLETED", datetime(2026, month, 20))
+
+        self.assertEqual(3, self._run(batch_size=1))
+
+        suffix = self.archive.archive_store.suffix
+        files = sorted(path.name for path in self.archive.archive_store.directory.iterdir())
+        self.assertEqual([f"2026-01{suffix}", f"2026-02{suffix}"], files)
+        self.assertEqual({2, 3}, set(self.archive.archive_store.month("2026-02")))
+
+    def test_lookup_decompresses_only_the_order_frame(self):
+        for order_number in (1, 2, 3):
+            self._order(order_number)
+            self._pay(order_number, "COMPLETED", datetime(2026, 2, 20))
+        self.assertEqual(3, self._run(batch_size=1))
+        store = self.archive.archive_store
+        store.clear_memory()
+
+        with mock.patch.object(store, "month", side_effect=AssertionError("leu o mês inteiro")):
+            record = self.archive.find_archived_order(3)
+            self.assertEqual(3, record["orderNumber"])
+            self.assertEqual(record, self.archive.find_archived_order(3))
+        self.assertEqual([{3}], [set(records) for records in store._frames.values()])
+
+
+class ArchiveStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.archive = importlib.import_module("src.archive")
+        self.store = self.archive.ArchiveStore(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _record(self, order_number, payment_status):
+        return {
+            "orderNumber": order_number,
+            "closedAt": "2026-01-05T10:00:00",
+            "orders": [{"id": order_number * 10, "orderNumber": order_number}],
+            "payments": [{"id": order_number, "orderNumber": order_number, "status": payment_status}],
+        }
+
+    def test_appended_frames_are_read_as_one_month(self):
+        self.store.append("2026-01", [self._record(1, "COMPLETED")])
+        self.assertEqual({1}, set(self.store.month("2026-01")))
+
+        # A leitura em memória é descartada quando o arquivo cresce.
+        self.store.append("2026-01", [self._record(2, "CANCELLED")])
+        self.assertEqual({1, 2}, set(self.store.month("2026-01")))
+        self.assertIsNone(self.store.find("2026-02", 1))
+
+    def test_frame_is_read_by_position_and_gzip_months_stay_readable(self):
+        self.store.append("2026-01", [self._record(1, "COMPLETED")])
+        second = self.store.append("2026-01", [self._record(2, "CANCELLED")])
+
+        self.assertEqual({2}, set(self.store.frame(second)))
+        self.assertEqual("CANCELLED", self.store.find("2026-01", 2, second)["payments"][0]["status"])
+
+        # Mês gravado em gzip por versões anteriores do job.
+        legacy = Path(self._tmpdir.name) / "2025-12.ndjson.gz"
+        legacy.write_bytes(gzip.compress(json.dumps(self._record(7, "COMPLETED")).encode() + b"\n"))
+        self.assertEqual({7}, set(self.store.month("2025-12")))
+
+    def test_repeated_record_is_merged(self):
+        # Falha entre a escrita do arquivo e o commit: o pedido é gravado de novo.
+        self.store.append("2026-01", [self._record(1, "PROCESSING")])
+        self.store.append("2026-01", [self._record(1, "COMPLETED")])
+
+        record = self.store.find("2026-01", 1)
+        self.assertEqual(["COMPLETED"], [payment["status"] for payment in record["payments"]])
+        self.assertEqual(1, len(record["orders"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqlalchemy import text
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import create_schema, reload_modules  # noqa: E402
+from src.orders.product_client import AsyncProductGatewayClient, ServiceDiscoveryError  # noqa: E402
+from test_orders_integration import start_catalog_server  # noqa: E402
+
+
+class AsyncProductGatewayClientTests(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.thread = start_catalog_server()
+        host, port = cls.server.server_address
+        cls.base_url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join(timeout=5)
+        cls.server.server_close()
+
+    async def test_uses_fallback_when_consul_is_unavailable(self):
+        client = AsyncProductGatewayClient(
+            consul_addr="http://127.0.0.1:59999",
+            fallback_base_url=self.base_url,
+            max_connections=4,
+            max_keepalive_connections=2,
+        )
+        try:
+            product = await client.get_product_by_code(101)
+            # A segunda chamada reaproveita a conexão keep-alive do pool.
+            again = await client.get_product_by_code(202)
+        finally:
+            await client.aclose()
+
+        self.assertEqual(101, product["codigoProduto"])
+        self.assertEqual(202, again["codigoProduto"])
+
+    async def test_raises_value_error_for_unknown_product(self):
+        client = AsyncProductGatewayClient(
+            consul_addr="http://127.0.0.1:59999",
+            fallback_base_url=self.base_url,
+        )
+        try:
+            with self.assertRaises(ValueError):
+                await client.get_product_by_code(999)
+        finally:
+            await client.aclose()
+
+    async def test_raises_error_when_no_fallback_available(self):
+        client = AsyncProductGatewayClient(consul_addr="http://127.0.0.1:59999", fallback_base_url=None)
+        try:
+            with self.assertRaises(ServiceDiscoveryError):
+                await client.get_product_by_code(101)
+        finally:
+            await client.aclose()
+
+
+class AsyncOrderServiceTests(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.thread = start_catalog_server()
+        host, port = cls.server.server_address
+
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        os.environ["GATEWAY_BASE_URL"] = f"http://{host}:{port}"
+        os.environ["CONSUL_HTTP_ADDR"] = "http://127.0.0.1:59999"
+        modules = reload_modules(f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}")
+        cls.database_module = modules["src.orders.database"]
+        cls.async_database_module = modules["src.orders.async_database"]
+        cls.model_module = modules["src.orders.model"]
+        cls.service_module = modules["src.orders.service"]
+        create_schema(cls.database_module.engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.database_module.engine.dispose()
+        cls.server.shutdown()
+        cls.thread.join(timeout=5)
+        cls.server.server_close()
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        with self.database_module.SessionLocal() as session:
+            session.execute(text("DELETE FROM orders"))
+            session.execute(text("DELETE FROM order_sequences"))
+            session.commit()
+        self.service_module.order_number_allocator.reset()
+
+    async def asyncTearDown(self):
+        # O pedido lido pelo cache de respostas (global) não vaza para os outros testes.
+        importlib.import_module("src.response_cache").response_cache.clear()
+        await self.service_module.async_product_client.aclose()
+        await self.async_database_module.async_engine.dispose()
+
+    async def test_creates_and_reads_order_asynchronously(self):
+        order_request = self.model_module.OrderRequest(productCode=202, tableNumber=7, quantity=4)
+
+        created = await self.service_module.create_order_service_async(order_request)
+        entry = await self.service_module.load_orders_response_service_async(created.orderNumber)
+
+        self.assertEqual(1, created.orderNumber)
+        self.assertEqual("Caixa de barras de cereal sortidas", created.description)
+        self.assertEqual([created.model_dump(mode="json")], json.loads(entry.body))
+
+
+if __name__ == "__main__":
+    unittest.main()
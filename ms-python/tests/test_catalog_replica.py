@@ -0,0 +1,221 @@
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.catalog_replica import CatalogReplica  # noqa: E402
+from src.orders.discovery import ServiceInstanceCache  # noqa: E402
+from src.orders.product_cache import ProductCache  # noqa: E402
+from src.orders.product_client import AsyncProductGatewayClient, ProductGatewayClient  # noqa: E402
+
+
+def listed(code, price=10.0):
+    """Item no formato de ``GET /ms-kotlin/produto`` (ProdutoResponseBusca)."""
+    return {"id": code, "codigoProduto": code, "descricao": f"Produto {code}", "preco": price,
+            "cod": 300, "codGruEst": "Bebidas"}
+
+
+class CatalogStub:
+    """Catálogo com listagem versionada por ETag e consulta por código."""
+
+    def __init__(self, products):
+        self.products = list(products)
+        self.version = 1
+        self.requests = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
+                with stub._lock:
+                    stub.requests.append((self.path, self.headers.get("If-None-Match")))
+                    etag = f'"v{stub.version}"'
+                    products = list(stub.products)
+                if self.path == "/ms-kotlin/produto":
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self._send(200, products, etag)
+                    return
+                code = int(self.path.rsplit("/", 1)[1])
+                if code == 999:
+                    self._send(200, {"codigoProduto": 999, "descricao": "Novo", "preco": 1.0, "codGruEst": 1})
+                else:
+                    self._send(404, {"message": "Produto não encontrado"})
+
+            def _send(self, status, payload, etag=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # noqa: A003 - método da stdlib
+                return
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def change(self, products):
+        with self._lock:
+            self.products = list(products)
+            self.version += 1
+
+    def paths(self):
+        with self._lock:
+            return [path for path, _ in self.requests]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CatalogReplicaTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = CatalogStub([listed(101, 12.5), listed(102)])
+        self.replica = CatalogReplica(enabled=True, interval=0)
+        self.client = self._client(self.replica)
+
+    def tearDown(self):
+        self.replica.stop()
+        self.stub.close()
+
+    def _client(self, replica, cls=ProductGatewayClient):
+        discovery = ServiceInstanceCache(
+            consul_addr="http://127.0.0.1:9", fallback_base_url=self.stub.url, watch=False
+        )
+        discovery.fail("sem Consul nos testes")
+        return cls(discovery=discovery, cache=ProductCache(), replica=replica)
+
+    def test_listing_is_served_in_lookup_format_without_network(self):
+        self.assertTrue(self.client.sync_catalog())
+
+        product = self.client.get_product_by_code(101)
+        self.assertEqual(
+            {"id": 101, "codigoProduto": 101, "descricao": "Produto 101", "preco": 12.5, "codGruEst": 300},
+            product,
+        )
+        self.assertEqual({101, 102}, set(self.client.get_products_by_codes([101, 102])))
+        self.assertEqual(["/ms-kotlin/produto"], self.stub.paths())
+        self.assertEqual(3, self.replica.stats()["hits"])
+
+    def test_unknown_codes_fall_back_to_live_lookup(self):
+        self.client.sync_catalog()
+
+        resolved, missing = self.client.find_products_by_codes([101, 999, 555])
+
+        self.assertEqual({101, 999}, set(resolved))
+        self.assertEqual([555], missing)
+        self.assertEqual(
+            ["/ms-kotlin/produto", "/ms-kotlin/produto/codigo/555", "/ms-kotlin/produto/codigo/999"],
+            sorted(self.stub.paths()),
+        )
+
+    def test_refresh_is_conditional_on_etag(self):
+        self.client.sync_catalog()
+        self.assertFalse(self.client.sync_catalog())  # 304
+
+        self.stub.change([listed(101, 15.0)])
+        self.assertTrue(self.client.sync_catalog())
+
+        self.assertEqual(
+            [None, '"v1"', '"v1"'], [etag for path, etag in self.stub.requests if path == "/ms-kotlin/produto"]
+        )
+        self.assertEqual(15.0, self.client.get_product_by_code(101)["preco"])
+        self.assertEqual(1, self.replica.stats()["notModified"])
+        # 102 saiu da listagem: volta a ser consultado ao vivo (e não existe mais).
+        with self.assertRaises(ValueError):
+            self.client.get_product_by_code(102)
+
+    def test_snapshot_is_persisted_and_loaded_before_first_sync(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = str(Path(tmpdir) / "catalog.db")
+            first = CatalogReplica(enabled=True, path=path)
+            self._client(first).sync_catalog()
+            first.stop()
+
+            second = CatalogReplica(enabled=True, path=path)
+            self.assertEqual(2, second.load())
+            self.assertEqual(12.5, second.get(101)["preco"])
+            # A próxima sincronização reaproveita o ETag gravado.
+            self.assertFalse(self._client(second).sync_catalog())
+            self.assertEqual('"v1"', self.stub.requests[-1][1])
+            second.stop()
+
+    def test_background_thread_keeps_replica_updated(self):
+        self.client.sync_catalog()
+        self.replica.interval = 0.01
+        self.replica.start(self.client.sync_catalog)
+        self.stub.change([listed(101, 20.0)])
+
+        deadline = time.monotonic() + 5
+        while self.replica.get(101)["preco"] != 20.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(20.0, self.replica.get(101)["preco"])
+
+    def test_restart_does_not_revive_the_previous_thread(self):
+        replica = CatalogReplica(enabled=True, interval=0.01)
+        entered, release = threading.Event(), threading.Event()
+        calls = []
+
+        def blocking_sync():
+            calls.append(threading.current_thread())
+            entered.set()
+            release.wait(5)
+
+        replica.start(blocking_sync)
+        self.assertTrue(entered.wait(5))
+        first = replica._thread
+        # Parada rápida com a thread ainda dentro de sync, seguida de um novo start.
+        replica.stop(timeout=0.01)
+        self.assertTrue(first.is_alive())
+        replica.start(lambda: None)
+
+        release.set()
+        first.join(5)
+        self.assertFalse(first.is_alive())
+        self.assertEqual([first], calls)
+        second = replica._thread
+        replica.stop(timeout=5)
+        self.assertFalse(second.is_alive())
+
+    def test_async_client_reads_replica(self):
+        self.client.sync_catalog()
+        async_client = self._client(self.replica, AsyncProductGatewayClient)
+
+        async def main():
+            try:
+                return await async_client.get_products_by_codes([101, 102])
+            finally:
+                await async_client.aclose()
+
+        self.assertEqual({101, 102}, set(asyncio.run(main())))
+        self.assertEqual(["/ms-kotlin/produto"], self.stub.paths())
+
+    def test_disabled_replica_is_ignored(self):
+        replica = CatalogReplica(enabled=False)
+        replica.apply([listed(101)])
+
+        self.assertIsNone(replica.get(101))
+        replica.start(lambda: None)
+        self.assertIsNone(replica._thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
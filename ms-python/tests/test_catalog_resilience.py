@@ -0,0 +1,291 @@
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.discovery import ServiceInstanceCache  # noqa: E402
+from src.orders.product_cache import ProductCache  # noqa: E402
+from src.orders.product_client import AsyncProductGatewayClient, ProductGatewayClient  # noqa: E402
+from src.orders.resilience import CircuitBreaker, CircuitOpenError, CircuitState, RetryPolicy  # noqa: E402
+
+
+PRODUCT = {"codigoProduto": 101, "descricao": "Café especial em grãos 1kg", "codGruEst": 100}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def start_stub_server(respond):
+    """Sobe um servidor HTTP local; ``respond(path)`` devolve (status, corpo)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
+            status, payload = respond(self.path)
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # noqa: A003 - método da stdlib
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def consul_entry(url):
+    host, port = url.rsplit("//", 1)[1].split(":")
+    return {"Service": {"Address": host, "Port": int(port)}}
+
+
+class CatalogStub:
+    """Catálogo que falha as primeiras ``failures`` consultas com 500."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, path):
+        with self._lock:
+            self.calls += 1
+            failing = self.calls <= self.failures
+        if self.delay:
+            time.sleep(self.delay)
+        if failing:
+            return 500, {"erro": "indisponível"}
+        return 200, PRODUCT
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_after_threshold_and_probes_after_reset_timeout(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=5, clock=clock)
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(CircuitState.OPEN, breaker.state)
+        self.assertFalse(breaker.allow_request())
+
+        clock.now += 5
+        self.assertEqual(CircuitState.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_failure()
+        self.assertEqual(CircuitState.OPEN, breaker.state)
+
+        clock.now += 5
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(CircuitState.CLOSED, breaker.state)
+
+    def test_backoff_is_bounded_by_max_delay(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0.1, max_delay=0.3, deadline=1)
+        for attempt in range(10):
+            self.assertLessEqual(policy.backoff(attempt), 0.3)
+
+
+class CatalogResilienceTests(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def start(self, respond):
+        server = start_stub_server(respond)
+        self.servers.append(server)
+        return server
+
+    def make_client(self, fallback_base_url=None, consul_addr="http://127.0.0.1:1", **kwargs):
+        kwargs.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.002, deadline=5))
+        return ProductGatewayClient(
+            discovery=ServiceInstanceCache(consul_addr, fallback_base_url=fallback_base_url, watch=False),
+            cache=ProductCache(),
+            **kwargs,
+        )
+
+    def test_retries_server_errors_until_success(self):
+        stub = CatalogStub(failures=2)
+        client = self.make_client(base_url(self.start(stub)))
+
+        self.assertEqual(PRODUCT, client.get_product_by_code(101))
+        self.assertEqual(3, stub.calls)
+
+    def test_circuit_opens_and_rejects_without_calling_catalog(self):
+        stub = CatalogStub(failures=100)
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        client = self.make_client(base_url(self.start(stub)), breaker=breaker)
+
+        with self.assertRaises(CircuitOpenError):
+            client.get_product_by_code(101)
+        self.assertEqual(2, stub.calls)
+
+        started = time.perf_counter()
+        with self.assertRaises(CircuitOpenError):
+            client.get_product_by_code(101)
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(2, stub.calls)
+
+        # Depois do reset_timeout, uma sondagem bem-sucedida fecha o circuito.
+        stub.failures = 0
+        clock.now += 10
+        self.assertEqual(PRODUCT, client.get_product_by_code(101))
+        self.assertEqual("CLOSED", client.breaker_state())
+
+    def test_not_found_does_not_count_as_failure(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        server = self.start(lambda path: (404, {"erro": "não encontrado"}))
+        client = self.make_client(base_url(server), breaker=breaker)
+
+        for code in (1, 2, 3):
+            with self.assertRaises(ValueError):
+                client.get_product_by_code(code)
+        self.assertEqual(CircuitState.CLOSED, breaker.state)
+
+    def test_connection_failure_triggers_rediscovery(self):
+        healthy = base_url(self.start(CatalogStub()))
+        dead = f"http://127.0.0.1:{unused_port()}"
+        answers = [[consul_entry(dead)], [consul_entry(healthy)]]
+        consul_calls = []
+
+        def consul(path):
+            consul_calls.append(path)
+            return 200, answers[min(len(consul_calls), len(answers)) - 1]
+
+        consul_server = self.start(consul)
+        client = self.make_client(consul_addr=base_url(consul_server))
+
+        self.assertEqual(PRODUCT, client.get_product_by_code(101))
+        self.assertEqual(2, len(consul_calls))
+
+    def test_hedges_slow_instance_with_second_healthy_instance(self):
+        slow = base_url(self.start(CatalogStub(delay=1.0)))
+        fast_stub = CatalogStub()
+        fast = base_url(self.start(fast_stub))
+        consul_server = self.start(lambda path: (200, [consul_entry(slow), consul_entry(fast)]))
+        client = self.make_client(consul_addr=base_url(consul_server), hedge_delay=0.05)
+
+        with mock.patch("src.orders.discovery.random.sample", side_effect=lambda seq, k: seq[:k]):
+            started = time.perf_counter()
+            self.assertEqual(PRODUCT, client.get_product_by_code(101))
+            elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(1, fast_stub.calls)
+
+    def test_timeout_is_bounded_by_deadline(self):
+        server = self.start(CatalogStub(delay=1.0))
+        client = self.make_client(
+            base_url(server),
+            retry=RetryPolicy(max_attempts=5, base_delay=0.001, max_delay=0.002, deadline=0.3),
+        )
+
+        started = time.perf_counter()
+        with self.assertRaises(requests.Timeout):
+            client.get_product_by_code(101)
+        self.assertLess(time.perf_counter() - started, 0.9)
+
+
+class AsyncCatalogResilienceTests(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def start(self, respond):
+        server = start_stub_server(respond)
+        self.servers.append(server)
+        return server
+
+    def make_client(self, fallback_base_url=None, consul_addr="http://127.0.0.1:1", **kwargs):
+        kwargs.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.002, deadline=5))
+        return AsyncProductGatewayClient(
+            discovery=ServiceInstanceCache(consul_addr, fallback_base_url=fallback_base_url, watch=False),
+            cache=ProductCache(),
+            **kwargs,
+        )
+
+    def test_retries_and_opens_circuit(self):
+        stub = CatalogStub(failures=100)
+        client = self.make_client(
+            base_url(self.start(stub)), breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        )
+
+        async def scenario():
+            try:
+                with self.assertRaises(Exception):
+                    await client.get_product_by_code(101)
+                with self.assertRaises(CircuitOpenError):
+                    await client.get_product_by_code(101)
+            finally:
+                await client.aclose()
+
+        asyncio.run(scenario())
+        self.assertEqual(3, stub.calls)
+
+    def test_hedges_slow_instance(self):
+        slow = base_url(self.start(CatalogStub(delay=1.0)))
+        fast_stub = CatalogStub()
+        fast = base_url(self.start(fast_stub))
+        consul_server = self.start(lambda path: (200, [consul_entry(slow), consul_entry(fast)]))
+        client = self.make_client(consul_addr=base_url(consul_server), hedge_delay=0.05)
+
+        async def scenario():
+            try:
+                started = time.perf_counter()
+                product = await client.get_product_by_code(101)
+                return product, time.perf_counter() - started
+            finally:
+                await client.aclose()
+
+        with mock.patch("src.orders.discovery.random.sample", side_effect=lambda seq, k: seq[:k]):
+            product, elapsed = asyncio.run(scenario())
+
+        self.assertEqual(PRODUCT, product)
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(1, fast_stub.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
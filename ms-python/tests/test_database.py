@@ -0,0 +1,52 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.database import create_database_engine  # noqa: E402
+
+
+class DatabaseProfileTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.database_url = f"sqlite:///{Path(self._tmpdir.name) / 'orders.db'}"
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _pragma(self, engine, name):
+        with engine.connect() as connection:
+            return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+    def test_performance_profile_applies_pragmas_and_sized_pool(self):
+        engine = create_database_engine(self.database_url, profile="performance", echo=False)
+        try:
+            self.assertEqual("wal", self._pragma(engine, "journal_mode"))
+            self.assertEqual(1, self._pragma(engine, "synchronous"))  # NORMAL
+            self.assertEqual(5000, self._pragma(engine, "busy_timeout"))
+            self.assertIsInstance(engine.pool, QueuePool)
+            self.assertEqual(8, engine.pool.size())
+        finally:
+            engine.dispose()
+
+    def test_default_profile_keeps_sqlite_defaults(self):
+        engine = create_database_engine(self.database_url, profile="default", echo=False)
+        try:
+            self.assertEqual("delete", self._pragma(engine, "journal_mode"))
+        finally:
+            engine.dispose()
+
+    def test_rejects_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            create_database_engine(self.database_url, profile="turbo", echo=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+import json
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.discovery import ServiceDiscoveryError, ServiceInstanceCache  # noqa: E402
+from src.orders.product_cache import ProductCache  # noqa: E402
+from src.orders.product_client import ProductGatewayClient  # noqa: E402
+from test_catalog_resilience import (  # noqa: E402
+    CatalogStub,
+    FakeClock,
+    base_url,
+    consul_entry,
+    start_stub_server,
+)
+
+
+class FakeConsul:
+    """Consul mínimo com suporte a blocking queries em /v1/health/service."""
+
+    def __init__(self, urls):
+        self.index = 1
+        self.urls = list(urls)
+        self.queries = []
+        self._changed = threading.Condition()
+        handler = self._handler()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def addr(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def update(self, urls):
+        with self._changed:
+            self.urls = list(urls)
+            self.index += 1
+            self._changed.notify_all()
+
+    def close(self):
+        with self._changed:
+            self._changed.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        consul = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
+                params = parse_qs(urlparse(self.path).query)
+                consul.queries.append(params)
+                index = int(params.get("index", ["0"])[0])
+                wait = float(params.get("wait", ["0s"])[0].rstrip("s"))
+                with consul._changed:
+                    if index and index == consul.index:
+                        consul._changed.wait(wait)
+                    body = json.dumps([consul_entry(url) for url in consul.urls]).encode()
+                    current = consul.index
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Consul-Index", str(current))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # noqa: A003 - método da stdlib
+                return
+
+        return Handler
+
+
+class ServiceInstanceCacheTests(unittest.TestCase):
+    def test_watch_tracks_changes_through_blocking_queries(self):
+        consul = FakeConsul(["http://10.0.0.1:8080"])
+        self.addCleanup(consul.close)
+        discovery = ServiceInstanceCache(consul.addr, "api-gateway", fallback_base_url=None, wait="2s")
+        self.addCleanup(discovery.stop)
+
+        discovery.ensure_loaded()
+        self.assertEqual(1, discovery.index)
+        consul.update(["http://10.0.0.1:8080", "http://10.0.0.2:8080"])
+
+        deadline = time.time() + 3
+        while len(discovery.snapshot()) < 2 and time.time() < deadline:
+            time.sleep(0.02)
+
+        self.assertEqual(
+            {"http://10.0.0.1:8080", "http://10.0.0.2:8080"},
+            {instance["url"] for instance in discovery.snapshot()},
+        )
+        self.assertEqual(2, discovery.index)
+        blocking = [query for query in consul.queries if "index" in query]
+        self.assertEqual(["1"], blocking[0]["index"])
+        self.assertEqual(["2s"], blocking[0]["wait"])
+
+    def test_restart_after_stop_leaves_a_single_watcher(self):
+        consul = FakeConsul(["http://10.0.0.1:8080"])
+        self.addCleanup(consul.close)
+        discovery = ServiceInstanceCache(consul.addr, "gateway-restart", fallback_base_url=None, wait="2s")
+        self.addCleanup(discovery.stop)
+
+        discovery.ensure_loaded()
+        first = discovery._thread
+        time.sleep(0.1)  # a primeira thread fica presa na consulta bloqueante
+        discovery.stop()
+        discovery.start()
+        second = discovery._thread
+
+        consul.update(["http://10.0.0.2:8080"])  # libera a consulta da primeira thread
+        first.join(3)
+        self.assertFalse(first.is_alive())
+        self.assertTrue(second.is_alive())
+        watchers = [thread for thread in threading.enumerate() if thread.name == "consul-watch-gateway-restart"]
+        self.assertEqual([second], watchers)
+
+        discovery.stop(timeout=3)
+        self.assertFalse(second.is_alive())
+
+    def test_prefers_instance_with_fewer_outstanding_requests(self):
+        discovery = ServiceInstanceCache("http://127.0.0.1:1", fallback_base_url=None, watch=False)
+        discovery.apply([consul_entry("http://10.0.0.1:8080"), consul_entry("http://10.0.0.2:8080")], 7)
+        for _ in range(3):
+            discovery.begin("http://10.0.0.1:8080")
+
+        self.assertEqual({"http://10.0.0.2:8080"}, {discovery.choose() for _ in range(20)})
+
+    def test_ejects_instance_after_consecutive_failures(self):
+        clock = FakeClock()
+        discovery = ServiceInstanceCache(
+            "http://127.0.0.1:1",
+            fallback_base_url=None,
+            ejection_failures=2,
+            ejection_period=10,
+            watch=False,
+            clock=clock,
+        )
+        discovery.apply([consul_entry("http://10.0.0.1:8080"), consul_entry("http://10.0.0.2:8080")], 1)
+        for _ in range(2):
+            discovery.begin("http://10.0.0.1:8080")
+            discovery.end("http://10.0.0.1:8080", ok=False)
+
+        self.assertEqual({"http://10.0.0.2:8080"}, {discovery.choose() for _ in range(20)})
+
+        # Uma atualização do Consul não apaga a ejeção local.
+        discovery.apply([consul_entry("http://10.0.0.1:8080"), consul_entry("http://10.0.0.2:8080")], 2)
+        self.assertEqual({"http://10.0.0.2:8080"}, {discovery.choose() for _ in range(20)})
+
+        clock.now += 10
+        self.assertEqual(
+            {"http://10.0.0.1:8080", "http://10.0.0.2:8080"},
+            {discovery.choose() for _ in range(50)},
+        )
+
+    def test_uses_all_instances_when_every_one_is_ejected(self):
+        discovery = ServiceInstanceCache(
+            "http://127.0.0.1:1", fallback_base_url=None, ejection_failures=1, watch=False
+        )
+        discovery.apply([consul_entry("http://10.0.0.1:8080")], 1)
+        discovery.end("http://10.0.0.1:8080", ok=False)
+
+        self.assertEqual("http://10.0.0.1:8080", discovery.choose())
+
+    def test_keeps_last_known_instances_when_consul_is_unreachable(self):
+        discovery = ServiceInstanceCache("http://127.0.0.1:1", fallback_base_url=None, watch=False)
+        discovery.apply([consul_entry("http://10.0.0.1:8080")], 3)
+
+        self.assertFalse(discovery.refresh())
+        self.assertEqual("http://10.0.0.1:8080", discovery.choose())
+
+    def test_without_instances_or_fallback_raises(self):
+        discovery = ServiceInstanceCache("http://127.0.0.1:1", fallback_base_url=None, watch=False)
+        discovery.refresh()
+
+        with self.assertRaises(ServiceDiscoveryError):
+            discovery.choose()
+
+
+class BalancedClientTests(unittest.TestCase):
+    def test_client_spreads_requests_across_instances(self):
+        stubs = [CatalogStub(), CatalogStub()]
+        servers = [start_stub_server(stub) for stub in stubs]
+        consul = FakeConsul([base_url(server) for server in servers])
+        for server in servers:
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+        self.addCleanup(consul.close)
+
+        discovery = ServiceInstanceCache(consul.addr, fallback_base_url=None, watch=False)
+        client = ProductGatewayClient(discovery=discovery, cache=ProductCache())
+        for code in range(40):
+            client.get_product_by_code(code)
+
+        self.assertEqual(40, sum(stub.calls for stub in stubs))
+        self.assertTrue(all(stub.calls > 0 for stub in stubs))
+        self.assertEqual(1, len(consul.queries))
+
+
+if __name__ == "__main__":
+    unittest.main()
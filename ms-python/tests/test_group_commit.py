@@ -0,0 +1,194 @@
+import asyncio
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import create_schema, reload_modules  # noqa: E402
+from src.group_commit import GroupCommitWriter  # noqa: E402
+
+metadata = MetaData()
+items = Table(
+    'items',
+    metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String, nullable=False, unique=True),
+)
+
+
+class GroupCommitWriterTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self._tmpdir.name) / 'items.db'}")
+        metadata.create_all(self.engine)
+        self.commits = 0
+
+        @event.listens_for(self.engine, 'commit')
+        def count_commit(connection):
+            self.commits += 1
+
+        self.writer = GroupCommitWriter(sessionmaker(self.engine), None, enabled=True, max_batch=3, max_delay=0)
+
+    def tearDown(self):
+        self.writer.stop()
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _insert(self, name, sessions=None):
+        def stage(session):
+            if sessions is not None:
+                sessions.append(id(session))
+            return session.scalar(insert(items).values(name=name).returning(items.c.id))
+        return stage
+
+    def _names(self):
+        with self.engine.connect() as connection:
+            return set(connection.scalars(select(items.c.name)))
+
+    def _hold_first_batch(self):
+        """Primeiro lote parado na thread do writer até ``release.set()``, para acumular a fila."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking(session):
+            started.set()
+            release.wait(5)
+            return session.scalar(insert(items).values(name='first').returning(items.c.id))
+
+        first = self.writer._enqueue(blocking, None)
+        self.assertTrue(started.wait(5))
+        return first, release
+
+    def test_queued_writes_share_commits_up_to_max_batch(self):
+        first, release = self._hold_first_batch()
+        sessions = []
+        futures = [self.writer._enqueue(self._insert(f'item-{i}', sessions), None) for i in range(6)]
+        release.set()
+
+        ids = [first.result(5)] + [future.result(5) for future in futures]
+        self.assertEqual(7, len(set(ids)))
+        self.assertEqual(3, self.commits)  # lotes de 1, 3 e 3
+        self.assertEqual([3, 3], [sessions.count(session) for session in dict.fromkeys(sessions)])
+        self.assertEqual({'first'} | {f'item-{i}' for i in range(6)}, self._names())
+
+    def test_failing_item_does_not_fail_the_batch(self):
+        first, release = self._hold_first_batch()
+
+        def broken(session):
+            session.execute(insert(items).values(name='broken'))
+            raise ValueError('item inválido')
+
+        good = self.writer._enqueue(self._insert('good'), None)
+        bad = self.writer._enqueue(broken, None)
+        duplicate = self.writer._enqueue(self._insert('first'), None)  # viola o índice único
+        release.set()
+
+        first.result(5)
+        self.assertIsInstance(good.result(5), int)
+        with self.assertRaises(ValueError):
+            bad.result(5)
+        with self.assertRaises(IntegrityError):
+            duplicate.result(5)
+        self.assertEqual({'first', 'good'}, self._names())
+
+    def test_result_and_on_commit_only_after_commit(self):
+        seen = []
+
+        def on_commit(new_id):
+            with self.engine.connect() as connection:
+                seen.append(connection.scalar(select(items.c.name).where(items.c.id == new_id)))
+
+        with ThreadPoolExecutor(8) as pool:
+            ids = list(pool.map(lambda i: self.writer.write(self._insert(f'c-{i}'), on_commit), range(8)))
+
+        self.assertEqual(8, len(set(ids)))
+        self.assertEqual({f'c-{i}' for i in range(8)}, set(seen))
+        self.assertLessEqual(self.commits, 8)
+
+    def test_async_callers_wait_for_commit(self):
+        async def main():
+            return await asyncio.gather(*(self.writer.write_async(self._insert(f'a-{i}')) for i in range(5)))
+
+        self.assertEqual(5, len(set(asyncio.run(main()))))
+        self.assertEqual({f'a-{i}' for i in range(5)}, self._names())
+
+    def test_disabled_writer_commits_inline(self):
+        writer = GroupCommitWriter(sessionmaker(self.engine), None, enabled=False)
+        threads = []
+
+        def stage(session):
+            threads.append(threading.current_thread())
+            return self._insert('inline')(session)
+
+        writer.write(stage)
+        self.assertEqual([threading.current_thread()], threads)
+        self.assertEqual({'inline'}, self._names())
+
+    def test_stop_flushes_pending_writes(self):
+        first, release = self._hold_first_batch()
+        pending = self.writer._enqueue(self._insert('pending'), None)
+        release.set()
+        self.writer.stop()
+
+        self.assertTrue(pending.done())
+        self.assertEqual({'first', 'pending'}, self._names())
+
+
+class GroupCommitServiceTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        modules = reload_modules(f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}")
+        cls.database_module = modules["src.orders.database"]
+        cls.orders_model = modules["src.orders.model"]
+        cls.payments_model = modules["src.payments.model"]
+        cls.storage_module = modules["src.storage"]
+        cls.orders_service = modules["src.orders.service"]
+        cls.payments_service = modules["src.payments.service"]
+        create_schema(cls.database_module.engine)
+
+        cls.writer = cls.storage_module.writer
+        cls.writer.enabled = True
+        cls.writer.max_delay = 0.02
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.writer.stop()
+        cls.writer.enabled = False
+        cls.database_module.engine.dispose()
+        cls._tmpdir.cleanup()
+
+    def test_concurrent_payments_get_own_ids_and_conflicts(self):
+        request = self.payments_model.PaymentRequest
+        payments = [request(orderNumber=n, amount=10.0, paymentMethod="pix") for n in (1, 2, 3, 1)]
+
+        def create(payment):
+            try:
+                return self.payments_service.create_payment_service(payment)
+            except HTTPException as exc:
+                return exc.status_code
+
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(create, payments))
+
+        created = [result for result in results if not isinstance(result, int)]
+        self.assertEqual([409], [result for result in results if isinstance(result, int)])
+        self.assertEqual(3, len({payment.id for payment in created}))
+        self.assertEqual({1, 2, 3}, {payment.orderNumber for payment in created})
+        with self.database_module.engine.connect() as connection:
+            self.assertEqual(3, connection.scalar(select(func.count()).select_from(self.payments_model.PaymentModel)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import create_engine, func, select
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.idempotency import (  # noqa: E402
+    IdempotencyMiddleware,
+    IdempotencyStore,
+    Outcome,
+    idempotency_keys,
+    idempotency_metadata,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, 12, 0)
+
+    def __call__(self):
+        return self.now
+
+
+class IdempotencyStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self._tmpdir.name) / 'orders.db'}")
+        idempotency_metadata.create_all(bind=self.engine)
+        self.clock = FakeClock()
+        self.store = IdempotencyStore(self.engine, ttl=60, lock_timeout=10, clock=self.clock)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def test_replays_completed_response_from_memory_and_from_database(self):
+        self.assertEqual((Outcome.ACQUIRED, None), self.store.begin("POST /order/", "k1", "fp"))
+        self.store.complete("POST /order/", "k1", "fp", 201, "application/json", b'{"id":1}')
+
+        outcome, stored = self.store.begin("POST /order/", "k1", "fp")
+        self.assertEqual(Outcome.REPLAYED, outcome)
+        self.assertEqual(b'{"id":1}', stored.body)
+
+        # Outro worker: memória vazia, resposta vem da tabela.
+        other = IdempotencyStore(self.engine, ttl=60, clock=self.clock)
+        outcome, stored = other.begin("POST /order/", "k1", "fp")
+        self.assertEqual(Outcome.REPLAYED, outcome)
+        self.assertEqual(201, stored.status_code)
+
+    def test_rejects_reuse_with_different_body_and_concurrent_duplicates(self):
+        self.store.begin("POST /order/", "k1", "fp")
+
+        self.assertEqual(Outcome.IN_PROGRESS, self.store.begin("POST /order/", "k1", "fp")[0])
+        self.assertEqual(Outcome.MISMATCH, self.store.begin("POST /order/", "k1", "other")[0])
+
+    def test_takes_over_abandoned_or_expired_keys(self):
+        self.store.begin("POST /order/", "k1", "fp")
+        self.clock.now += timedelta(seconds=10)
+        self.assertEqual(Outcome.ACQUIRED, self.store.begin("POST /order/", "k1", "fp")[0])
+
+        self.store.complete("POST /order/", "k1", "fp", 201, None, b"{}")
+        self.store.clear_memory()
+        self.clock.now += timedelta(seconds=60)
+        self.assertEqual(Outcome.ACQUIRED, self.store.begin("POST /order/", "k1", "fp")[0])
+
+    def test_release_allows_retry_and_purge_drops_expired_rows(self):
+        self.store.begin("POST /order/", "k1", "fp")
+        self.store.release("POST /order/", "k1")
+        self.assertEqual(Outcome.ACQUIRED, self.store.begin("POST /order/", "k1", "fp")[0])
+
+        self.clock.now += timedelta(seconds=61)
+        self.assertEqual(1, self.store.purge_expired())
+
+    def test_storing_a_response_purges_expired_keys_at_most_once_per_interval(self):
+        store = IdempotencyStore(self.engine, ttl=10, purge_interval=60, clock=self.clock)
+
+        def store_response(key):
+            store.begin("POST /order/", key, "fp")
+            store.complete("POST /order/", key, "fp", 201, None, b"{}")
+
+        def stored_keys():
+            with self.engine.connect() as connection:
+                return set(connection.scalars(select(idempotency_keys.c.key)))
+
+        store_response("old")
+        # Dentro do intervalo a gravação não varre a tabela de novo.
+        self.clock.now += timedelta(seconds=11)
+        store_response("k1")
+        self.assertEqual({"old", "k1"}, stored_keys())
+
+        self.clock.now += timedelta(seconds=49)
+        store_response("k2")
+        self.assertEqual({"k2"}, stored_keys())
+
+
+class Item(BaseModel):
+    productCode: int
+
+
+class IdempotencyMiddlewareTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self._tmpdir.name) / 'orders.db'}")
+        idempotency_metadata.create_all(bind=self.engine)
+        self.calls = 0
+
+        app = FastAPI()
+        app.add_middleware(
+            IdempotencyMiddleware, store=IdempotencyStore(self.engine), routes={("POST", "/order/")}
+        )
+
+        @app.post("/order/", status_code=201)
+        def create(item: Item):
+            self.calls += 1
+            if item.productCode == 500:
+                raise HTTPException(status_code=503, detail="catálogo indisponível")
+            return {"id": self.calls, "productCode": item.productCode}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.client.close()
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def test_retry_with_same_key_returns_original_response(self):
+        headers = {"Idempotency-Key": "abc"}
+        first = self.client.post("/order/", json={"productCode": 101}, headers=headers)
+        second = self.client.post("/order/", json={"productCode": 101}, headers=headers)
+
+        self.assertEqual(201, second.status_code)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual("true", second.headers["idempotent-replayed"])
+        self.assertEqual(1, self.calls)
+
+    def test_same_key_with_other_body_is_rejected(self):
+        self.client.post("/order/", json={"productCode": 101}, headers={"Idempotency-Key": "abc"})
+        response = self.client.post("/order/", json={"productCode": 202}, headers={"Idempotency-Key": "abc"})
+
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(1, self.calls)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post("/order/", json={"productCode": 101})
+        self.client.post("/order/", json={"productCode": 101})
+
+        self.assertEqual(2, self.calls)
+
+    def test_server_errors_release_the_key(self):
+        headers = {"Idempotency-Key": "retry-me"}
+        self.assertEqual(503, self.client.post("/order/", json={"productCode": 500}, headers=headers).status_code)
+        self.assertEqual(503, self.client.post("/order/", json={"productCode": 500}, headers=headers).status_code)
+
+        self.assertEqual(2, self.calls)
+        with self.engine.connect() as connection:
+            self.assertEqual(0, connection.scalar(select(func.count()).select_from(idempotency_keys)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import metrics  # noqa: E402
+from src.orders.product_client import ProductGatewayClient  # noqa: E402
+from test_orders_integration import start_catalog_server  # noqa: E402
+
+
+class HistogramTests(unittest.TestCase):
+    def test_renders_cumulative_buckets_sum_and_count(self):
+        histogram = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(3.0, "/a")
+
+        lines = histogram.render()
+
+        self.assertIn('demo_seconds_bucket{route="/a",le="0.1"} 1', lines)
+        self.assertIn('demo_seconds_bucket{route="/a",le="1.0"} 2', lines)
+        self.assertIn('demo_seconds_bucket{route="/a",le="+Inf"} 3', lines)
+        self.assertIn('demo_seconds_sum{route="/a"} 3.55', lines)
+        self.assertIn('demo_seconds_count{route="/a"} 3', lines)
+
+
+class MetricsMiddlewareTests(unittest.TestCase):
+    def test_labels_requests_with_route_template_and_status(self):
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int):
+            return {"id": item_id}
+
+        before = metrics.http_request_duration.count("GET", "/items/{item_id}", "200")
+        with TestClient(app) as client:
+            client.get("/items/1")
+            client.get("/items/2")
+            client.get("/nowhere")
+
+        self.assertEqual(before + 2, metrics.http_request_duration.count("GET", "/items/{item_id}", "200"))
+        self.assertLessEqual(1, metrics.http_request_duration.count("GET", "unmatched", "404"))
+
+
+class CatalogOutcomeTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.thread = start_catalog_server()
+        host, port = cls.server.server_address
+        cls.base_url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join(timeout=5)
+        cls.server.server_close()
+
+    def test_labels_catalog_calls_by_outcome(self):
+        histogram = metrics.catalog_request_duration
+        before = {o: histogram.count(o) for o in ("fallback", "hit", "not_found", "discovery_failure")}
+        client = ProductGatewayClient(consul_addr="http://127.0.0.1:59999", fallback_base_url=self.base_url)
+        client.get_product_by_code(101)
+        client.get_product_by_code(101)
+        with self.assertRaises(ValueError):
+            client.get_product_by_code(999)
+        with self.assertRaises(Exception):
+            ProductGatewayClient(consul_addr="http://127.0.0.1:59999", fallback_base_url=None).get_product_by_code(1)
+
+        self.assertEqual(
+            {"fallback": 1, "hit": 1, "not_found": 1, "discovery_failure": 1},
+            {o: histogram.count(o) - before[o] for o in before},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.migrations import (  # noqa: E402
+    MIGRATIONS,
+    Migration,
+    _execute_all,
+    applied_versions,
+    pending_versions,
+    run_migrations,
+    schema_migrations,
+)
+
+
+# Esquema criado pelo create_all antes da existência das migrações.
+LEGACY_SCHEMA = (
+    'CREATE TABLE orders (id INTEGER PRIMARY KEY, "orderNumber" INTEGER NOT NULL, '
+    '"tableNumber" INTEGER NOT NULL, quantity INTEGER NOT NULL, description VARCHAR, '
+    '"codGruEst" INTEGER NOT NULL, "productCode" INTEGER NOT NULL)',
+    'CREATE TABLE payments (id INTEGER PRIMARY KEY, "orderNumber" INTEGER NOT NULL, '
+    'amount FLOAT NOT NULL, "paymentMethod" VARCHAR NOT NULL, "transactionId" VARCHAR, '
+    '"updatedAt" DATETIME, status VARCHAR NOT NULL, "createdAt" DATETIME NOT NULL)',
+)
+
+
+class MigrationRunnerTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self._tmpdir.name) / 'orders.db'}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def test_adds_indexes_to_existing_database(self):
+        with self.engine.begin() as connection:
+            for statement in LEGACY_SCHEMA:
+                connection.execute(text(statement))
+
+        applied = run_migrations(self.engine)
+
+        self.assertEqual([m.version for m in MIGRATIONS], applied)
+        inspector = inspect(self.engine)
+        self.assertIn("ix_orders_orderNumber", {i["name"] for i in inspector.get_indexes("orders")})
+        self.assertEqual(
+            {"ix_payments_orderNumber_status", "ix_payments_createdAt", "ux_payments_active_order"},
+            {i["name"] for i in inspector.get_indexes("payments")},
+        )
+        self.assertIn("idempotency_keys", inspector.get_table_names())
+        self.assertIn("order_sequences", inspector.get_table_names())
+        self.assertLessEqual({"unitPrice", "lineTotal"}, {c["name"] for c in inspector.get_columns("orders")})
+
+    def test_backfills_table_summaries_from_existing_rows(self):
+        with self.engine.begin() as connection:
+            for statement in LEGACY_SCHEMA:
+                connection.execute(text(statement))
+            connection.execute(text(
+                'INSERT INTO orders ("orderNumber", "tableNumber", quantity, "codGruEst", "productCode") '
+                'VALUES (1, 5, 2, 100, 101), (1, 5, 1, 100, 202), (2, 8, 4, 100, 101)'
+            ))
+            connection.execute(text(
+                'INSERT INTO payments ("orderNumber", amount, "paymentMethod", status, "createdAt") '
+                "VALUES (1, 25.0, 'PIX', 'COMPLETED', '2026-01-01 12:00:00'), "
+                "(2, 12.0, 'PIX', 'PENDING', '2026-01-01 12:05:00')"
+            ))
+
+        run_migrations(self.engine)
+
+        # O pedido 1, pago, já saiu da conta da mesa 5.
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(
+                'SELECT "tableNumber", "orderCount", "itemCount", quantity, "pendingAmount" '
+                'FROM table_summaries ORDER BY "tableNumber"'
+            )).all()
+        self.assertEqual([(5, 0, 0, 0, 0.0), (8, 1, 1, 4, 12.0)], [tuple(row) for row in rows])
+
+    def _legacy_payments(self, *rows):
+        with self.engine.begin() as connection:
+            for statement in LEGACY_SCHEMA:
+                connection.execute(text(statement))
+            for payment_id, order_number, status in rows:
+                connection.execute(text(
+                    'INSERT INTO payments (id, "orderNumber", amount, "paymentMethod", status, "createdAt") '
+                    f"VALUES ({payment_id}, {order_number}, 10.0, 'PIX', '{status}', '2026-01-01 12:0{payment_id}:00')"
+                ))
+
+    def test_duplicate_active_payments_keep_the_newest_or_the_completed(self):
+        # O serviço antigo (consulta antes do INSERT) deixava passar pagamentos ativos repetidos.
+        self._legacy_payments(
+            (1, 1, "PENDING"), (2, 1, "PROCESSING"),
+            (3, 2, "COMPLETED"), (4, 2, "PENDING"),
+            (5, 3, "PENDING"), (6, 3, "FAILED"),
+        )
+
+        run_migrations(self.engine)
+
+        with self.engine.connect() as connection:
+            statuses = dict(connection.execute(text("SELECT id, status FROM payments")).all())
+        self.assertEqual({
+            1: "CANCELLED", 2: "PROCESSING",
+            3: "COMPLETED", 4: "CANCELLED",
+            5: "PENDING", 6: "FAILED",
+        }, statuses)
+        self.assertIn("ux_payments_active_order", {i["name"] for i in inspect(self.engine).get_indexes("payments")})
+
+    def test_orders_paid_twice_stop_the_migration(self):
+        self._legacy_payments((1, 7, "COMPLETED"), (2, 7, "COMPLETED"), (3, 8, "PENDING"), (4, 8, "PENDING"))
+
+        with self.assertRaises(RuntimeError) as raised:
+            run_migrations(self.engine)
+
+        self.assertIn("[7]", str(raised.exception))
+        self.assertEqual(3, pending_versions(self.engine)[0])
+        with self.engine.connect() as connection:
+            self.assertEqual(2, connection.scalar(text("SELECT COUNT(*) FROM payments WHERE status = 'PENDING'")))
+
+    def test_second_run_is_a_no_op(self):
+        run_migrations(self.engine)
+
+        self.assertEqual([], run_migrations(self.engine))
+        self.assertEqual({m.version for m in MIGRATIONS}, applied_versions(self.engine))
+
+    def test_pending_versions_reads_without_creating_tables(self):
+        self.assertEqual([m.version for m in MIGRATIONS], pending_versions(self.engine))
+        self.assertEqual([], inspect(self.engine).get_table_names())
+
+        run_migrations(self.engine, MIGRATIONS[:2])
+
+        self.assertEqual([m.version for m in MIGRATIONS[2:]], pending_versions(self.engine))
+
+    def test_failed_migration_stops_at_its_version(self):
+        def duplicate_row(connection):
+            connection.execute(text("CREATE TABLE flags (name VARCHAR PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO flags VALUES ('a'), ('a')"))
+
+        migrations = [
+            Migration(1, "tabela", _execute_all("CREATE TABLE items (id INTEGER PRIMARY KEY)")),
+            Migration(2, "linha repetida", duplicate_row),
+            Migration(3, "depois da falha", _execute_all("CREATE TABLE later (id INTEGER PRIMARY KEY)")),
+        ]
+
+        with self.assertRaises(IntegrityError):
+            run_migrations(self.engine, migrations)
+
+        self.assertEqual([2, 3], pending_versions(self.engine, migrations))
+        self.assertNotIn("later", inspect(self.engine).get_table_names())
+
+    def test_version_registered_by_another_process_is_skipped(self):
+        def applied_elsewhere(connection):
+            # Outro processo termina a mesma versão antes deste registrar a sua.
+            with self.engine.begin() as other:
+                other.execute(schema_migrations.insert().values(
+                    version=1, description="tabela", appliedAt=datetime.now()
+                ))
+
+        migrations = [
+            Migration(1, "tabela", applied_elsewhere),
+            Migration(2, "índice", _execute_all("CREATE TABLE items (id INTEGER PRIMARY KEY)")),
+        ]
+
+        self.assertEqual([2], run_migrations(self.engine, migrations))
+        self.assertEqual([], pending_versions(self.engine, migrations))
+
+
+if __name__ == "__main__":
+    unittest.main()
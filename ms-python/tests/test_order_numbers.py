@@ -0,0 +1,85 @@
+import multiprocessing
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.model import table_registry  # noqa: E402
+from src.orders.order_number import OrderNumberAllocator  # noqa: E402
+
+
+def _engine(database_url):
+    return create_engine(database_url, connect_args={"check_same_thread": False, "timeout": 30})
+
+
+def allocate_in_process(database_url, count, queue):
+    # Cada processo tem seu próprio engine e alocador, como um worker do uvicorn.
+    engine = _engine(database_url)
+    allocator = OrderNumberAllocator(engine, block_size=7)
+    queue.put([allocator.allocate() for _ in range(count)])
+    engine.dispose()
+
+
+class OrderNumberAllocatorTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.database_url = f"sqlite:///{Path(self._tmpdir.name) / 'orders.db'}"
+        self.engine = _engine(self.database_url)
+        table_registry.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def test_allocates_sequential_numbers_within_a_block(self):
+        allocator = OrderNumberAllocator(self.engine, block_size=3)
+
+        numbers = [allocator.allocate() for _ in range(7)]
+
+        self.assertEqual([1, 2, 3, 4, 5, 6, 7], numbers)
+
+    def test_no_duplicates_across_threads(self):
+        # Dois alocadores simulam workers distintos; as threads disputam cada um.
+        allocators = [OrderNumberAllocator(self.engine, block_size=5) for _ in range(2)]
+        results: list[list[int]] = [[] for _ in range(8)]
+
+        def worker(index):
+            allocator = allocators[index % 2]
+            results[index].extend(allocator.allocate() for _ in range(100))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        numbers = [number for chunk in results for number in chunk]
+        self.assertEqual(800, len(numbers))
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+    def test_no_duplicates_across_processes(self):
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        processes = [
+            context.Process(target=allocate_in_process, args=(self.database_url, 50, queue))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        numbers = [number for _ in processes for number in queue.get(timeout=60)]
+        for process in processes:
+            process.join(timeout=60)
+
+        self.assertEqual(200, len(numbers))
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,9 +13,11 @@ from sqlalchemy import text
 # Garante que o pacote "orders" fique disponível para os testes.
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 SRC_PATH = PROJECT_ROOT / "src"
-if str(SRC_PATH) not in sys.path:
-    sys.path.insert(0, str(SRC_PATH))
+for path in (PROJECT_ROOT, SRC_PATH):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
 
+from _db import create_schema, reload_modules  # noqa: E402
 from orders.product_client import ProductGatewayClient, ServiceDiscoveryError  # noqa: E402
 
 
@@ -38,8 +40,12 @@ PRODUCTS_FIXTURE = {
 
 
 class CatalogRequestHandler(BaseHTTPRequestHandler):
+    # Quantidade de consultas por código recebidas (usado nos testes de cache).
+    lookups = 0
+
     def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
         if self.path.startswith("/ms-kotlin/produto/codigo/"):
+            type(self).lookups += 1
             try:
                 product_code = int(self.path.rsplit("/", 1)[-1])
             except ValueError:
@@ -113,6 +119,40 @@ class ProductGatewayClientIntegrationTests(unittest.TestCase):
         with self.assertRaises(ServiceDiscoveryError):
             client.get_product_by_code(101)
 
+    def test_serves_repeated_lookups_from_cache(self):
+        client = ProductGatewayClient(
+            consul_addr="http://127.0.0.1:59999",
+            fallback_base_url=self.base_url,
+        )
+        before = CatalogRequestHandler.lookups
+
+        first = client.get_product_by_code(202)
+        second = client.get_product_by_code(202)
+
+        self.assertEqual(first, second)
+        self.assertEqual(before + 1, CatalogRequestHandler.lookups)
+        stats = client.cache_stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+
+    def test_caches_unknown_products_and_invalidates_by_code(self):
+        client = ProductGatewayClient(
+            consul_addr="http://127.0.0.1:59999",
+            fallback_base_url=self.base_url,
+        )
+        before = CatalogRequestHandler.lookups
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                client.get_product_by_code(999)
+        self.assertEqual(before + 1, CatalogRequestHandler.lookups)
+        self.assertEqual(1, client.cache_stats()["negativeHits"])
+
+        self.assertTrue(client.invalidate_product(999))
+        with self.assertRaises(ValueError):
+            client.get_product_by_code(999)
+        self.assertEqual(before + 2, CatalogRequestHandler.lookups)
+
 
 class OrderServiceIntegrationTests(unittest.TestCase):
     @classmethod
@@ -124,22 +164,17 @@ class OrderServiceIntegrationTests(unittest.TestCase):
         cls._tmpdir = tempfile.TemporaryDirectory()
         cls._db_path = Path(cls._tmpdir.name) / "orders.db"
 
-        os.environ["DATABASE_URL"] = f"sqlite:///{cls._db_path}"
-        os.environ["SQLALCHEMY_ECHO"] = "0"
         os.environ["GATEWAY_BASE_URL"] = base_url
         os.environ["CONSUL_HTTP_ADDR"] = "http://127.0.0.1:59999"
 
-        import importlib
-
-        database_module = importlib.import_module("orders.database")
-        model_module = importlib.import_module("orders.model")
-        service_module = importlib.import_module("orders.service")
-
-        cls.database_module = importlib.reload(database_module)
-        cls.model_module = importlib.reload(model_module)
-        cls.service_module = importlib.reload(service_module)
-
-        cls.model_module.table_registry.metadata.create_all(bind=cls.database_module.engine)
+        # O serviço importa os módulos como "src.orders.*"; recarrega essa
+        # cadeia para que o engine aponte para o banco temporário.
+        modules = reload_modules(f"sqlite:///{cls._db_path}")
+        cls.database_module = modules["src.orders.database"]
+        cls.async_database_module = modules["src.orders.async_database"]
+        cls.model_module = modules["src.orders.model"]
+        cls.service_module = modules["src.orders.service"]
+        create_schema(cls.database_module.engine)
 
     @classmethod
     def tearDownClass(cls):
@@ -153,7 +188,9 @@ class OrderServiceIntegrationTests(unittest.TestCase):
         # Limpa o estado a cada teste.
         with self.database_module.SessionLocal() as session:
             session.execute(text("DELETE FROM orders"))
+            session.execute(text("DELETE FROM order_sequences"))
             session.commit()
+        self.service_module.order_number_allocator.reset()
         self.service_module.product_client.clear_cache()
 
     def test_creates_order_populating_details_from_catalog(self):
@@ -167,6 +204,8 @@ class OrderServiceIntegrationTests(unittest.TestCase):
         self.assertEqual(101, created.productCode)
         self.assertEqual("Café especial em grãos 1kg", created.description)
         self.assertEqual(100, created.codGruEst)
+        self.assertEqual(74.9, created.unitPrice)
+        self.assertEqual(149.8, created.lineTotal)
 
     def test_creates_orders_with_incremental_numbers(self):
         request_a = self.model_module.OrderRequest(productCode=101, tableNumber=1, quantity=1)
@@ -180,6 +219,68 @@ class OrderServiceIntegrationTests(unittest.TestCase):
         self.assertEqual("Caixa de barras de cereal sortidas", created_b.description)
         self.assertEqual(200, created_b.codGruEst)
 
+    def test_creates_table_batch_under_single_order_number(self):
+        batch = self.model_module.OrderBatchRequest(
+            tableNumber=4,
+            items=[
+                {"productCode": 101, "quantity": 1},
+                {"productCode": 202, "quantity": 2},
+                {"productCode": 101, "quantity": 3},
+            ],
+        )
+        before = CatalogRequestHandler.lookups
+
+        created = self.service_module.create_order_batch_service(batch)
+
+        self.assertEqual(2, CatalogRequestHandler.lookups - before)
+        self.assertEqual([101, 202, 101], [order.productCode for order in created])
+        self.assertEqual([1, 2, 3], [order.quantity for order in created])
+        self.assertEqual({1}, {order.orderNumber for order in created})
+        self.assertEqual(created, self.service_module.get_orders_service(1))
+
+    def test_backfills_prices_of_existing_orders_in_batches(self):
+        from sqlalchemy import insert
+
+        from src.orders.pricing import backfill_order_prices
+        from src.payments.model import table_registry as payments_registry
+
+        # O backfill recalcula os resumos das mesas, que somam os pagamentos.
+        payments_registry.metadata.create_all(bind=self.database_module.engine)
+        legacy = [
+            {"orderNumber": 1, "tableNumber": 3, "quantity": 2, "codGruEst": 100, "productCode": 101},
+            {"orderNumber": 1, "tableNumber": 3, "quantity": 1, "codGruEst": 200, "productCode": 202},
+            {"orderNumber": 2, "tableNumber": 4, "quantity": 1, "codGruEst": 100, "productCode": 999},
+        ]
+        with self.database_module.SessionLocal() as session:
+            session.execute(insert(self.model_module.OrderModel), legacy)
+            session.commit()
+        before = CatalogRequestHandler.lookups
+
+        result = backfill_order_prices(
+            self.database_module.engine, self.service_module.product_client, batch_size=2
+        )
+
+        self.assertEqual({"updated": 2, "unpriced": [999]}, result)
+        self.assertEqual(3, CatalogRequestHandler.lookups - before)
+        orders = self.service_module.get_orders_service(1)
+        self.assertEqual([149.8, 39.5], [order.lineTotal for order in orders])
+        self.assertEqual(189.3, self.service_module.get_table_summary_service(3).billTotal)
+
+    def test_batch_with_unknown_product_writes_nothing(self):
+        from fastapi import HTTPException
+
+        batch = self.model_module.OrderBatchRequest(
+            tableNumber=4,
+            items=[{"productCode": 101, "quantity": 1}, {"productCode": 999, "quantity": 1}],
+        )
+
+        with self.assertRaises(HTTPException) as ctx:
+            self.service_module.create_order_batch_service(batch)
+
+        self.assertEqual(404, ctx.exception.status_code)
+        self.assertIn("999", ctx.exception.detail)
+        self.assertEqual([], self.service_module.get_orders_service(1))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import add_order, create_schema, reload_modules  # noqa: E402
+from src.events.dispatcher import OutboxDispatcher, parse_subscribers  # noqa: E402
+from src.events.outbox import (  # noqa: E402
+    OutboxSignal,
+    outbox_events,
+    outbox_metadata,
+    outbox_subscribers,
+    record_event,
+    record_events,
+)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    received: list = []
+    fail = False
+
+    def do_POST(self):  # noqa: N802 - assinatura exigida pelo BaseHTTPRequestHandler
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if WebhookHandler.fail:
+            self.send_error(500, "Falha simulada")
+            return
+        WebhookHandler.received.append((self.headers["X-Outbox-Subscriber"], json.loads(body)))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):  # noqa: A003 - método da stdlib
+        return
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, 12, 0)
+
+    def __call__(self):
+        return self.now
+
+
+class OutboxDispatcherTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), WebhookHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        host, port = cls.server.server_address
+        cls.url = f"http://{host}:{port}/events"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join(timeout=5)
+        cls.server.server_close()
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{Path(self._tmpdir.name) / 'orders.db'}")
+        outbox_metadata.create_all(bind=self.engine)
+        WebhookHandler.received = []
+        WebhookHandler.fail = False
+        self.clock = FakeClock()
+        self.dispatcher = OutboxDispatcher(
+            self.engine,
+            subscribers={"kitchen": self.url},
+            batch_size=2,
+            timeout=2,
+            base_delay=1,
+            max_delay=10,
+            retention=60,
+            signal=OutboxSignal(),
+            clock=self.clock,
+        )
+        self.dispatcher.ensure_subscribers()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _record(self, count):
+        with Session(self.engine) as session:
+            record_events(session, "order.created", [(n, {"orderNumber": n}) for n in range(1, count + 1)])
+            session.commit()
+
+    def _cursor(self):
+        with self.engine.connect() as connection:
+            return connection.scalar(select(outbox_subscribers.c.lastEventId))
+
+    def test_event_exists_only_if_the_transaction_commits(self):
+        with Session(self.engine) as session:
+            record_event(session, "order.created", 1, {"orderNumber": 1})
+            session.rollback()
+        with Session(self.engine) as session:
+            record_event(session, "order.created", 2, {"orderNumber": 2})
+            session.commit()
+
+        with self.engine.connect() as connection:
+            keys = connection.scalars(select(outbox_events.c.key)).all()
+        self.assertEqual(["2"], keys)
+
+    def test_delivers_batches_in_order_and_advances_cursor(self):
+        self._record(3)
+
+        # Um lote por assinante a cada ciclo.
+        self.assertEqual(2, self.dispatcher.run_once())
+        self.assertEqual(1, self.dispatcher.run_once())
+        self.assertEqual(0, self.dispatcher.run_once())
+
+        self.assertEqual(3, self._cursor())
+        batches = [[event["id"] for event in body["events"]] for _, body in WebhookHandler.received]
+        self.assertEqual([[1, 2], [3]], batches)
+        first = WebhookHandler.received[0][1]["events"][0]
+        self.assertEqual("kitchen", WebhookHandler.received[0][0])
+        self.assertEqual({"orderNumber": 1}, first["data"])
+        self.assertEqual("order.created", first["topic"])
+        self.assertEqual(0, self.dispatcher.stats()["subscribers"][0]["lag"])
+
+    def test_failed_batch_is_retried_after_backoff_without_skipping_events(self):
+        self._record(1)
+        WebhookHandler.fail = True
+
+        self.assertEqual(0, self.dispatcher.dispatch_once("kitchen"))
+        subscriber = self.dispatcher.stats()["subscribers"][0]
+        self.assertEqual(1, subscriber["attempts"])
+        self.assertEqual("HTTP 500", subscriber["lastError"])
+        self.assertEqual(1, subscriber["lag"])
+
+        # Ainda em backoff: nem tenta enviar.
+        WebhookHandler.fail = False
+        self.clock.now = subscriber["nextAttemptAt"] - timedelta(milliseconds=1)
+        self.assertEqual(0, self.dispatcher.dispatch_once("kitchen"))
+        self.assertEqual([], WebhookHandler.received)
+
+        self.clock.now = subscriber["nextAttemptAt"]
+        self.assertEqual(1, self.dispatcher.dispatch_once("kitchen"))
+        self.assertEqual(1, self._cursor())
+        self.assertEqual(0, self.dispatcher.stats()["subscribers"][0]["attempts"])
+
+    def test_lease_keeps_a_second_worker_away(self):
+        self._record(1)
+        other = OutboxDispatcher(
+            self.engine, subscribers={"kitchen": self.url}, signal=OutboxSignal(), clock=self.clock
+        )
+
+        self.assertIsNotNone(self.dispatcher._claim("kitchen"))
+        self.assertIsNone(other._claim("kitchen"))
+        self.clock.now += self.dispatcher.lease + timedelta(seconds=1)
+        self.assertIsNotNone(other._claim("kitchen"))
+
+    def test_purge_only_removes_delivered_events_past_retention(self):
+        self._record(3)
+        self.dispatcher.dispatch_once("kitchen")  # entrega 1 e 2
+        self.clock.now = datetime.now() + timedelta(minutes=5)
+
+        self.assertEqual(2, self.dispatcher.purge())
+        with self.engine.connect() as connection:
+            self.assertEqual([3], connection.scalars(select(outbox_events.c.id)).all())
+
+    def test_retention_runs_without_subscribers(self):
+        self._record(2)
+        self.clock.now = datetime.now() + timedelta(minutes=5)
+        dispatcher = OutboxDispatcher(
+            self.engine, subscribers={}, retention=60, purge_interval=0.01, signal=OutboxSignal(), clock=self.clock
+        )
+
+        dispatcher.start(deliver=True)
+        try:
+            self.assertEqual(["outbox-retention"], [thread.name for thread in dispatcher._threads])
+            deadline = time.monotonic() + 5
+            while self._count_events() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            dispatcher.stop()
+        self.assertEqual(0, self._count_events())
+
+    def _count_events(self):
+        with self.engine.connect() as connection:
+            return len(connection.scalars(select(outbox_events.c.id)).all())
+
+    def test_parses_subscribers_from_environment_format(self):
+        self.assertEqual(
+            {"kitchen": "http://kitchen/events", "stock": "http://stock/hook"},
+            parse_subscribers("kitchen=http://kitchen/events, stock=http://stock/hook,invalid"),
+        )
+
+
+class EventsEndpointTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        os.environ.setdefault("CONSUL_HTTP_ADDR", "http://127.0.0.1:59999")
+        modules = reload_modules(
+            f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}", "src.events.service", "src.events.controller"
+        )
+        cls.database_module = modules["src.orders.database"]
+        cls.orders_model = modules["src.orders.model"]
+        cls.orders_service = modules["src.orders.service"]
+        cls.events_controller = modules["src.events.controller"]
+        create_schema(cls.database_module.engine)
+
+        app = FastAPI()
+        app.include_router(cls.events_controller.router)
+        cls.client = TestClient(app)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.database_module.engine.dispose()
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        with self.database_module.SessionLocal() as session:
+            for table in ("orders", "table_summaries", "outbox_events"):
+                session.execute(text(f"DELETE FROM {table}"))
+            session.commit()
+
+    def _add_order(self, order_number, table_number=4):
+        request = self.orders_model.OrderRequest(productCode=101, tableNumber=table_number, quantity=2)
+        return add_order(request, order_number, "Café", 100, 10.0)
+
+    def test_order_write_records_created_event(self):
+        created = self._add_order(7)
+
+        response = self.client.get("/events/", params={"wait": 0})
+
+        self.assertEqual(200, response.status_code)
+        page = response.json()
+        self.assertEqual(1, len(page["events"]))
+        event = page["events"][0]
+        self.assertEqual(event["id"], page["lastEventId"])
+        self.assertEqual(("order.created", "7"), (event["topic"], event["key"]))
+        self.assertEqual(4, event["data"]["tableNumber"])
+        self.assertEqual(created.id, event["data"]["items"][0]["id"])
+        self.assertEqual(20.0, event["data"]["items"][0]["lineTotal"])
+
+    def test_long_poll_returns_empty_page_with_cursor_after_timeout(self):
+        response = self.client.get("/events/", params={"after": 5, "wait": 0})
+
+        self.assertEqual({"events": [], "lastEventId": 5}, response.json())
+
+    def test_long_poll_wakes_up_on_commit(self):
+        timer = threading.Timer(0.2, self._add_order, args=(8,))
+        timer.start()
+        started = time.monotonic()
+
+        response = self.client.get("/events/", params={"wait": 10})
+
+        timer.join()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(["8"], [event["key"] for event in response.json()["events"]])
+
+    def test_long_poll_filters_by_topic_and_cursor(self):
+        self._add_order(1)
+        self._add_order(2)
+        first = self.client.get("/events/", params={"wait": 0, "limit": 1}).json()
+
+        rest = self.client.get("/events/", params={"wait": 0, "after": first["lastEventId"]}).json()
+        other = self.client.get("/events/", params={"wait": 0, "topic": "payment.created"}).json()
+
+        self.assertEqual(["1"], [event["key"] for event in first["events"]])
+        self.assertEqual(["2"], [event["key"] for event in rest["events"]])
+        self.assertEqual([], other["events"])
+
+    def test_stream_resumes_from_last_event_id(self):
+        self._add_order(1)
+        self._add_order(2)
+        first_id = self.client.get("/events/", params={"wait": 0, "limit": 1}).json()["lastEventId"]
+
+        # O stream não termina: consome os primeiros blocos direto do gerador.
+        async def read_stream():
+            response = await self.events_controller.stream_events(after=0, topic=None, last_event_id=first_id)
+            chunks = []
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+                if b"data: " in chunk:
+                    break
+            await response.body_iterator.aclose()
+            return response, b"".join(chunks).decode()
+
+        response, body = asyncio.run(read_stream())
+
+        self.assertEqual("text/event-stream", response.media_type)
+        lines = body.splitlines()
+        self.assertEqual("retry: 2000", lines[0])
+        self.assertIn(f"id: {first_id + 1}", lines)
+        self.assertIn("event: order.created", lines)
+        data = [line for line in lines if line.startswith("data: ")]
+        self.assertEqual(["2"], [json.loads(line[len("data: "):])["key"] for line in data])
+        self.assertEqual(0, self.events_controller._open_streams)
+
+    def test_stream_closed_before_first_read_does_not_hold_a_slot(self):
+        async def open_and_drop():
+            response = await self.events_controller.stream_events(after=0, topic=None, last_event_id=None)
+            await response.body_iterator.aclose()
+
+        asyncio.run(open_and_drop())
+
+        self.assertEqual(0, self.events_controller._open_streams)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import insert, text
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import create_schema, reload_modules  # noqa: E402
+
+
+class PaymentServiceTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        modules = reload_modules(f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}")
+        cls.database_module = modules["src.orders.database"]
+        cls.model_module = modules["src.payments.model"]
+        cls.service_module = modules["src.payments.service"]
+        create_schema(cls.database_module.engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.database_module.engine.dispose()
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        with self.database_module.SessionLocal() as session:
+            session.execute(text("DELETE FROM payments"))
+            session.commit()
+
+    def _seed(self, count, created_at=None):
+        base = datetime(2026, 1, 1, 12, 0)
+        methods = ["PIX", "CASH"]
+        rows = [
+            {
+                "orderNumber": i + 1,
+                "amount": 10.0 + i,
+                "paymentMethod": methods[i % 2],
+                "status": "COMPLETED" if i % 3 else "PENDING",
+                "createdAt": created_at or base + timedelta(minutes=i),
+            }
+            for i in range(count)
+        ]
+        with self.database_module.SessionLocal() as session:
+            session.execute(insert(self.model_module.PaymentModel), rows)
+            session.commit()
+
+    def _all_pages(self, filters, limit):
+        pages, cursor = [], None
+        while True:
+            page = self.service_module.list_all_payments_service(filters, limit, cursor)
+            pages.append(page)
+            cursor = page.nextCursor
+            if cursor is None:
+                return pages
+
+    def test_walks_pages_newest_first_without_gaps(self):
+        # Todos com o mesmo createdAt: o desempate pelo id mantém a ordem estável.
+        self._seed(7, created_at=datetime(2026, 1, 1))
+
+        pages = self._all_pages(self.model_module.PaymentFilter(), limit=3)
+
+        self.assertEqual([3, 3, 1], [len(page.items) for page in pages])
+        ids = [item.id for page in pages for item in page.items]
+        self.assertEqual(sorted(ids, reverse=True), ids)
+        self.assertEqual(7, len(set(ids)))
+
+    def test_filters_by_status_method_and_date(self):
+        self._seed(12)
+        filters = self.model_module.PaymentFilter(
+            status="completed",
+            paymentMethod="pix",
+            createdFrom=datetime(2026, 1, 1, 12, 2),
+            createdTo=datetime(2026, 1, 1, 12, 10),
+        )
+
+        items = [item for page in self._all_pages(filters, limit=2) for item in page.items]
+
+        self.assertEqual([9, 5, 3], [item.orderNumber for item in items])
+
+    def test_rejects_malformed_cursor(self):
+        with self.assertRaises(HTTPException) as ctx:
+            self.service_module.list_all_payments_service(self.model_module.PaymentFilter(), 10, "nao-e-cursor")
+
+        self.assertEqual(400, ctx.exception.status_code)
+
+    def test_second_active_payment_for_order_is_rejected_by_index(self):
+        request = self.model_module.PaymentRequest(orderNumber=42, amount=10.0, paymentMethod="pix")
+        created = self.service_module.create_payment_service(request)
+
+        with self.assertRaises(HTTPException) as ctx:
+            self.service_module.create_payment_service(request)
+        self.assertEqual(409, ctx.exception.status_code)
+
+        # Depois de cancelado, o pedido aceita um novo pagamento.
+        self.service_module.update_payment_status_service(
+            created.id, self.model_module.PaymentUpdateRequest(status="CANCELLED")
+        )
+        self.service_module.create_payment_service(request)
+
+    def _update(self, payment_id, status, transaction_id=None):
+        return self.service_module.update_payment_status_service(
+            payment_id, self.model_module.PaymentUpdateRequest(status=status, transactionId=transaction_id)
+        )
+
+    def test_status_transitions_follow_the_state_machine(self):
+        request = self.model_module.PaymentRequest(orderNumber=42, amount=10.0, paymentMethod="pix")
+        created = self.service_module.create_payment_service(request)
+
+        self.assertEqual("PROCESSING", self._update(created.id, "PROCESSING", "tx-1").status)
+        completed = self._update(created.id, "COMPLETED")
+        self.assertEqual(("COMPLETED", "tx-1"), (completed.status, completed.transactionId))
+
+        # Callback repetido: devolve o pagamento sem alterá-lo.
+        self.assertEqual(completed, self._update(created.id, "COMPLETED"))
+
+        with self.assertRaises(HTTPException) as ctx:
+            self._update(created.id, "PENDING")
+        self.assertEqual(409, ctx.exception.status_code)
+        with self.assertRaises(HTTPException) as ctx:
+            self._update(999, "COMPLETED")
+        self.assertEqual(404, ctx.exception.status_code)
+
+    def test_concurrent_callbacks_apply_a_single_transition(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        request = self.model_module.PaymentRequest(orderNumber=42, amount=10.0, paymentMethod="pix")
+        created = self.service_module.create_payment_service(request)
+
+        def apply(status):
+            try:
+                return self._update(created.id, status).status
+            except HTTPException as exc:
+                return exc.status_code
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            outcomes = list(pool.map(apply, ["COMPLETED", "FAILED"]))
+
+        self.assertEqual(1, outcomes.count(409))
+        final = self.service_module.get_payment_by_id_service(created.id).status
+        self.assertIn(final, outcomes)
+
+    def test_bulk_status_update_reports_each_payment(self):
+        self._seed(4)  # ids 1 e 4 PENDING, 2 e 3 COMPLETED
+        bulk = self.model_module.PaymentBulkStatusRequest(updates=[
+            {"id": 1, "status": "completed", "transactionId": "tx-1"},
+            {"id": 2, "status": "COMPLETED"},
+            {"id": 3, "status": "CANCELLED"},
+            {"id": 4, "status": "FAILED"},
+            {"id": 99, "status": "COMPLETED"},
+        ])
+
+        result = self.service_module.bulk_update_payment_status_service(bulk)
+
+        self.assertEqual([1, 4], result.updated)
+        self.assertEqual([2], result.unchanged)
+        self.assertEqual([(3, "COMPLETED", "CANCELLED")], [
+            (r.id, r.currentStatus, r.requestedStatus) for r in result.rejected
+        ])
+        self.assertEqual([99], result.notFound)
+        first = self.service_module.get_payment_by_id_service(1)
+        self.assertEqual(("COMPLETED", "tx-1"), (first.status, first.transactionId))
+
+    def test_json_page_matches_model_page(self):
+        self._seed(7)
+        filters = self.model_module.PaymentFilter()
+
+        model_page = self.service_module.list_all_payments_service(filters, 3)
+        json_page = self.service_module.list_all_payments_json_service(filters, 3)
+        self.assertEqual(model_page.model_dump_json().encode(), json_page)
+
+        cursor = model_page.nextCursor
+        self.assertEqual(
+            self.service_module.list_all_payments_service(filters, 3, cursor).model_dump_json().encode(),
+            self.service_module.list_all_payments_json_service(filters, 3, cursor),
+        )
+
+    def test_json_payments_by_order_match_models(self):
+        self._seed(3)
+
+        expected = [payment.model_dump(mode="json") for payment in self.service_module.get_payments_by_order_service(2)]
+        self.assertEqual(expected, json.loads(self.service_module.get_payments_by_order_json_service(2)))
+
+    def test_exports_ndjson_in_batches(self):
+        self._seed(5)
+        self.service_module.EXPORT_BATCH_SIZE = 2
+        try:
+            chunks = list(self.service_module.export_payments_service(self.model_module.PaymentFilter()))
+        finally:
+            self.service_module.EXPORT_BATCH_SIZE = 1000
+
+        self.assertEqual(3, len(chunks))
+        lines = b"".join(chunks).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([5, 4, 3, 2, 1], [record["orderNumber"] for record in records])
+        self.assertEqual("2026-01-01T12:04:00", records[0]["createdAt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
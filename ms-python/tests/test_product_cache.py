@@ -0,0 +1,77 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.product_cache import NOT_FOUND, CacheState, ProductCache  # noqa: E402
+from src.orders.product_client import ProductGatewayClient  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProductCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ProductCache(max_entries=2, ttl=10, negative_ttl=1, stale_ttl=5, clock=self.clock)
+
+    def test_evicts_least_recently_used_entry(self):
+        self.cache.store(1, {"codigoProduto": 1})
+        self.cache.store(2, {"codigoProduto": 2})
+        self.cache.lookup(1)
+        self.cache.store(3, {"codigoProduto": 3})
+
+        self.assertEqual(CacheState.MISS, self.cache.lookup(2)[0])
+        self.assertEqual(CacheState.FRESH, self.cache.lookup(1)[0])
+        self.assertEqual(1, self.cache.stats()["evictions"])
+
+    def test_entry_goes_stale_then_expires(self):
+        self.cache.store(1, {"codigoProduto": 1})
+
+        self.clock.now += 11
+        self.assertEqual(CacheState.STALE, self.cache.lookup(1)[0])
+        self.clock.now += 5
+        self.assertEqual(CacheState.MISS, self.cache.lookup(1)[0])
+
+    def test_negative_entries_are_never_served_stale(self):
+        self.cache.store_missing(1)
+        self.assertEqual((CacheState.FRESH, NOT_FOUND), self.cache.lookup(1))
+
+        self.clock.now += 1
+        self.assertEqual(CacheState.MISS, self.cache.lookup(1)[0])
+
+
+class StaleWhileRevalidateTests(unittest.TestCase):
+    def test_returns_stale_product_and_refreshes_in_background(self):
+        clock = FakeClock()
+        cache = ProductCache(max_entries=10, ttl=10, negative_ttl=1, stale_ttl=60, clock=clock)
+        client = ProductGatewayClient(fallback_base_url="http://127.0.0.1:1", cache=cache)
+        calls = []
+
+        def fetch(product_code):
+            calls.append(product_code)
+            return {"codigoProduto": product_code, "preco": len(calls)}
+
+        client._fetch_product = fetch
+        self.assertEqual(1, client.get_product_by_code(7)["preco"])
+
+        clock.now += 30
+        self.assertEqual(1, client.get_product_by_code(7)["preco"])
+
+        deadline = time.monotonic() + 2
+        while cache.lookup(7)[0] is not CacheState.FRESH and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(2, client.get_product_by_code(7)["preco"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import add_order, create_schema, reload_modules  # noqa: E402
+from src.response_cache import ENTRY_OVERHEAD, ResponseCache, etag_matches, response_cache  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used_entries_past_the_byte_bound(self):
+        cache = ResponseCache(max_bytes=2 * (10 + ENTRY_OVERHEAD), ttl=0)
+        cache.put(("order", 1), b"0123456789", cache.version(("order", 1)))
+        cache.put(("order", 2), b"0123456789", cache.version(("order", 2)))
+        cache.get(("order", 1))
+        cache.put(("order", 3), b"0123456789", cache.version(("order", 3)))
+
+        self.assertIsNone(cache.get(("order", 2)))
+        self.assertIsNotNone(cache.get(("order", 1)))
+        self.assertEqual(1, cache.stats()["evictions"])
+        self.assertLessEqual(cache.stats()["bytes"], cache.max_bytes)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = ResponseCache(max_bytes=10_000, ttl=5, clock=clock)
+        cache.put(("order", 1), b"[]", cache.version(("order", 1)))
+
+        clock.now += 4
+        self.assertIsNotNone(cache.get(("order", 1)))
+        clock.now += 1
+        self.assertIsNone(cache.get(("order", 1)))
+
+    def test_discards_result_read_before_an_invalidation(self):
+        cache = ResponseCache(max_bytes=10_000, ttl=0)
+        version = cache.version(("order", 1))
+        cache.invalidate(("order", 1))  # escrita concluída durante a leitura
+
+        entry = cache.put(("order", 1), b"[]", version)
+
+        self.assertEqual(b"[]", entry.body)
+        self.assertIsNone(cache.get(("order", 1)))
+
+    def test_writes_to_other_keys_keep_loads_and_coalescing(self):
+        cache = ResponseCache(max_bytes=10_000, ttl=0)
+        version = cache.version(("order", 1))
+        cache.invalidate(("order", 2))
+        cache.invalidate(("payments", 1))
+
+        self.assertEqual(version, cache.version(("order", 1)))
+        cache.put(("order", 1), b"[]", version)
+        self.assertIsNotNone(cache.get(("order", 1)))
+
+        cache.clear()
+        self.assertNotEqual(version, cache.version(("order", 1)))
+
+    def test_forgotten_versions_still_discard_stale_loads(self):
+        cache = ResponseCache(max_bytes=10_000, ttl=0)
+        with mock.patch("src.response_cache.MAX_TRACKED_VERSIONS", 2):
+            version = cache.version(("order", 1))
+            cache.invalidate(("order", 1))  # escrita concluída durante a leitura
+            cache.invalidate(("order", 2))
+            cache.invalidate(("order", 3))  # a versão do pedido 1 é esquecida
+
+            self.assertEqual(2, len(cache._versions))
+            cache.put(("order", 1), b"[]", version)
+        self.assertIsNone(cache.get(("order", 1)))
+
+    def test_etag_matching(self):
+        etag = '"abc"'
+        self.assertTrue(etag_matches('"abc"', etag))
+        self.assertTrue(etag_matches('W/"abc"', etag))
+        self.assertTrue(etag_matches('"x", "abc"', etag))
+        self.assertTrue(etag_matches('*', etag))
+        self.assertFalse(etag_matches('"abd"', etag))
+        self.assertFalse(etag_matches(None, etag))
+
+    def test_reports_hit_ratio(self):
+        cache = ResponseCache(max_bytes=10_000, ttl=0)
+        cache.get(("order", 1))
+        cache.put(("order", 1), b"[]", cache.version(("order", 1)))
+        cache.get(("order", 1))
+        cache.get(("order", 1))
+
+        stats = cache.stats()
+        self.assertEqual(2, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+        self.assertAlmostEqual(0.6667, stats["hitRatio"])
+
+
+class CachedEndpointsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        os.environ.setdefault("CONSUL_HTTP_ADDR", "http://127.0.0.1:59999")
+        modules = reload_modules(
+            f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}", "src.orders.controller", "src.payments.controller"
+        )
+        cls.database_module = modules["src.orders.database"]
+        cls.orders_model = modules["src.orders.model"]
+        cls.payments_model = modules["src.payments.model"]
+        cls.orders_service = modules["src.orders.service"]
+        orders_controller = modules["src.orders.controller"]
+        payments_controller = modules["src.payments.controller"]
+        create_schema(cls.database_module.engine)
+
+        app = FastAPI()
+        app.include_router(orders_controller.router)
+        app.include_router(payments_controller.router)
+        cls.client = TestClient(app)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.database_module.engine.dispose()
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        with self.database_module.SessionLocal() as session:
+            session.execute(text("DELETE FROM orders"))
+            session.execute(text("DELETE FROM payments"))
+            session.commit()
+        response_cache.clear()
+
+    def _add_order(self, order_number):
+        request = self.orders_model.OrderRequest(productCode=101, tableNumber=4, quantity=2)
+        add_order(request, order_number, "Café", 100)
+
+    def test_poll_gets_not_modified_until_an_order_is_written(self):
+        first = self.client.get("/order/7")
+        self.assertEqual(200, first.status_code)
+        self.assertEqual([], first.json())
+        etag = first.headers["etag"]
+
+        hits_before = response_cache.stats()["hits"]
+        second = self.client.get("/order/7", headers={"If-None-Match": etag})
+        self.assertEqual(304, second.status_code)
+        self.assertEqual(b"", second.content)
+        self.assertEqual(hits_before + 1, response_cache.stats()["hits"])
+
+        self._add_order(7)
+
+        third = self.client.get("/order/7", headers={"If-None-Match": etag})
+        self.assertEqual(200, third.status_code)
+        self.assertNotEqual(etag, third.headers["etag"])
+        self.assertEqual([7], [order["orderNumber"] for order in third.json()])
+        self.assertEqual("Café", third.json()[0]["description"])
+
+    def test_payment_writes_invalidate_order_payments(self):
+        created = self.client.post("/payment/", json={"orderNumber": 3, "amount": 20.0, "paymentMethod": "pix"})
+        self.assertEqual(201, created.status_code)
+
+        first = self.client.get("/payment/order/3")
+        self.assertEqual("PENDING", first.json()[0]["status"])
+
+        updated = self.client.put(
+            f"/payment/{created.json()['id']}/status",
+            json={"status": "COMPLETED", "transactionId": "tx-1"},
+        )
+        self.assertEqual(200, updated.status_code)
+
+        second = self.client.get("/payment/order/3", headers={"If-None-Match": first.headers["etag"]})
+        self.assertEqual(200, second.status_code)
+        self.assertEqual("COMPLETED", second.json()[0]["status"])
+        self.assertEqual(1, response_cache.stats()["invalidations"])
+
+
+if __name__ == "__main__":
+    unittest.main()
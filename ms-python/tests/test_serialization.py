@@ -0,0 +1,43 @@
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import serialization  # noqa: E402
+from src.payments.model import PaymentResponse  # noqa: E402
+
+
+class SerializationTests(unittest.TestCase):
+    def setUp(self):
+        self.record = {
+            "id": 1,
+            "orderNumber": 7,
+            "amount": 149.8,
+            "paymentMethod": "PIX",
+            "status": "PENDING",
+            "transactionId": None,
+            "createdAt": datetime(2026, 1, 1, 12, 30, 5, 120000),
+            "updatedAt": None,
+        }
+
+    def test_matches_pydantic_output(self):
+        expected = PaymentResponse(**self.record).model_dump_json().encode()
+
+        self.assertEqual(expected, serialization.dumps(self.record))
+
+    def test_stdlib_fallback_produces_same_bytes(self):
+        fast = serialization.dumps([self.record, {"descricao": "Café"}])
+
+        with mock.patch.object(serialization, "orjson", None):
+            fallback = serialization.dumps([self.record, {"descricao": "Café"}])
+
+        self.assertEqual(fast, fallback)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.orders.discovery import ServiceInstanceCache  # noqa: E402
+from src.orders.product_cache import ProductCache  # noqa: E402
+from src.orders.product_client import AsyncProductGatewayClient, ProductGatewayClient  # noqa: E402
+from src.response_cache import ResponseCache  # noqa: E402
+from src.singleflight import SingleFlight  # noqa: E402
+
+PRODUCT = {"codigoProduto": 101, "descricao": "Café especial em grãos 1kg", "codGruEst": 100}
+
+
+def start_slow_catalog(counter):
+    """Catálogo que demora 100 ms por consulta e conta as chamadas em ``counter``."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802 - assinatura definida pela stdlib
+            counter.append(self.path)
+            time.sleep(0.1)
+            body = json.dumps(PRODUCT).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # noqa: A003 - método da stdlib
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SingleFlightTests(unittest.TestCase):
+    def _wait_in_flight(self, flight, count=1):
+        deadline = time.monotonic() + 5
+        while flight.stats()["inFlight"] < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+        executions = []
+
+        def slow():
+            executions.append(1)
+            release.wait(5)
+            return {"value": 42}
+
+        with ThreadPoolExecutor(8) as pool:
+            leader = pool.submit(flight.do, "k", slow)
+            self._wait_in_flight(flight)
+            followers = [pool.submit(flight.do, "k", slow) for _ in range(7)]
+            deadline = time.monotonic() + 5
+            while flight.coalesced < 7 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+            results = [leader.result(5)] + [future.result(5) for future in followers]
+
+        self.assertEqual(1, len(executions))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual({"calls": 8, "coalesced": 7, "inFlight": 0}, flight.stats())
+        # Terminada a consulta, a próxima chamada executa de novo.
+        self.assertEqual({"value": 42}, flight.do("k", slow))
+        self.assertEqual(2, len(executions))
+
+    def test_error_reaches_every_waiting_caller(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise ValueError("Produto não encontrado")
+
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(flight.do, "k", failing)]
+            self._wait_in_flight(flight)
+            futures += [pool.submit(flight.do, "k", failing) for _ in range(3)]
+            deadline = time.monotonic() + 5
+            while flight.coalesced < 3 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+            errors = [future.exception(5) for future in futures]
+
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual(0, flight.stats()["inFlight"])
+
+    def test_distinct_keys_run_independently(self):
+        flight = SingleFlight("test")
+        barrier = threading.Barrier(2, timeout=5)
+
+        def both_running(value):
+            barrier.wait()  # só passa se as duas chaves executarem ao mesmo tempo
+            return value
+
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(lambda key: flight.do(key, lambda: both_running(key)), ["a", "b"]))
+
+        self.assertEqual(["a", "b"], results)
+        self.assertEqual(0, flight.coalesced)
+
+    def test_async_callers_share_one_execution_and_errors(self):
+        flight = SingleFlight("test")
+        executions = []
+
+        async def lookup(fail):
+            executions.append(fail)
+            await asyncio.sleep(0.01)
+            if fail:
+                raise ValueError("falhou")
+            return 7
+
+        async def main():
+            ok = await asyncio.gather(*(flight.do_async("ok", lambda: lookup(False)) for _ in range(5)))
+            failed = await asyncio.gather(
+                *(flight.do_async("bad", lambda: lookup(True)) for _ in range(3)), return_exceptions=True
+            )
+            return ok, failed
+
+        ok, failed = asyncio.run(main())
+
+        self.assertEqual([7] * 5, ok)
+        self.assertTrue(all(isinstance(error, ValueError) for error in failed))
+        self.assertEqual([False, True], executions)
+        self.assertEqual({"calls": 8, "coalesced": 6, "inFlight": 0}, flight.stats())
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight("test")
+
+        async def lookup():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        async def main():
+            leader = asyncio.ensure_future(flight.do_async("k", lookup))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do_async("k", lookup))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual("ok", asyncio.run(main()))
+
+
+class CoalescedLookupTests(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.server = start_slow_catalog(self.requests)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _client(self, cls):
+        url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        discovery = ServiceInstanceCache(consul_addr="http://127.0.0.1:9", fallback_base_url=url, watch=False)
+        discovery.fail("sem Consul nos testes")
+        return cls(discovery=discovery, cache=ProductCache(), hedge_delay=None)
+
+    def test_sync_lookups_of_same_product_make_one_call(self):
+        client = self._client(ProductGatewayClient)
+
+        with ThreadPoolExecutor(10) as pool:
+            products = list(pool.map(lambda _: client.get_product_by_code(101), range(10)))
+
+        self.assertEqual(["/ms-kotlin/produto/codigo/101"], self.requests)
+        self.assertEqual([PRODUCT] * 10, products)
+        products[0]["descricao"] = "alterado"  # cada chamador recebe a própria cópia
+        self.assertEqual(PRODUCT["descricao"], products[1]["descricao"])
+
+    def test_async_lookups_of_same_product_make_one_call(self):
+        client = self._client(AsyncProductGatewayClient)
+
+        async def main():
+            try:
+                return await asyncio.gather(*(client.get_product_by_code(101) for _ in range(10)))
+            finally:
+                await client.aclose()
+
+        self.assertEqual([PRODUCT] * 10, asyncio.run(main()))
+        self.assertEqual(["/ms-kotlin/produto/codigo/101"], self.requests)
+
+
+class CoalescedResponseLoadTests(unittest.TestCase):
+    def test_invalidation_starts_a_new_load(self):
+        cache = ResponseCache(max_bytes=1024, ttl=0)
+        release = threading.Event()
+        queries = []
+
+        def query(body):
+            def run():
+                queries.append(body)
+                release.wait(5)
+                return body
+            return run
+
+        with ThreadPoolExecutor(3) as pool:
+            before = pool.submit(cache.load, ("order", 1), query(b"[1]"))
+            while cache.loads.stats()["inFlight"] < 1:
+                time.sleep(0.001)
+            joined = pool.submit(cache.load, ("order", 1), query(b"[ignored]"))
+            while cache.loads.coalesced < 1:
+                time.sleep(0.001)
+            cache.invalidate(("order", 1))
+            after = pool.submit(cache.load, ("order", 1), query(b"[1,2]"))
+            while cache.loads.stats()["inFlight"] < 2:
+                time.sleep(0.001)
+            release.set()
+
+            self.assertEqual(b"[1]", before.result(5).body)
+            self.assertEqual(b"[1]", joined.result(5).body)
+            self.assertEqual(b"[1,2]", after.result(5).body)
+        self.assertEqual([b"[1]", b"[1,2]"], queries)
+        self.assertEqual(b"[1,2]", cache.get(("order", 1)).body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.startup import StartupTasks  # noqa: E402
+
+
+class StartupTasksTests(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_failed_task_until_it_succeeds(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OSError("database is locked")
+
+        tasks = StartupTasks(base_delay=0.001)
+        tasks.add("database", flaky)
+
+        self.assertTrue(await tasks.wait_ready(timeout=2))
+        check = tasks.snapshot()["checks"]["database"]
+        self.assertEqual(("done", 3, None), (check["status"], check["attempts"], check["error"]))
+        self.assertEqual("UP", tasks.snapshot()["status"])
+
+    async def test_dependent_task_waits_for_its_requirements(self):
+        order = []
+        gate = threading.Event()
+
+        def migrate():
+            gate.wait(2)
+            order.append("database")
+
+        tasks = StartupTasks()
+        tasks.add("database", migrate)
+        tasks.add("catalog", lambda: order.append("catalog"), required=False, requires=("database",))
+
+        await asyncio.sleep(0.05)
+        self.assertEqual([], order)
+        self.assertFalse(tasks.ready)
+        gate.set()
+        await tasks.wait_ready(timeout=2)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(["database", "catalog"], order)
+
+    async def test_optional_task_that_gives_up_does_not_affect_readiness(self):
+        def broken():
+            raise RuntimeError("catálogo indisponível")
+
+        tasks = StartupTasks(base_delay=0.001)
+        tasks.add("database", lambda: None)
+        tasks.add("catalog", broken, required=False, max_attempts=2)
+        await tasks.wait_ready(timeout=2)
+        await asyncio.sleep(0.05)
+
+        snapshot = tasks.snapshot()
+        self.assertEqual("UP", snapshot["status"])
+        self.assertEqual("failed", snapshot["checks"]["catalog"]["status"])
+        self.assertEqual(2, snapshot["checks"]["catalog"]["attempts"])
+
+    async def test_cancel_stops_pending_retries(self):
+        def broken():
+            raise RuntimeError("Consul fora do ar")
+
+        tasks = StartupTasks(base_delay=10)
+        tasks.add("consul", broken, required=False)
+        await asyncio.sleep(0.05)
+
+        await tasks.cancel()
+
+        self.assertEqual(1, tasks.snapshot()["checks"]["consul"]["attempts"])
+
+
+if __name__ == "__main__":
+    unittest.main()
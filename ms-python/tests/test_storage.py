@@ -0,0 +1,297 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy import insert, select, text
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import add_order, create_schema, reload_modules  # noqa: E402
+
+STORAGE_ENV = ("DATABASE_REPLICA_URL", "PAYMENTS_DATABASE_URL", "PAYMENTS_DATABASE_REPLICA_URL", "DATABASE_REPLICA_STICKY")
+
+
+class ReplicaRoutingTests(unittest.TestCase):
+    """Pedidos e pagamentos em arquivos SQLite separados, cada um com uma "réplica" própria.
+
+    As réplicas não recebem nada dos primários: o que o serviço devolve mostra
+    de qual banco a leitura veio.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        base = Path(cls._tmpdir.name)
+        cls.urls = {
+            "orders": f"sqlite:///{base / 'orders.db'}",
+            "orders_replica": f"sqlite:///{base / 'orders-replica.db'}",
+            "payments": f"sqlite:///{base / 'payments.db'}",
+            "payments_replica": f"sqlite:///{base / 'payments-replica.db'}",
+        }
+        os.environ["DATABASE_REPLICA_URL"] = cls.urls["orders_replica"]
+        os.environ["PAYMENTS_DATABASE_URL"] = cls.urls["payments"]
+        os.environ["PAYMENTS_DATABASE_REPLICA_URL"] = cls.urls["payments_replica"]
+        os.environ["DATABASE_REPLICA_STICKY"] = "0"
+
+        modules = reload_modules(cls.urls["orders"])
+        cls.database_module = modules["src.orders.database"]
+        cls.orders_model = modules["src.orders.model"]
+        cls.payments_model = modules["src.payments.model"]
+        cls.storage_module = modules["src.storage"]
+        cls.orders_service = modules["src.orders.service"]
+        cls.payments_service = modules["src.payments.service"]
+        cls.storage = cls.storage_module.storage
+        for engine in cls.storage.engines().values():
+            create_schema(engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        for name in STORAGE_ENV:
+            os.environ.pop(name, None)
+        for engine in cls.storage.engines().values():
+            engine.dispose()
+        asyncio.run(cls.storage.dispose())
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        for engine in self.storage.engines().values():
+            with engine.begin() as connection:
+                for table in ("orders", "payments", "table_summaries", "outbox_events"):
+                    connection.execute(text(f"DELETE FROM {table}"))
+        # Os commits dos testes rodam no mesmo contexto: começa cada um sem marcas.
+        self.storage._primary_until.set(0.0)
+        self.storage._written.clear()
+
+    def _count(self, label, table):
+        with self.storage.engines()[label].connect() as connection:
+            return connection.scalar(text(f"SELECT COUNT(*) FROM {table}"))
+
+    def _create_order(self, order_number, table_number=3):
+        request = self.orders_model.OrderRequest(productCode=101, tableNumber=table_number, quantity=2)
+        return add_order(request, order_number, "Suco", 10, 7.5)
+
+    def _order_row(self, order_number):
+        return {
+            "orderNumber": order_number,
+            "tableNumber": 3,
+            "quantity": 1,
+            "description": "Da réplica",
+            "codGruEst": 10,
+            "productCode": 101,
+            "unitPrice": 7.5,
+            "lineTotal": 7.5,
+        }
+
+    def test_each_domain_has_its_own_engines(self):
+        engines = self.storage.engines()
+        self.assertEqual(["orders", "orders_replica", "payments", "payments_replica"], list(engines))
+        self.assertEqual(2, len(self.storage.primary_engines()))
+
+    def test_order_writes_go_to_orders_primary_and_reads_to_replica(self):
+        self._create_order(1)
+        self.assertEqual(1, self._count("orders", "orders"))
+        self.assertEqual(0, self._count("orders_replica", "orders"))
+        self.assertEqual([], self.orders_service.get_orders_service(1))
+
+        with self.storage.engines()["orders_replica"].begin() as connection:
+            connection.execute(insert(self.orders_model.OrderModel), [self._order_row(1)])
+        orders = self.orders_service.get_orders_service(1)
+        self.assertEqual(["Da réplica"], [order.description for order in orders])
+        self.assertEqual("Da réplica", json.loads(self.orders_service.get_orders_json_service(1))[0]["description"])
+
+    def test_async_reads_use_replica(self):
+        self._create_order(1)
+        self.assertEqual(b"[]", asyncio.run(self.orders_service.get_orders_json_service_async(1)))
+
+    def test_payments_written_to_payments_primary_with_summary_in_orders(self):
+        self._create_order(1)
+        payment = self.payments_service.create_payment_service(
+            self.payments_model.PaymentRequest(orderNumber=1, amount=15.0, paymentMethod="PIX")
+        )
+
+        self.assertEqual(1, self._count("payments", "payments"))
+        self.assertEqual(0, self._count("orders", "payments"))
+        self.assertEqual(0, self._count("payments_replica", "payments"))
+        with self.storage.engines()["orders"].connect() as connection:
+            pending = connection.scalar(text("SELECT pendingAmount FROM table_summaries WHERE tableNumber = 3"))
+            topics = connection.scalars(text("SELECT topic FROM outbox_events ORDER BY id")).all()
+        self.assertEqual(15.0, pending)
+        self.assertEqual(["order.created", "payment.created"], topics)
+
+        filters = self.payments_model.PaymentFilter()
+        self.assertEqual([], self.payments_service.list_all_payments_service(filters).items)
+        self.assertEqual(b"[]", self.payments_service.get_payments_by_order_json_service(1))
+        with self.storage.engines()["payments_replica"].begin() as connection:
+            connection.execute(insert(self.payments_model.PaymentModel).values(
+                orderNumber=1, amount=15.0, paymentMethod="PIX", status="PENDING", createdAt=datetime(2026, 1, 1),
+            ))
+        page = self.payments_service.list_all_payments_service(filters)
+        self.assertEqual([1], [item.orderNumber for item in page.items])
+        self.assertEqual(1, len(json.loads(self.payments_service.list_all_payments_json_service(filters))["items"]))
+
+        # O UPDATE de status vai ao primário, onde o pagamento existe.
+        updated = self.payments_service.update_payment_status_service(
+            payment.id, self.payments_model.PaymentUpdateRequest(status="COMPLETED")
+        )
+        self.assertEqual("COMPLETED", updated.status)
+
+    def test_archive_across_databases_finishes_after_a_failure_between_commits(self):
+        archive = importlib.import_module("src.archive")
+        self._create_order(1)
+        payment = self.payments_service.create_payment_service(
+            self.payments_model.PaymentRequest(orderNumber=1, amount=15.0, paymentMethod="PIX")
+        )
+        self.payments_service.update_payment_status_service(
+            payment.id, self.payments_model.PaymentUpdateRequest(status="COMPLETED")
+        )
+        real_delete = archive.delete
+
+        def fail_on_payments(table):
+            if table is archive.payments_table:
+                raise RuntimeError("queda entre os commits")
+            return real_delete(table)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = archive.ArchiveStore(tmpdir)
+            later = datetime.now() + timedelta(days=365)
+            with mock.patch.object(archive, "delete", side_effect=fail_on_payments):
+                with self.assertRaises(RuntimeError):
+                    archive.archive_closed_orders(timedelta(days=1), store=store, now=later)
+
+            # Itens já arquivados; o pagamento continua quente e o pedido, fechado.
+            self.assertEqual((0, 1), (self._count("orders", "orders"), self._count("payments", "payments")))
+            self.assertEqual(1, self._count("orders", "archived_orders"))
+
+            # O commit do job fixa a leitura do índice no primário (a réplica não recebe nada).
+            with mock.patch.object(self.storage, "sticky", 60):
+                self.assertEqual(1, archive.archive_closed_orders(timedelta(days=1), store=store, now=later))
+                record = archive.find_archived_order(1, store)
+            self.assertEqual(0, self._count("payments", "payments"))
+            self.assertEqual(([2], [payment.id]), (
+                [item["quantity"] for item in record["orders"]], [item["id"] for item in record["payments"]]
+            ))
+        with self.storage.engines()["orders"].begin() as connection:
+            for table in ("archived_orders", "archived_payments"):
+                connection.execute(text(f"DELETE FROM {table}"))
+
+    def test_reads_stick_to_primary_after_local_commit(self):
+        with mock.patch.object(self.storage, "sticky", 60):
+            self._create_order(1)
+            self.assertTrue(self.storage.reading_from_primary(("order", 1)))
+            self.assertEqual(1, len(self.orders_service.get_orders_service(1)))
+            self.assertEqual(1, len(json.loads(asyncio.run(self.orders_service.get_orders_json_service_async(1)))))
+
+    def test_sticky_window_expires(self):
+        now = [100.0]
+        storage = self.storage_module.Storage(
+            self.storage.orders, self.storage.payments, sticky=2, clock=lambda: now[0]
+        )
+        with storage.session() as session:
+            session.execute(insert(self.orders_model.OrderModel), [self._order_row(7)])
+            session.commit()
+        self.assertTrue(storage.reading_from_primary())
+        with storage.read_session() as session:
+            self.assertEqual(1, len(session.scalars(select(self.orders_model.OrderModel)).all()))
+
+        now[0] += 2.5
+        self.assertFalse(storage.reading_from_primary())
+        with storage.read_session() as session:
+            self.assertEqual([], session.scalars(select(self.orders_model.OrderModel)).all())
+        # Commits do storage global não afetam este.
+        self.assertFalse(self.storage.reading_from_primary())
+
+    def test_writes_of_other_requests_only_pin_their_own_keys(self):
+        now = [100.0]
+        storage = self.storage_module.Storage(
+            self.storage.orders, self.storage.payments, sticky=2, clock=lambda: now[0]
+        )
+        pinned = []
+
+        def other_request():
+            with storage.session() as session:
+                session.execute(insert(self.orders_model.OrderModel), [self._order_row(7)])
+                session.commit()
+            storage.written(("order", 7))
+            pinned.append(storage.reading_from_primary())
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        thread.join(5)
+
+        self.assertEqual([True], pinned)
+        # Escrita constante em outra requisição não tira as demais leituras da réplica.
+        self.assertFalse(storage.reading_from_primary())
+        self.assertFalse(storage.reading_from_primary(("order", 8)))
+        self.assertTrue(storage.reading_from_primary(("order", 7)))
+        with storage.read_session(("order", 7)) as session:
+            self.assertEqual(1, len(session.scalars(select(self.orders_model.OrderModel)).all()))
+
+        now[0] += 2.5
+        self.assertFalse(storage.reading_from_primary(("order", 7)))
+        storage.written(("order", 8))
+        self.assertEqual([("order", 8)], list(storage._written))
+
+
+class PoolProfileTests(unittest.TestCase):
+    def test_postgresql_profile_sizes_pool_and_checks_connections(self):
+        database = importlib.import_module("src.orders.database")
+        settings = database.pool_settings("postgresql")
+        self.assertEqual(10, settings["pool_size"])
+        self.assertTrue(settings["pool_pre_ping"])
+        self.assertIn("pool_recycle", settings)
+
+    def test_postgresql_urls_build_sync_and_async_engines(self):
+        engine, async_engine = importlib.import_module("src.storage")._engines("postgresql://app:secret@db/orders")
+        self.assertEqual(("psycopg2", "asyncpg"), (engine.dialect.driver, async_engine.dialect.driver))
+        engine.dispose()
+
+    def test_profile_is_resolved_per_url_backend(self):
+        database = importlib.import_module("src.orders.database")
+        cases = {
+            None: ("default", "postgresql"),
+            "performance": ("performance", "postgresql"),
+            "postgresql": ("default", "postgresql"),
+        }
+        for configured, expected in cases.items():
+            env = {"DB_PROFILE": configured} if configured else {}
+            with self.subTest(configured=configured), mock.patch.dict(os.environ, env):
+                if not configured:
+                    os.environ.pop("DB_PROFILE", None)
+                self.assertEqual(expected, (
+                    database.profile_for("sqlite:///orders.db"),
+                    database.profile_for("postgresql+psycopg2://app@db/payments"),
+                ))
+        with mock.patch.dict(os.environ, {"DB_PROFILE": "perfomance"}):
+            with self.assertRaises(ValueError):
+                database.profile_for("sqlite:///orders.db")
+
+    def test_postgresql_payments_next_to_sqlite_orders_get_the_postgresql_pool(self):
+        storage_module = importlib.import_module("src.storage")
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.dict(os.environ, {"DB_PROFILE": "performance"}):
+            sqlite_engine, _ = storage_module._engines(f"sqlite:///{Path(tmpdir) / 'orders.db'}")
+            engine, _ = storage_module._engines("postgresql://app:secret@db/payments")
+            self.assertEqual((True, 1800), (engine.pool._pre_ping, engine.pool._recycle))
+            self.assertFalse(sqlite_engine.pool._pre_ping)
+            sqlite_engine.dispose()
+            engine.dispose()
+
+    def test_env_overrides_pool_size(self):
+        database = importlib.import_module("src.orders.database")
+        with mock.patch.dict(os.environ, {"DB_POOL_SIZE": "3", "DB_POOL_RECYCLE": "60"}):
+            settings = database.pool_settings("postgresql")
+        self.assertEqual(3, settings["pool_size"])
+        self.assertEqual(60, settings["pool_recycle"])
+
+
+if __name__ == "__main__":
+    unittest.main()
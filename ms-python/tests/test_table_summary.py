@@ -0,0 +1,194 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from _db import add_order, add_order_batch, create_schema, reload_modules  # noqa: E402
+
+
+class TableSummaryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        os.environ.setdefault("CONSUL_HTTP_ADDR", "http://127.0.0.1:59999")
+        modules = reload_modules(f"sqlite:///{Path(cls._tmpdir.name) / 'orders.db'}", "src.orders.controller")
+        cls.database_module = modules["src.orders.database"]
+        cls.orders_model = modules["src.orders.model"]
+        cls.payments_model = modules["src.payments.model"]
+        cls.summary_module = modules["src.orders.table_summary"]
+        cls.orders_service = modules["src.orders.service"]
+        cls.payments_service = modules["src.payments.service"]
+        orders_controller = modules["src.orders.controller"]
+        create_schema(cls.database_module.engine)
+
+        app = FastAPI()
+        app.include_router(orders_controller.router)
+        cls.client = TestClient(app)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.database_module.engine.dispose()
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        with self.database_module.SessionLocal() as session:
+            for table in ("orders", "payments", "table_summaries"):
+                session.execute(text(f"DELETE FROM {table}"))
+            session.commit()
+
+    def _add_order(self, order_number, table_number, quantity):
+        request = self.orders_model.OrderRequest(productCode=101, tableNumber=table_number, quantity=quantity)
+        add_order(request, order_number, "Café", 100, 10.0)
+
+    def _add_batch(self, order_number, table_number, quantities):
+        batch = self.orders_model.OrderBatchRequest(
+            tableNumber=table_number,
+            items=[{"productCode": 101, "quantity": quantity} for quantity in quantities],
+        )
+        add_order_batch(batch, order_number, {101: ("Café", 100, 10.0)})
+
+    def _pay(self, order_number, amount):
+        request = self.payments_model.PaymentRequest(orderNumber=order_number, amount=amount, paymentMethod="pix")
+        return self.payments_service.create_payment_service(request)
+
+    def _set_status(self, payment_id, status):
+        update = self.payments_model.PaymentUpdateRequest(status=status)
+        self.payments_service.update_payment_status_service(payment_id, update)
+
+    def _stored_summaries(self):
+        with self.database_module.engine.connect() as connection:
+            rows = connection.execute(
+                select(self.summary_module.summaries).order_by(self.summary_module.summaries.c.tableNumber)
+            ).all()
+        return [row._asdict() | {"updatedAt": None} for row in rows]
+
+    def test_order_writes_update_the_table_totals(self):
+        self._add_order(1, table_number=5, quantity=2)
+        self._add_batch(2, table_number=5, quantities=[1, 3])
+        self._add_order(3, table_number=6, quantity=1)
+
+        summary = self.orders_service.get_table_summary_service(5)
+
+        self.assertEqual(2, summary.orderCount)
+        self.assertEqual(3, summary.itemCount)
+        self.assertEqual(6, summary.quantity)
+        self.assertEqual("OPEN", summary.paymentStatus)
+
+    def test_closed_orders_leave_the_table_totals(self):
+        self._add_order(1, table_number=5, quantity=2)
+        self._add_order(2, table_number=5, quantity=1)
+        first = self._pay(1, 20.0)
+        second = self._pay(2, 10.0)
+
+        summary = self.orders_service.get_table_summary_service(5)
+        self.assertEqual(30.0, summary.billTotal)
+        self.assertEqual((2, 30.0), (summary.pendingPayments, summary.pendingAmount))
+        self.assertEqual("PENDING", summary.paymentStatus)
+
+        self._set_status(first.id, "COMPLETED")
+        summary = self.orders_service.get_table_summary_service(5)
+        self.assertEqual((1, 1, 10.0), (summary.orderCount, summary.quantity, summary.billTotal))
+        self.assertEqual((1, 10.0), (summary.pendingPayments, summary.pendingAmount))
+        self.assertEqual((0, 0.0), (summary.completedPayments, summary.paidAmount))
+
+        self._set_status(second.id, "CANCELLED")
+        summary = self.orders_service.get_table_summary_service(5)
+        self.assertEqual(
+            (0, 0, 0.0, 0, "CLOSED"),
+            (summary.orderCount, summary.quantity, summary.billTotal, summary.pendingPayments, summary.paymentStatus),
+        )
+
+        # Novo pagamento do pedido cancelado: ele volta para a conta da mesa.
+        retry = self._pay(2, 10.0)
+        summary = self.orders_service.get_table_summary_service(5)
+        self.assertEqual((1, 10.0, 1, "PENDING"), (
+            summary.orderCount, summary.billTotal, summary.pendingPayments, summary.paymentStatus
+        ))
+        self._set_status(retry.id, "FAILED")
+        self.assertEqual("CLOSED", self.orders_service.get_table_summary_service(5).paymentStatus)
+        self._pay(2, 10.0)
+        self.assertEqual("PENDING", self.orders_service.get_table_summary_service(5).paymentStatus)
+
+    def test_bulk_status_update_closes_orders_per_table(self):
+        self._add_order(1, table_number=5, quantity=2)
+        self._add_order(2, table_number=5, quantity=1)
+        self._add_order(3, table_number=6, quantity=3)
+        self._add_order(4, table_number=5, quantity=4)
+        payments = [self._pay(1, 20.0), self._pay(2, 10.0), self._pay(3, 30.0)]
+
+        bulk = self.payments_model.PaymentBulkStatusRequest(
+            updates=[{"id": payment.id, "status": "COMPLETED"} for payment in payments]
+        )
+        self.payments_service.bulk_update_payment_status_service(bulk)
+
+        five = self.orders_service.get_table_summary_service(5)
+        six = self.orders_service.get_table_summary_service(6)
+        self.assertEqual(
+            (1, 4, 40.0, 0, "OPEN"),
+            (five.orderCount, five.quantity, five.billTotal, five.pendingPayments, five.paymentStatus),
+        )
+        self.assertEqual((0, 0.0, "CLOSED"), (six.orderCount, six.billTotal, six.paymentStatus))
+
+    def test_rejected_payment_leaves_totals_untouched(self):
+        self._add_order(1, table_number=5, quantity=2)
+        self._pay(1, 20.0)
+
+        with self.assertRaises(HTTPException) as ctx:
+            self._pay(1, 20.0)
+        self.assertEqual(409, ctx.exception.status_code)
+
+        summary = self.orders_service.get_table_summary_service(5)
+        self.assertEqual((1, 20.0), (summary.pendingPayments, summary.pendingAmount))
+
+    def test_rebuild_matches_incremental_totals(self):
+        self._add_order(1, table_number=5, quantity=2)
+        self._add_batch(2, table_number=7, quantities=[1, 4])
+        self._add_order(3, table_number=7, quantity=1)
+        self._add_order(4, table_number=8, quantity=1)
+        payment = self._pay(1, 20.0)
+        self._set_status(payment.id, "COMPLETED")
+        self._pay(2, 50.0)
+        self._set_status(self._pay(3, 10.0).id, "CANCELLED")
+        self._set_status(self._pay(4, 10.0).id, "CANCELLED")
+        self._pay(4, 10.0)
+        incremental = self._stored_summaries()
+
+        with self.database_module.engine.begin() as connection:
+            self.assertEqual(3, self.summary_module.rebuild_table_summaries(connection))
+
+        self.assertEqual(incremental, self._stored_summaries())
+
+    def test_payment_amount_is_checked_against_stored_prices(self):
+        self._add_batch(1, table_number=5, quantities=[1, 2])
+
+        with self.assertRaises(HTTPException) as ctx:
+            self._pay(1, 25.0)
+        self.assertEqual(400, ctx.exception.status_code)
+        self.assertIn("30.00", ctx.exception.detail)
+
+        # Pedido antigo, sem preços gravados: o valor não é conferido.
+        request = self.orders_model.OrderRequest(productCode=101, tableNumber=5, quantity=1)
+        add_order(request, 2, "Café", 100)
+        self.assertEqual("PENDING", self._pay(2, 99.0).status)
+
+    def test_summary_endpoint(self):
+        self._add_batch(1, table_number=9, quantities=[2, 2])
+
+        response = self.client.get("/order/table/9/summary")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(4, response.json()["quantity"])
+        self.assertEqual(404, self.client.get("/order/table/10/summary").status_code)
+
+
+if __name__ == "__main__":
+    unittest.main()